@@ -1,9 +1,15 @@
 # bench_all.py
-import json, subprocess, sys, os
+import json, math, subprocess, sys, os, argparse, time
 from pathlib import Path
 
 ROOT = Path(__file__).resolve().parent
 PY = sys.executable  # même venv que ton terminal
+sys.path.insert(0, str(ROOT / "src"))
+
+from green_assistant import baseline as bl
+from green_assistant import budget, calibration, channel, intensity, scaling, scheduler, sink
+
+DEFAULT_BASELINE = ROOT / "bench_baselines.json"
 
 def tool_path(rel):
     p1 = ROOT / "src" / rel
@@ -19,19 +25,23 @@ def resolve_target(name: str) -> str:
         if cand.exists(): return str(cand.resolve())
     return str((ROOT / name).resolve())
 
+def target_key(target: str) -> str:
+    """Clé stable de la cible dans le store de baselines (relative au repo si possible)."""
+    p = Path(target).resolve()
+    try: return p.relative_to(ROOT).as_posix()
+    except ValueError: return p.as_posix()
+
 def extract_json(text: str) -> dict | None:
-    """Tente d'extraire le dernier objet JSON dans un texte pollué par des logs."""
-    s = text.strip()
-    if not s: return None
-    end = s.rfind('}')
-    if end == -1: return None
-    # essaie depuis chaque '{' vers l'arrière jusqu'au '}' final
-    starts = [i for i, ch in enumerate(s[:end+1]) if ch == '{']
-    for start in reversed(starts):
+    """Dernière ligne JSON objet d'un texte pollué par des logs (chaque ligne parsée au plus une fois).
+    Secours seulement : les wrappers répondent sur le canal tramé (green_assistant.channel)."""
+    for line in reversed(text.splitlines()):
+        line = line.strip()
+        if not (line.startswith("{") and line.endswith("}")): continue
         try:
-            return json.loads(s[start:end+1])
-        except Exception:
-            pass
+            j = json.loads(line)
+        except ValueError:
+            continue
+        if isinstance(j, dict): return j
     return None
 
 TOOLS = [
@@ -39,33 +49,294 @@ TOOLS = [
     ("carbontracker", [PY, tool_path("carbontracker-api.py")]),
     ("eco2ai",        [PY, tool_path("eco2ai-api.py")]),
     ("tracarbon",     [PY, tool_path("tracarbon-api.py")]),
+    ("node",          [PY, tool_path("node-api.py")]),  # cibles .js/.mjs/.cjs
 ]
+JS_SUFFIXES = (".js", ".mjs", ".cjs")
 
-target = resolve_target(sys.argv[1] if len(sys.argv) > 1 else "bench_cpu_60s.py")
+OUTPUT_LIMIT = channel.DEFAULT_LIMIT  # octets de stdout/stderr du snippet gardés par run
 
-def run(cmd):
+def run(cmd, target, extra_env=None):
     env = os.environ.copy()
     env.setdefault("CODECARBON_LOG_LEVEL", "error")  # réduit le bruit
-    p = subprocess.run(cmd + [target], capture_output=True, text=True, cwd=str(ROOT), env=env)
-    out = (p.stdout or "")
-    err = (p.stderr or "")
-    j = extract_json(out) or extract_json(err)
+    env.update(extra_env or {})
+    # résultat sur un canal tramé dédié ; stdout/stderr du snippet dans des tampons bornés
+    r = channel.run(cmd + [target], env=env, cwd=str(ROOT), limit=OUTPUT_LIMIT)
+    out, err = r["stdout"], r["stderr"]
+    j = r["records"][-1] if r["records"] else None
+    if j is None:  # wrapper mort avant d'écrire, ou ancien wrapper : dernier recours sur les logs
+        j = extract_json(out) or extract_json(err)
     if j is None:
         j = {"error": "no_json", "stdout": out.strip(), "stderr": err.strip()}
+    j.setdefault("output_bytes", r["stdout_bytes"] + r["stderr_bytes"])
     return j
 
-rows = []
-for name, base in TOOLS:
-    res = run(base)
-    rows.append((name,
-                 res.get("duration_s"),
-                 res.get("energy_kwh"),
-                 res.get("emissions_kg"),
-                 res.get("error"),
-                 (res.get("stderr") or res.get("stdout") or "")[:120]))
-
-w = max(len(n) for n, *_ in rows)
-print(f"{'tool'.ljust(w)}  duration_s            energy_kwh            emissions_kg           error/notes")
-for n, d, e, c, err, note in rows:
-    msg = err or note
-    print(f"{n.ljust(w)}  {str(d).rjust(10)}   {str(e).rjust(12)}   {str(c).rjust(14)}   {msg}")
+def run_batch(cmd, spec, isolate=False, extra_env=None):
+    """Lance `<tool>-api.py --batch SPEC` et relaie son flux NDJSON au fil de l'eau."""
+    env = os.environ.copy()
+    env.setdefault("CODECARBON_LOG_LEVEL", "error")
+    env.update(extra_env or {})
+    argv = cmd + ["--batch", spec] + (["--isolate"] if isolate else [])
+    with subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                          cwd=str(ROOT), env=env) as p:
+        for line in p.stdout:
+            line = line.strip()
+            if not line.startswith("{"): continue
+            try: yield json.loads(line)
+            except ValueError: continue
+        p.wait()
+
+def run_tools(target, wanted, repeat=1, extra_env=None):
+    """Lance chaque outil demandé `repeat` fois. Renvoie ({outil: [résultats]}, lignes du tableau)."""
+    results, rows = {}, []
+    for name, base in TOOLS:
+        if name not in wanted: continue
+        runs = [run(base, target, extra_env) for _ in range(max(1, repeat))]
+        results[name] = runs
+        for res in runs:
+            rows.append((name,
+                         res.get("duration_s"),
+                         res.get("energy_kwh"),
+                         res.get("emissions_kg"),
+                         res.get("error"),
+                         (res.get("stderr") or res.get("stdout") or "")[:120]))
+    return results, rows
+
+def print_table(rows):
+    w = max(len(n) for n, *_ in rows)
+    print(f"{'tool'.ljust(w)}  duration_s            energy_kwh            emissions_kg           error/notes")
+    for n, d, e, c, err, note in rows:
+        msg = err or note
+        print(f"{n.ljust(w)}  {str(d).rjust(10)}   {str(e).rjust(12)}   {str(c).rjust(14)}   {msg}")
+
+def print_reconciled(results):
+    """Estimation réconciliée d'après la calibration de l'hôte (bench_all.py --calibrate)."""
+    rec = calibration.reconcile(results, gco2_kwh=intensity.now_intensity())
+    if rec is None: return None
+    em = f", {rec['emissions_kg']:.6g} kgCO2" if rec["emissions_kg"] is not None else ""
+    print(f"reconciled  {rec['energy_kwh']:.6g} kWh [{rec['energy_kwh_low']:.3g} – {rec['energy_kwh_high']:.3g}]{em}"
+          f"  (réf. {rec['reference']}, {len(rec['tools'])} outil(s))")
+    return rec
+
+def calibrate_main(args, wanted, extra_env) -> int:
+    tools = dict(TOOLS)
+    def run_tool(name, script, env):
+        return run(tools[name], script, {**extra_env, **env})
+    ref = args.reference or None
+    if ref and ref != "rapl" and ref not in tools:
+        print(f"Référence inconnue : {ref}", file=sys.stderr); return 2
+    entry = calibration.calibrate(run_tool, wanted, max(2, args.repeat), args.calib_duration, ref)
+    print(f"référence : {entry['reference']}  (hôte {entry['host']})")
+    for name, t in entry["tools"].items():
+        if t.get("status") == "no_data":
+            print(f"  {name.ljust(13)}  pas de mesure exploitable"); continue
+        band = math.exp(calibration.Z * t["log_sd"])
+        scale = "" if t["emissions_scale"] == 1.0 else f"  émissions ×{t['emissions_scale']:g}"
+        print(f"  {name.ljust(13)}  ×{t['factor']:.4g}  (bande ×/÷{band:.2f}, n={t['n']}){scale}")
+    return 0 if any(t.get("status") == "ok" for t in entry["tools"].values()) else 1
+
+def scale_main(args, target, wanted, extra_env) -> int:
+    """Mode scaling : chaque outil à une série de tailles N, puis ajustement O(·) et extrapolation."""
+    ns = scaling.parse_sizes(args.scale)
+    at = scaling.parse_sizes(args.at) if args.at else []
+    tools = dict(TOOLS)
+    failures = 0
+    for name in wanted:
+        if name == "time":
+            run_n = lambda n: scaling.run_local(target, n)
+        else:
+            run_n = lambda n, base=tools[name]: run(base, target, {**extra_env, **scaling.size_env(n)})
+        points = scaling.measure_sizes(run_n, ns, args.repeat)
+        rep = scaling.analyse(points, at)
+        failures += any(p.get("error") for p in points)
+        for p in points:
+            print(f"{name.ljust(13)}  N={str(p['n']).rjust(10)}  {str(p['duration_s']).rjust(22)} s  "
+                  f"{str(p['energy_kwh']).rjust(22)} kWh  {p.get('error') or ''}")
+        for m in scaling.METRICS:
+            f = rep.get(m)
+            if not f:
+                continue
+            slope = "n/a" if f["loglog_slope"] is None else f"{f['loglog_slope']:.2f}"
+            proj = "  ".join(f"N={n}: {v:.4g}" for n, v in f["extrapolated"].items())
+            print(f"{name.ljust(13)}  {m}: {f['model']}  (écart {f['rel_rmse']:.1%}, pente log-log {slope})  {proj}")
+    return 1 if failures else 0
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Bench des 4 trackers + gate de régression vs baselines.")
+    ap.add_argument("target", nargs="?", default="bench_cpu_60s.py", help="script à mesurer")
+    ap.add_argument("--tools", default=None,
+                    help="outils (séparés par des virgules) ; défaut : node pour une cible JS, sinon les outils Python")
+    ap.add_argument("--repeat", type=int, default=1, help="nb de runs par outil (≥2 pour le test de significativité)")
+    ap.add_argument("--baseline", default=str(DEFAULT_BASELINE), help="fichier JSON des baselines")
+    ap.add_argument("--record", action="store_true", help="enregistre les runs comme nouvelle baseline")
+    ap.add_argument("--check", action="store_true", help="compare à la baseline ; code retour 1 si régression")
+    ap.add_argument("--metrics", default=",".join(bl.DEFAULT_METRICS), help="métriques comparées")
+    ap.add_argument("--threshold", type=float, default=0.10, help="hausse relative tolérée (0.10 = +10 %%)")
+    ap.add_argument("--alpha", type=float, default=0.05, help="seuil de significativité (Welch unilatéral)")
+    ap.add_argument("--overhead", choices=["off", "report", "subtract"], default=None,
+                    help="surcoût d'instrumentation des wrappers (GREEN_OVERHEAD)")
+    ap.add_argument("--batch", default=None, metavar="SPEC",
+                    help="manifeste .json/.csv ou glob : mesure en lot, sortie NDJSON")
+    ap.add_argument("--isolate", action="store_true", help="(--batch) un worker par script")
+    ap.add_argument("--schedule", default=None, metavar="DEADLINE",
+                    help="différe le bench au créneau le moins carboné avant l'échéance (8h, 90m, ISO)")
+    ap.add_argument("--forecast", default=None, help="CSV de prévision d'intensité (region,timestamp,gco2_kwh)")
+    ap.add_argument("--region", default=None, help="zone de la prévision (défaut : pays de l'hôte)")
+    ap.add_argument("--est-duration", type=float, default=None, help="durée estimée du job (s)")
+    ap.add_argument("--priority", type=int, default=0, help="priorité à créneau égal")
+    ap.add_argument("--queue", default=None, help="fichier de la file des jobs différés")
+    ap.add_argument("--run-due", action="store_true", help="exécute les jobs arrivés à échéance")
+    ap.add_argument("--wait", action="store_true", help="(--run-due) attend et vide toute la file")
+    ap.add_argument("--list-queue", action="store_true", help="affiche la file des jobs différés")
+    ap.add_argument("--diff-out", default=None, help="écrit le diff JSON dans ce fichier ('-' = stdout)")
+    ap.add_argument("--calibrate", action="store_true",
+                    help="calibre les outils sur les charges de référence (facteurs par hôte)")
+    ap.add_argument("--reference", default=None, help="(--calibrate) 'rapl' ou un outil (défaut : RAPL si lisible)")
+    ap.add_argument("--calib-duration", type=float, default=3.0, help="(--calibrate) durée de chaque charge (s)")
+    ap.add_argument("--output-limit", type=int, default=OUTPUT_LIMIT // 1024, metavar="KB",
+                    help="sortie du snippet gardée par run (derniers KB ; 0 = rien)")
+    ap.add_argument("--scale", default=None, metavar="SIZES",
+                    help="mode scaling : tailles N 'MIN:MAX[:ÉTAPES]' (géométrique) ou 'N1,N2,…' ; outil 'time' = chrono seul")
+    ap.add_argument("--at", default=None, metavar="SIZES", help="(--scale) tailles de production extrapolées")
+    ap.add_argument("--budget-wall", type=float, default=None, metavar="S",
+                    help="budget temps réel par run (défaut GREEN_BUDGET_WALL_S ou 120 ; 0 = illimité)")
+    ap.add_argument("--budget-cpu", type=float, default=None, metavar="S", help="budget CPU de l'arbre de process du snippet")
+    ap.add_argument("--budget-j", type=float, default=None, metavar="J", help="budget énergie estimée en direct (joules)")
+    ap.add_argument("--sink", default=None, metavar="DIR",
+                    help=f"puits colonnaire des runs + séries ({sink.fmt()}, cf. green_assistant.sink)")
+    return ap.parse_args(argv)
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    global OUTPUT_LIMIT
+    OUTPUT_LIMIT = max(0, args.output_limit) * 1024
+    target = resolve_target(args.target)
+    if args.tools is None:
+        js = Path(args.batch or target).suffix.lower() in JS_SUFFIXES
+        args.tools = "node" if js else ",".join(n for n, _ in TOOLS if n != "node")
+    wanted = [t.strip() for t in args.tools.split(",") if t.strip()]
+    unknown = sorted(set(wanted) - {n for n, _ in TOOLS} - ({"time"} if args.scale else set()))
+    if unknown:
+        print(f"Outils inconnus : {', '.join(unknown)}", file=sys.stderr); return 2
+    metrics = [m.strip() for m in args.metrics.split(",") if m.strip()]
+    extra_env = {"GREEN_OVERHEAD": args.overhead} if args.overhead else {}
+    if args.sink: extra_env["GREEN_SINK"] = str(Path(args.sink).resolve())
+    extra_env.update(budget.env_for({"wall_s": args.budget_wall, "cpu_s": args.budget_cpu, "joules": args.budget_j}))
+
+    if args.batch:
+        spec = args.batch if any(c in args.batch for c in "*?[") else resolve_target(args.batch)
+        failures = 0
+        for name, base in TOOLS:
+            if name not in wanted: continue
+            for res in run_batch(base, spec, args.isolate, extra_env):
+                failures += bool(res.get("error") or res.get("run_error"))
+                print(json.dumps({"tool": name, **res}, ensure_ascii=False), flush=True)
+        return 1 if failures else 0
+
+    if args.calibrate:
+        return calibrate_main(args, wanted, extra_env)
+
+    if args.scale:
+        return scale_main(args, target, wanted, extra_env)
+
+    if args.schedule or args.run_due or args.list_queue:
+        return schedule_main(args, target, wanted, extra_env)
+
+    results, rows = run_tools(target, wanted, args.repeat, extra_env)
+    print_table(rows)
+    print_reconciled(results)
+
+    if not (args.record or args.check):
+        return 0
+
+    key = target_key(target)
+    store = bl.load_store(args.baseline)
+    code = 0
+    if args.check:
+        entries = [bl.compare(store, key, name, runs, metrics, args.threshold, args.alpha)
+                   for name, runs in results.items()]
+        diff = bl.summarize(entries, args.threshold, args.alpha)
+        payload = json.dumps(diff, ensure_ascii=False, indent=2, allow_nan=False)
+        if args.diff_out == "-": print(payload)
+        elif args.diff_out: Path(args.diff_out).write_text(payload + "\n", encoding="utf-8")
+        for e in entries:
+            for m, v in e["metrics"].items():
+                flag = "REGRESSION" if v["regression"] else "ok"
+                p = "n/a" if v["p_value"] is None else f"{v['p_value']:.3g}"
+                rel = "baseline nulle" if v["rel_change"] is None else f"{v['rel_change']:+.1%}"
+                print(f"[{flag}] {e['tool']} {m}: {v['baseline_mean']:.6g} -> {v['current_mean']:.6g} "
+                      f"({rel}, p={p})", file=sys.stderr)
+            if not e["metrics"]:
+                print(f"[{e['status']}] {e['tool']}", file=sys.stderr)
+        code = 1 if diff["regressions"] else 0
+    if args.record:
+        for name, runs in results.items():
+            n = bl.record(store, key, name, runs, metrics)
+            if not n: print(f"[skip] {name}: aucun run valide à enregistrer", file=sys.stderr)
+        bl.save_store(args.baseline, store)
+    return code
+
+def _baseline_estimate(key, wanted, path):
+    """(durée, énergie) attendues d'après les baselines enregistrées, sinon (None, None)."""
+    store = bl.load_store(path)
+    dur = en = None
+    for name in wanted:
+        samples = bl.get_samples(store, key, name)
+        d = [s["duration_s"] for s in samples if isinstance(s.get("duration_s"), (int, float))]
+        e = [s["energy_kwh"] for s in samples if isinstance(s.get("energy_kwh"), (int, float))]
+        if d: dur = (dur or 0.0) + sum(d) / len(d)
+        if e: en = (en or 0.0) + sum(e) / len(e)
+    return dur, en
+
+def _fmt_ts(ts):
+    return time.strftime("%Y-%m-%d %H:%M", time.localtime(ts))
+
+def schedule_main(args, target, wanted, extra_env) -> int:
+    index = intensity.default_index()
+    if args.forecast: index.load_csv(args.forecast)
+    region = (args.region or intensity.host_region() or "").upper()
+    queue = scheduler.JobQueue(args.queue)
+
+    if args.schedule:
+        if not index.has(region):
+            print(f"Pas de données d'intensité pour la région '{region or '?'}' (--region / --forecast)",
+                  file=sys.stderr); return 2
+        key = target_key(target)
+        est_dur, est_en = _baseline_estimate(key, wanted, args.baseline)
+        dur = args.est_duration or est_dur or 60.0
+        job = queue.add(scheduler.plan(index, region, target, scheduler.parse_deadline(args.schedule), dur,
+                                       est_en, tools=wanted, priority=args.priority, repeat=args.repeat,
+                                       overhead=args.overhead))
+        saving = f"{job['saving_ratio']:.1%}"
+        if job["est_saving_g"] is not None: saving += f" (~{job['est_saving_g']:.3g} gCO2)"
+        print(f"[queued] {job['id']} {key} -> {_fmt_ts(job['run_at'])} "
+              f"({job['gco2_kwh_planned']:.0f} vs {job['gco2_kwh_now']:.0f} gCO2/kWh maintenant, économie {saving})")
+        return 0
+
+    if args.list_queue:
+        for j in queue.pending():
+            print(f"{j['id']}  {_fmt_ts(j['run_at'])}  prio={j.get('priority', 0)}  "
+                  f"{target_key(j['target'])}  économie≈{j['saving_ratio']:.1%}")
+        return 0
+
+    code = 0
+    while True:
+        while (job := queue.claim()) is not None:
+            env = dict(extra_env)
+            if job.get("overhead"): env["GREEN_OVERHEAD"] = job["overhead"]
+            t0 = time.time()
+            results, rows = run_tools(job["target"], job["tools"], job.get("repeat", 1), env)
+            print(f"# job {job['id']} ({target_key(job['target'])})")
+            print_table(rows)
+            g_actual = index.mean(job["region"], t0, time.time()) if index.has(job["region"]) else None
+            failed = any(r.get("error") or r.get("run_error") for runs in results.values() for r in runs)
+            queue.update(job["id"], status="failed" if failed else "done", ran_at=t0, gco2_kwh_actual=g_actual,
+                         results={n: [{m: r.get(m) for m in ("duration_s", "energy_kwh", "emissions_kg", "error")}
+                                      for r in runs] for n, runs in results.items()})
+            code |= int(failed)
+        nxt = queue.next_run_at()
+        if not args.wait or nxt is None:
+            return code
+        time.sleep(max(1.0, min(nxt - time.time(), 300.0)))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,214 @@
+# bench_load.py
+"""Test de charge du pipeline de l'app (analyse + génération), sans navigateur.
+
+N workers (threads, comme les sessions du serveur Streamlit) enchaînent en
+boucle les étapes de l'app sur un corpus de snippets pendant une durée
+donnée : détection du langage, motifs énergivores (+ frameworks et
+recommandations), retrieval des patterns, réécriture green, mesure.
+
+Rapport : débit (pipelines complets/s), latences p50/p95/p99 par étape,
+erreurs par étape, CPU et mémoire de l'hôte (échantillonnés) et RSS du
+process. Corpus : manifeste .json/.csv ou glob (comme ``--batch``), sinon
+quelques snippets Python/JS intégrés.
+
+    python bench_load.py --corpus 'samples/**/*.py' --concurrency 8 --duration 60
+    python bench_load.py --stages detect,smells,retrieval,greenify   # sans mesure
+"""
+import argparse, itertools, json, math, sys, threading, time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+import psutil
+
+ROOT = Path(__file__).resolve().parent
+sys.path.insert(0, str(ROOT / "src"))
+
+from green_assistant import batch
+from green_assistant.analysis import detect_language, detect_frameworks_python, detect_energy_smells, suggestions_for
+from green_assistant.measure import measure
+from green_assistant.patterns import retrieve_patterns, greenify_code
+
+STAGES = ["detect", "smells", "retrieval", "greenify", "measure"]
+
+CORPUS = [
+    ("concat", "s = ''\nfor i in range(20000):\n    s += str(i)\nprint(len(s))\n"),
+    ("fib", "def fib(n):\n    return n if n < 2 else fib(n - 1) + fib(n - 2)\nprint(fib(20))\n"),
+    ("invariant", "import math\nxs = list(range(20000))\nout = []\nfor x in xs:\n"
+                  "    out.append(x * math.sqrt(len(xs)))\nprint(sum(out))\n"),
+    ("pandas", "import pandas as pd\ndf = pd.DataFrame({'a': range(2000), 'b': range(2000)})\ntotal = 0\n"
+               "for _, row in df.iterrows():\n    total += row['a'] * row['b']\nprint(total)\n"),
+    ("js_concat", "let s = '';\nfor (let i = 0; i < 20000; i++) {\n  s += i;\n}\nconsole.log(s.length);\n"),
+]
+
+
+def load_corpus(spec: Optional[str]) -> List[Dict[str, str]]:
+    if not spec:
+        return [{"id": name, "code": code} for name, code in CORPUS]
+    return [{"id": t["id"], "code": Path(t["path"]).read_text(encoding="utf-8", errors="replace")}
+            for t in batch.iter_targets(spec)]
+
+
+def percentile(xs: List[float], q: float) -> Optional[float]:
+    """Rang le plus proche (xs trié) ; None sans échantillon."""
+    if not xs: return None
+    return xs[min(len(xs) - 1, max(0, math.ceil(q * len(xs)) - 1))]
+
+
+# ───────────────────────────── Pipeline ─────────────────────────────
+def pipeline(code: str, stages: List[str], tool: str, output_policy: str) -> Dict[str, Any]:
+    """Étapes de l'app dans l'ordre ; renvoie {étape: (secondes, erreur|None)}."""
+    out, ctx = {}, {}
+
+    def step(name: str, fn: Callable[[], Optional[str]]) -> None:
+        if name not in stages: return
+        t0 = time.perf_counter()
+        try:
+            err = fn()
+        except Exception as e:  # une étape qui plante ne tue pas le worker
+            err = f"{type(e).__name__}: {e}"
+        out[name] = (time.perf_counter() - t0, err)
+
+    def detect():
+        ctx["lang"] = detect_language(code)
+
+    def smells():
+        lang = ctx.get("lang") or detect_language(code)
+        fw = detect_frameworks_python(code) if lang == "python" else []
+        ctx["smells"] = detect_energy_smells(code, lang)
+        suggestions_for(ctx["smells"], fw)
+
+    def retrieval():
+        retrieve_patterns(code, ctx.get("smells") or [], top_k=4)
+
+    def greenify():
+        greenify_code(code, ctx.get("smells") or [], ctx.get("lang") or detect_language(code))
+
+    def measurement():
+        res = measure(code, tool, output_policy=output_policy)
+        return res.get("error") or ("run_error" if res.get("run_error") else None)
+
+    for name, fn in (("detect", detect), ("smells", smells), ("retrieval", retrieval),
+                     ("greenify", greenify), ("measure", measurement)):
+        step(name, fn)
+    return out
+
+
+class HostSampler(threading.Thread):
+    """CPU/mémoire de l'hôte et RSS du process, toutes les ``interval`` s."""
+
+    def __init__(self, interval: float = 0.5):
+        super().__init__(daemon=True)
+        self.interval, self.samples, self._done = interval, [], threading.Event()
+        self._proc = psutil.Process()
+        psutil.cpu_percent(None)  # amorce : la première lecture vaut 0
+
+    def run(self) -> None:
+        while not self._done.wait(self.interval):
+            self.samples.append((psutil.cpu_percent(None), psutil.virtual_memory().percent,
+                                 self._proc.memory_info().rss))
+
+    def stop(self) -> Dict[str, Any]:
+        self._done.set(); self.join()
+        if not self.samples: return {}
+        cpu, mem, rss = zip(*self.samples)
+        return {"cpu_percent_mean": sum(cpu) / len(cpu), "cpu_percent_max": max(cpu),
+                "mem_percent_mean": sum(mem) / len(mem), "mem_percent_max": max(mem),
+                "rss_mb_max": max(rss) / 2**20, "cpu_count": psutil.cpu_count(), "samples": len(cpu)}
+
+
+# ───────────────────────────── Charge ─────────────────────────────
+def run_load(corpus: List[Dict[str, str]], stages: List[str], concurrency: int, duration: float,
+             max_requests: Optional[int] = None, tool: str = "codecarbon",
+             output_policy: str = "discard") -> Dict[str, Any]:
+    timings = {s: [] for s in stages}; errors = {s: {} for s in stages}; done = []
+    ticket, lock = itertools.count(), threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def worker() -> None:
+        while time.perf_counter() < deadline:
+            with lock:
+                i = next(ticket)
+            if max_requests is not None and i >= max_requests: return
+            item = corpus[i % len(corpus)]
+            t0 = time.perf_counter()
+            steps = pipeline(item["code"], stages, tool, output_policy)
+            with lock:
+                for name, (dt, err) in steps.items():
+                    timings[name].append(dt)
+                    if err: errors[name][err] = errors[name].get(err, 0) + 1
+                done.append(time.perf_counter() - t0)
+
+    sampler = HostSampler(); sampler.start()
+    t0 = time.perf_counter()
+    threads = [threading.Thread(target=worker, daemon=True) for _ in range(max(1, concurrency))]
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - t0
+    return {"requests": len(done), "elapsed_s": elapsed, "concurrency": max(1, concurrency),
+            "throughput_rps": len(done) / elapsed if elapsed else None,
+            "stages": {s: _stats(timings[s], errors[s]) for s in stages} | {"pipeline": _stats(done, {})},
+            "host": sampler.stop()}
+
+
+def _stats(xs: List[float], errors: Dict[str, int]) -> Dict[str, Any]:
+    xs = sorted(xs)
+    ms = lambda v: None if v is None else v * 1e3
+    return {"count": len(xs), "p50_ms": ms(percentile(xs, .50)), "p95_ms": ms(percentile(xs, .95)),
+            "p99_ms": ms(percentile(xs, .99)), "max_ms": ms(xs[-1] if xs else None),
+            "errors": sum(errors.values()), "error_kinds": errors}
+
+
+def print_report(rep: Dict[str, Any]) -> None:
+    print(f"{rep['requests']} pipelines en {rep['elapsed_s']:.1f} s, {rep['concurrency']} workers : "
+          f"{rep['throughput_rps']:.2f} pipelines/s")
+    f = lambda v: "—".rjust(9) if v is None else f"{v:9.1f}"
+    print(f"{'étape'.ljust(10)}  {'n'.rjust(6)}  {'p50 ms'.rjust(9)}  {'p95 ms'.rjust(9)}  {'p99 ms'.rjust(9)}  "
+          f"{'max ms'.rjust(9)}  erreurs")
+    for name, s in rep["stages"].items():
+        kinds = ", ".join(f"{k} ×{n}" for k, n in s["error_kinds"].items())
+        print(f"{name.ljust(10)}  {str(s['count']).rjust(6)}  {f(s['p50_ms'])}  {f(s['p95_ms'])}  {f(s['p99_ms'])}  "
+              f"{f(s['max_ms'])}  {s['errors'] or ''} {kinds}".rstrip())
+    h = rep["host"]
+    if h:
+        print(f"hôte : CPU moy. {h['cpu_percent_mean']:.0f} % (max {h['cpu_percent_max']:.0f} %, "
+              f"{h['cpu_count']} cœurs) · mémoire moy. {h['mem_percent_mean']:.0f} % (max {h['mem_percent_max']:.0f} %)"
+              f" · RSS max {h['rss_mb_max']:.0f} Mo")
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Test de charge du pipeline analyse/génération (sans navigateur).")
+    ap.add_argument("--corpus", default=None, metavar="SPEC",
+                    help="manifeste .json/.csv ou glob de snippets (défaut : corpus intégré)")
+    ap.add_argument("--concurrency", type=int, default=4, help="workers simultanés")
+    ap.add_argument("--duration", type=float, default=30.0, help="durée de la charge (s)")
+    ap.add_argument("--requests", type=int, default=None, help="arrêt après N pipelines (avant la fin de --duration)")
+    ap.add_argument("--stages", default=",".join(STAGES), help="étapes exécutées (séparées par des virgules)")
+    ap.add_argument("--tool", default="codecarbon", help="backend de l'étape measure")
+    ap.add_argument("--output-policy", default="discard", help="sortie des snippets mesurés (GREEN_OUTPUT)")
+    ap.add_argument("--json", action="store_true", help="rapport JSON au lieu du tableau")
+    ap.add_argument("--out", default=None, help="écrit aussi le rapport JSON dans ce fichier")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    stages = [s.strip() for s in args.stages.split(",") if s.strip()]
+    unknown = sorted(set(stages) - set(STAGES))
+    if unknown:
+        print(f"Étapes inconnues : {', '.join(unknown)}", file=sys.stderr); return 2
+    corpus = load_corpus(args.corpus)
+    if not corpus:
+        print(f"Corpus vide : {args.corpus}", file=sys.stderr); return 2
+    rep = run_load(corpus, stages, args.concurrency, args.duration, args.requests, args.tool, args.output_policy)
+    rep["corpus"] = [c["id"] for c in corpus]
+    if args.out:
+        Path(args.out).write_text(json.dumps(rep, ensure_ascii=False, indent=2), encoding="utf-8")
+    if args.json:
+        print(json.dumps(rep, ensure_ascii=False))
+    else:
+        print_report(rep)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,83 @@
+# bench_ui.py
+"""Latence de rerun de l'app Streamlit (src/app.py) selon la taille de l'historique.
+
+Rejoue le script sans navigateur (streamlit.testing.v1.AppTest) avec N runs
+synthétiques dans l'historique de session, puis chronomètre des reruns
+complets (ce que déclenche tout widget hors fragment). Mesure côté serveur :
+exécution du script + construction des éléments, pas le rendu du navigateur.
+La taille du markdown émis par rerun suit ce que le front doit re-parser.
+
+    python bench_ui.py --sizes 0,100,500 --reruns 20
+"""
+import argparse, json, os, statistics, sys, tempfile, time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent
+APP = ROOT / "src" / "app.py"
+sys.path.insert(0, str(ROOT / "src"))
+
+
+def fake_history(n: int):
+    """Runs synthétiques (code et mesures plausibles) pour peupler la barre latérale."""
+    return [{"tool": ("CodeCarbon", "Eco2AI")[i % 2], "timestamp": f"2024-01-01 00:{i // 60 % 60:02d}:{i % 60:02d}",
+             "code": f"total = 0\nfor i in range({i * 1000}):\n    total += i * i\nprint(total)",
+             "res": {"duration_s": 0.1 + i * 1e-3, "energy_kwh": 1e-6 * (i + 1), "emissions_kg": 5e-8 * (i + 1)}}
+            for i in range(n)]
+
+
+def _markdown_bytes(at) -> int:
+    return sum(len(m.value) for m in at.markdown)  # tout l'arbre, barre latérale comprise
+
+
+def bench(size: int, reruns: int, timeout: float):
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(str(APP), default_timeout=timeout)
+    at.session_state["history"] = fake_history(size)
+    at.run()  # premier run : imports, cache des styles, cartes construites
+    if at.exception:
+        return {"size": size, "error": str(at.exception[0].message)}
+    times = []
+    for _ in range(max(1, reruns)):
+        t0 = time.perf_counter(); at.run(); times.append((time.perf_counter() - t0) * 1e3)
+    times.sort()
+    return {"size": size, "reruns": len(times), "median_ms": statistics.median(times),
+            "p95_ms": times[min(len(times) - 1, int(0.95 * len(times)))], "max_ms": times[-1],
+            "markdown_bytes": _markdown_bytes(at), "sidebar_elements": len(at.sidebar.markdown)}
+
+
+def parse_args(argv=None):
+    ap = argparse.ArgumentParser(description="Latence de rerun de l'app Streamlit selon la taille de l'historique.")
+    ap.add_argument("--sizes", default="0,100,500", help="tailles d'historique (séparées par des virgules)")
+    ap.add_argument("--reruns", type=int, default=20, help="reruns chronométrés par taille")
+    ap.add_argument("--timeout", type=float, default=30.0, help="délai max d'un rerun (s)")
+    ap.add_argument("--json", action="store_true", help="une ligne JSON par taille au lieu du tableau")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    try:
+        import streamlit.testing.v1  # noqa: F401
+    except ImportError:
+        print("streamlit (>= 1.37) requis : pip install -r requirements.txt", file=sys.stderr); return 2
+    # historique persistant isolé : la vue Comparaison ne lit pas celui de l'utilisateur
+    os.environ["GREEN_SINK"] = str(Path(tempfile.mkdtemp(prefix="bench_ui_")) / "history")
+    failures = 0
+    if not args.json:
+        print(f"{'runs'.rjust(6)}  {'médiane ms'.rjust(10)}  {'p95 ms'.rjust(8)}  {'max ms'.rjust(8)}  "
+              f"{'markdown o'.rjust(10)}  éléments barre latérale")
+    for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+        r = bench(size, args.reruns, args.timeout)
+        failures += bool(r.get("error"))
+        if args.json:
+            print(json.dumps(r, ensure_ascii=False), flush=True)
+        elif r.get("error"):
+            print(f"{str(size).rjust(6)}  erreur : {r['error']}")
+        else:
+            print(f"{str(size).rjust(6)}  {r['median_ms']:10.1f}  {r['p95_ms']:8.1f}  {r['max_ms']:8.1f}  "
+                  f"{str(r['markdown_bytes']).rjust(10)}  {r['sidebar_elements']}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,5 +1,5 @@
 # src/carbontracker-api.py
-import sys, os, json, tempfile, traceback, runpy, time, logging, warnings
+import sys, os, tempfile, traceback, runpy, time, logging, warnings
 from pathlib import Path
 
 logging.basicConfig(level=logging.CRITICAL)
@@ -8,24 +8,19 @@ warnings.filterwarnings("ignore")
 
 from carbontracker.tracker import CarbonTracker
 from carbontracker import parser as ct_parser
+from green_assistant import batch, budget, capture, channel, hotspots, intensity, memory, overhead, proctree, sink
+from green_assistant.work import WorkMeter
 
 
-def _dump_and_print(data: dict) -> dict:
-    payload = json.dumps(data, ensure_ascii=False)
-    json_out = os.environ.get("JSON_OUT")
-    if json_out:
-        try:
-            with open(json_out, "w", encoding="utf-8") as f:
-                f.write(payload)
-        except Exception:
-            pass
-    print(payload)
-    return data
-
-
-def run_and_track_file(code_file: str) -> dict:
+def _track(code_file: str) -> tuple[dict, WorkMeter, proctree.TreeSampler, memory.MemoryProfiler]:
     data = {"duration_s": None, "energy_kwh": None, "co2eq_g": None, "emissions_kg": None}
     run_error, err_text = False, ""
+    meter = WorkMeter()
+    tree = proctree.TreeSampler()  # ce process + les enfants lancés par le snippet
+    mem = memory.MemoryProfiler()  # GREEN_TRACEMALLOC=1 : top des allocations
+    out = capture.OutputCapture()  # GREEN_OUTPUT : sortie du snippet bornée
+    bud = budget.Budget.from_env()  # GREEN_BUDGET_* : arrêt d'un snippet qui s'emballe
+    hot = hotspots.Tracer(code_file)  # GREEN_HOTSPOTS=1 : compteurs d'exécution par boucle/ligne
 
     # 1) exécution + logs dans un répertoire temporaire
     log_dir = Path(tempfile.mkdtemp(prefix="ct_logs_"))
@@ -38,9 +33,12 @@ def run_and_track_file(code_file: str) -> dict:
             components="cpu",
         )
         tracker.epoch_start()
+        meter.start(); tree.start(); mem.start()
         try:
-            runpy.run_path(code_file, run_name="__main__")
+            with out, bud.guard(tree), hot:
+                runpy.run_path(code_file, init_globals=meter.globals(), run_name="__main__")
         finally:
+            mem.stop(); tree.stop(); meter.stop()
             tracker.epoch_end()
             tracker.stop()
     except SystemExit:
@@ -83,16 +81,39 @@ def run_and_track_file(code_file: str) -> dict:
     if run_error:
         data["run_error"] = True
         data["stderr"] = err_text.strip()
+    data["output"] = out.to_dict(data.get("duration_s"), data.get("energy_kwh"))
+    budget.attach(data, bud)
+    hotspots.attach(data, hot.result, path=code_file)
+    return data, meter, tree, mem
+
+
+def measure(code_file: str) -> dict:
+    t0 = time.time()
+    data, meter, tree, mem = _track(code_file)
+    t1 = time.time()
+    overhead.process(data, "carbontracker-api", lambda f: _track(f)[0])
+    intensity.annotate(data, t0, t1, samples=tree.energy_samples(data.get("energy_kwh")))
+    proctree.attach(data, tree)
+    memory.attach(data, mem.result)
+    data.update(meter.summarize(data["energy_kwh"], data["duration_s"]))
+    sink.emit(data, "carbontracker-api", code_file, tree)
+    return data
+
 
-    return _dump_and_print(data)
+def run_and_track_file(code_file: str) -> dict:
+    data = measure(code_file)
+    channel.publish(data)
+    return data
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        sys.exit(batch.main(sys.argv[2:], measure))
     if len(sys.argv) < 2:
         print("Usage: python carbontracker-api.py <code_file.py>", file=sys.stderr)
         sys.exit(1)
     p = sys.argv[1]
     if not os.path.exists(p):
-        print(json.dumps({"error": f"File not found: {p}"}))
+        channel.publish({"error": f"File not found: {p}"})
         sys.exit(2)
     run_and_track_file(p)
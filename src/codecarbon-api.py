@@ -1,6 +1,10 @@
-import sys, os, csv, json, tempfile, subprocess, logging, warnings
+import sys, os, csv, tempfile, subprocess, time, logging, warnings
+from contextlib import contextmanager
 from pathlib import Path
 from codecarbon import EmissionsTracker
+from green_assistant import batch, budget, capture, channel, hotspots, intensity, memory, overhead, proctree, sink, trackers, work
+
+SRC_DIR = Path(__file__).resolve().parent
 
 # calmer les logs
 logging.basicConfig(level=logging.CRITICAL)
@@ -13,9 +17,9 @@ def _ffloat(x, default=None):
         return float(x) if x not in (None, "", "None") else default
     except Exception:
         return default
-def measure_file(file_path: str) -> dict:
-    out_dir = Path(tempfile.mkdtemp(prefix="cc_run_"))
-    tracker = EmissionsTracker(
+def _new_tracker(out_dir: Path) -> EmissionsTracker:
+    # profil d'hôte en cache : pays connu => OfflineEmissionsTracker (pas de géoloc)
+    return trackers.codecarbon_tracker(
         output_dir=str(out_dir),
         output_file="emissions.csv",
         measure_power_secs=1,
@@ -23,19 +27,61 @@ def measure_file(file_path: str) -> dict:
         log_level="error",
     )
 
-    run_stderr, returncode = "", 0
-    tracker.start()
+def _from_task(task, data: dict) -> None:
+    """Remplit data depuis l'EmissionsData renvoyé par stop_task() (mode lot)."""
+    data["duration_s"]     = _ffloat(getattr(task, "duration", None))
+    data["energy_kwh"]     = _ffloat(getattr(task, "energy_consumed", None))
+    data["cpu_energy_kwh"] = _ffloat(getattr(task, "cpu_energy", None))
+    data["gpu_energy_kwh"] = _ffloat(getattr(task, "gpu_energy", None))
+    data["ram_energy_kwh"] = _ffloat(getattr(task, "ram_energy", None))
+    data["cpu_power_w"]    = _ffloat(getattr(task, "cpu_power", None))
+    data["gpu_power_w"]    = _ffloat(getattr(task, "gpu_power", None))
+    data["ram_power_w"]    = _ffloat(getattr(task, "ram_power", None))
+    data["emissions_kg"]   = _ffloat(getattr(task, "emissions", None), data["emissions_kg"])
+
+def _track(file_path: str, shared: EmissionsTracker | None = None):
+    """Mesure brute : (résultat, état WorkMeter du runner enfant, échantillonneur de l'arbre).
+
+    ``shared`` : tracker du lot (--batch), mesuré par tâche au lieu d'être recréé.
+    """
+    out_dir = Path(tempfile.mkdtemp(prefix="cc_run_"))
+    tracker = shared or _new_tracker(out_dir)
+
+    # le snippet tourne via green_assistant.runner (hooks report_work / phase)
+    work_out = out_dir / "work.json"
+    env = os.environ.copy()
+    env["GREEN_WORK_OUT"] = str(work_out)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH")]))
+
+    run_stderr, returncode, task, tree = "", 0, None, None
+    out = capture.ChildOutput()  # GREEN_OUTPUT : sortie bornée, jamais tout en mémoire
+    bud = budget.Budget.from_env()  # GREEN_BUDGET_* (temps, CPU, énergie) : remplace l'ancien timeout fixe
+    if shared: tracker.start_task(Path(file_path).name)
+    else: tracker.start()
     try:
-        p = subprocess.run([sys.executable, file_path], capture_output=True, text=True, timeout=120)
+        p = subprocess.Popen([sys.executable, "-m", "green_assistant.runner", file_path],
+                             env=env, **out.popen_kwargs())
+        out.start(p)
+        tree = proctree.TreeSampler(p.pid).start()  # snippet + multiprocessing/subprocess
+        bud.watch(tree, lambda: proctree.kill_tree(p.pid))  # vérifié à chaque échantillon
+        p.wait()
+        bud.stop()
+        out.join(tree=tree)
+        tree.stop()
         returncode = p.returncode
-        run_stderr = (p.stderr or "").strip()
+        run_stderr = out.stderr.strip()
     finally:
-        emissions_kg_stop = tracker.stop() or 0.0
+        if shared:
+            task = tracker.stop_task()
+            emissions_kg_stop = getattr(task, "emissions", None)
+        else:
+            emissions_kg_stop = tracker.stop() or 0.0
 
     data = {
         "emissions_kg": float(emissions_kg_stop) if emissions_kg_stop is not None else None,
         "stderr": run_stderr if returncode != 0 else "",
         "returncode": returncode,
+        "output": out.to_dict(),
         "duration_s": None,
         "energy_kwh": None,
         "cpu_energy_kwh": None, "gpu_energy_kwh": None, "ram_energy_kwh": None,
@@ -43,6 +89,11 @@ def measure_file(file_path: str) -> dict:
         "country_name": None, "country_iso_code": None, "region": None, "cloud_provider": None,
     }
 
+    budget.attach(data, bud)
+    if task is not None:
+        _from_task(task, data)
+        return data, work.load(work_out), tree
+
     # parse emissions.csv
     try:
         csv_path = out_dir / "emissions.csv"
@@ -62,21 +113,50 @@ def measure_file(file_path: str) -> dict:
                 csv_emis = _ffloat(last.get("emissions"))
                 if csv_emis is not None:
                     data["emissions_kg"] = csv_emis
+                for k in ("country_name", "country_iso_code", "region", "cloud_provider"):
+                    data[k] = last.get(k) or None
+                trackers.remember_codecarbon_row(last)
     except Exception:
         pass
 
-    payload = json.dumps(data, ensure_ascii=False)
-    json_out = os.environ.get("JSON_OUT")
-    if json_out:
-        try:
-            with open(json_out, "w", encoding="utf-8") as f:
-                f.write(payload)
-        except Exception:
-            pass
-    print(payload)
+    return data, work.load(work_out), tree
+
+def measure(file_path: str, shared: EmissionsTracker | None = None) -> dict:
+    t0 = time.time()
+    data, w, tree = _track(file_path, shared)
+    t1 = time.time()
+    backend = "codecarbon-api:task" if shared else "codecarbon-api"
+    overhead.process(data, backend, lambda f: _track(f, shared)[0])
+    intensity.annotate(data, t0, t1, samples=tree.energy_samples(data.get("energy_kwh")) if tree else None)
+    if tree: proctree.attach(data, tree)
+    memory.attach(data, (w or {}).get("memory"))
+    hotspots.attach(data, (w or {}).get("hotspots"), path=file_path)
+    if w:
+        data.update(work.summarize(w, data["energy_kwh"], data["duration_s"]))
+    sink.emit(data, backend, file_path, tree)
+    return data
+
+@contextmanager
+def _batch_session():
+    """Un seul EmissionsTracker pour tout le lot (start_task/stop_task)."""
+    tracker = _new_tracker(Path(tempfile.mkdtemp(prefix="cc_batch_")))
+    if not hasattr(tracker, "start_task"):  # codecarbon trop ancien
+        yield measure
+        return
+    try:
+        yield lambda f: measure(f, tracker)
+    finally:
+        try: tracker.stop()
+        except Exception: pass
+
+def measure_file(file_path: str) -> dict:
+    data = measure(file_path)
+    channel.publish(data)
     return data
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        sys.exit(batch.main(sys.argv[2:], measure, _batch_session))
     if len(sys.argv) < 2:
         print("Usage: python codecarbon-api.py <code_file.py>", file=sys.stderr); sys.exit(1)
     measure_file(sys.argv[1])
@@ -1,6 +1,8 @@
-import sys, os, csv, json, tempfile, traceback, runpy, logging, warnings
+import sys, os, csv, tempfile, time, traceback, runpy, logging, warnings
 from pathlib import Path
 import eco2ai
+from green_assistant import batch, budget, capture, channel, hotspots, intensity, memory, overhead, proctree, sink, trackers
+from green_assistant.work import WorkMeter
 
 # calmer logs
 logging.basicConfig(level=logging.CRITICAL)
@@ -18,22 +20,32 @@ def _pick(row: dict, *names):
             return row[n]
     return None
 
-def run_and_track_file(code_file: str) -> dict:
+def _track(code_file: str) -> tuple[dict, WorkMeter, proctree.TreeSampler, memory.MemoryProfiler]:
     out_dir = Path(tempfile.mkdtemp(prefix="eco2ai_"))
     csv_path = out_dir / "emissions.csv"
     tracker = eco2ai.Tracker(project_name="GreenAssistant",
                              experiment_description="VSCode Eco2AI run",
-                             file_name=str(csv_path))
+                             file_name=str(csv_path),
+                             **trackers.eco2ai_kwargs())
     run_error, err_text = False, ""
+    meter = WorkMeter()
+    tree = proctree.TreeSampler()  # ce process + les enfants lancés par le snippet
+    mem = memory.MemoryProfiler()  # GREEN_TRACEMALLOC=1 : top des allocations
+    out = capture.OutputCapture()  # GREEN_OUTPUT : sortie du snippet bornée
+    bud = budget.Budget.from_env()  # GREEN_BUDGET_* : arrêt d'un snippet qui s'emballe
+    hot = hotspots.Tracer(code_file)  # GREEN_HOTSPOTS=1 : compteurs d'exécution par boucle/ligne
     tracker.start()
+    meter.start(); tree.start(); mem.start()
     try:
-        runpy.run_path(code_file, run_name="__main__")
+        with out, bud.guard(tree), hot:
+            runpy.run_path(code_file, init_globals=meter.globals(), run_name="__main__")
     except SystemExit:
         pass
     except Exception:
         run_error = True
         err_text = traceback.format_exc()
     finally:
+        mem.stop(); tree.stop(); meter.stop()
         tracker.stop()
 
     data = {"duration_s": None, "energy_kwh": None, "co2eq_g": None, "emissions_kg": None, "country": None}
@@ -58,22 +70,34 @@ def run_and_track_file(code_file: str) -> dict:
     if run_error:
         data["run_error"] = True
         data["stderr"] = err_text.strip()
+    data["output"] = out.to_dict(data.get("duration_s"), data.get("energy_kwh"))
+    budget.attach(data, bud)
+    hotspots.attach(data, hot.result, path=code_file)
+    return data, meter, tree, mem
+
+def measure(code_file: str) -> dict:
+    t0 = time.time()
+    data, meter, tree, mem = _track(code_file)
+    t1 = time.time()
+    overhead.process(data, "eco2ai-api", lambda f: _track(f)[0])
+    intensity.annotate(data, t0, t1, samples=tree.energy_samples(data.get("energy_kwh")))
+    proctree.attach(data, tree)
+    memory.attach(data, mem.result)
+    data.update(meter.summarize(data["energy_kwh"], data["duration_s"]))
+    sink.emit(data, "eco2ai-api", code_file, tree)
+    return data
 
-    payload = json.dumps(data, ensure_ascii=False)
-    json_out = os.environ.get("JSON_OUT")
-    if json_out:
-        try:
-            with open(json_out, "w", encoding="utf-8") as f:
-                f.write(payload)
-        except Exception:
-            pass
-    print(payload)
+def run_and_track_file(code_file: str) -> dict:
+    data = measure(code_file)
+    channel.publish(data)
     return data
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        sys.exit(batch.main(sys.argv[2:], measure))
     if len(sys.argv) < 2:
         print("Usage: python eco2ai-api.py <code_file.py>", file=sys.stderr); sys.exit(1)
     p = sys.argv[1]
     if not os.path.exists(p):
-        print(json.dumps({"error": f"File not found: {p}"})); sys.exit(2)
+        channel.publish({"error": f"File not found: {p}"}); sys.exit(2)
     run_and_track_file(p)
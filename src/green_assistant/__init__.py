@@ -0,0 +1,2 @@
+"""Green Assistant — briques communes (bench, mesures, analyse) partagées par
+bench_all.py, les scripts *-api.py et l'app Streamlit."""
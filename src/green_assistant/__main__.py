@@ -0,0 +1,5 @@
+import sys
+
+from green_assistant.cli import main
+
+sys.exit(main())
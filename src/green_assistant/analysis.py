@@ -0,0 +1,192 @@
+# src/green_assistant/analysis.py
+"""Analyse statique d'un snippet : langage, frameworks, motifs énergivores, recos.
+
+Sans dépendance (regex, ast) : importé par l'app Streamlit et par la CLI
+(``python -m green_assistant analyse``), qui doit démarrer vite.
+``locate_smells_python`` donne les mêmes motifs avec leur ligne, pour les
+croiser avec les compteurs d'exécution (green_assistant.hotspots).
+"""
+from __future__ import annotations
+import ast, re, traceback
+from typing import Any, Dict, List, Optional, Tuple
+
+from green_assistant.dataframes import detect as detect_pandas_smells
+from green_assistant.memoize import detect as detect_memo_smells
+
+
+def detect_language(code: str) -> str:
+    # Python (``import x from "y"`` est de l'ES module, pas du Python)
+    if re.search(r"^\s*(?:import\s+[\w.]+(?:\s+as\s+\w+)?\s*(?:,|#|$)|from\s+[\w.]+\s+import\b)", code, re.M) \
+            or re.search(r"\bdef\s+\w+\s*\(", code):
+        return "python"
+    # JavaScript
+    if re.search(r"\bfunction\s+\w+\s*\(", code) or re.search(r"=>\s*{", code) \
+            or re.search(r"\brequire\(\s*['\"]|\bconsole\.log\(|^\s*(?:const|let|var)\s+\w+\s*=|^\s*import\s.+\sfrom\s+['\"]", code, re.M):
+        return "javascript"
+    return "unknown"
+
+
+def detect_frameworks_python(code: str) -> List[str]:
+    libs = ["numpy", "pandas", "torch", "tensorflow", "requests", "multiprocessing", "asyncio"]
+    return [lib for lib in libs if re.search(rf"\b(?:import|from)\s+{lib}\b", code)]
+
+
+def _has_sleep_in_loop(code: str) -> bool:
+    rg = re.compile(r"(^[ \t]*for\s+\w+\s+in\s+range\s*\([^)]*\):)([\s\S]*?)(?=^[^\s]|$)", re.M)
+    for m in rg.finditer(code):
+        if re.search(r"\n[ \t]+time\.sleep\s*\(", m.group(2)): return True
+    return False
+
+
+def detect_energy_smells_python(code: str) -> List[str]:
+    smells: List[str] = []
+    if _has_sleep_in_loop(code): smells.append("sleep_dans_boucle")
+    if re.search(r"for\s+\w+\s+in\s+range\s*\([^)]*\):[\s\S]*?(?:open\(|read\(|write\()", code): smells.append("IO_dans_boucle")
+    if re.search(r"for\s+\w+\s+in\s+range\s*\([^)]*\):[\s\S]*?\w+\s*\+=\s*['\"]", code): smells.append("concat_string_dans_boucle")
+    if re.search(r"for[\s\S]*?for", code): smells.append("boucles_imbriquees")
+    if re.search(r"\b(?:import|from)\s+numpy\b", code) and re.search(r"for\s+.*:\s*[\s\S]*\+=", code): smells.append("non_vectorise_alors_numpy_dispo")
+    if re.search(r"requests\.(?:get|post|put|delete|patch|head)\(", code) and re.search(r"\bfor\s+", code): smells.append("requetes_repetitives_sequentielles")
+    smells += detect_memo_smells(code)  # AST : fonctions pures, invariants de boucle
+    smells += detect_pandas_smells(code)  # AST : boucles Pandas ligne par ligne
+    return smells
+
+
+LOOPS = (ast.For, ast.AsyncFor, ast.While)
+_IO_CALLS = {"open", "read", "write", "readline", "readlines", "writelines"}
+_HTTP_VERBS = {"get", "post", "put", "delete", "patch", "head"}
+
+
+def _dotted(node: ast.AST) -> str:
+    if isinstance(node, ast.Name): return node.id
+    if isinstance(node, ast.Attribute): return f"{_dotted(node.value)}.{node.attr}"
+    return ""
+
+
+def _loop_body(loop: ast.AST):
+    """Nœuds du corps d'une boucle, sans descendre dans les fonctions/classes définies dedans."""
+    stack = list(loop.body) + list(getattr(loop, "orelse", []))
+    while stack:
+        n = stack.pop()
+        yield n
+        if not isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            stack.extend(ast.iter_child_nodes(n))
+
+
+def loop_spans(tree: ast.AST) -> List[Tuple[int, int]]:
+    """(ligne d'en-tête, dernière ligne) de chaque boucle."""
+    return [(n.lineno, n.end_lineno or n.lineno) for n in ast.walk(tree) if isinstance(n, LOOPS)]
+
+
+def locate_smells_python(code: str) -> List[Dict[str, Any]]:
+    """Motifs liés aux boucles, localisés : ``{"smell", "line", "loop_line"}`` (boucle la plus interne)."""
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    numpy = bool(re.search(r"\b(?:import|from)\s+numpy\b", code))
+    found: Dict[Tuple[str, int], Dict[str, Any]] = {}
+
+    def add(smell: str, node: ast.AST, loop: ast.AST) -> None:
+        found.setdefault((smell, loop.lineno), {"smell": smell, "line": node.lineno, "loop_line": loop.lineno})
+
+    loops = [n for n in ast.walk(tree) if isinstance(n, LOOPS)]
+    inner_of = {}  # nœud -> boucle la plus interne qui le contient
+    for loop in sorted(loops, key=lambda n: (n.lineno, -(n.end_lineno or 0))):  # externes d'abord
+        for n in _loop_body(loop):
+            inner_of[n] = loop
+    for n, loop in inner_of.items():
+        if isinstance(n, LOOPS):
+            add("boucles_imbriquees", n, n)
+        elif isinstance(n, ast.Call):
+            name = _dotted(n.func)
+            if name == "time.sleep" or name == "sleep": add("sleep_dans_boucle", n, loop)
+            elif name.split(".")[-1] in _IO_CALLS: add("IO_dans_boucle", n, loop)
+            elif name.startswith("requests.") and name.split(".")[-1] in _HTTP_VERBS:
+                add("requetes_repetitives_sequentielles", n, loop)
+        elif isinstance(n, ast.AugAssign) and isinstance(n.op, ast.Add):
+            if isinstance(n.value, ast.JoinedStr) or (isinstance(n.value, ast.Constant) and isinstance(n.value.value, str)):
+                add("concat_string_dans_boucle", n, loop)
+            elif numpy:
+                add("non_vectorise_alors_numpy_dispo", n, loop)
+    return sorted(found.values(), key=lambda f: (f["line"], f["smell"]))
+
+
+# ───────────────────────────── JavaScript ─────────────────────────────
+JS_LOOP = re.compile(r"\b(?P<kw>for|while)\s*\((?:[^()]|\([^()]*\))*\)\s*\{|\.(?P<cb>forEach|map|reduce)\s*\(")
+_JS_CLOSE = {"{": "}", "(": ")"}
+
+
+def _js_block(code: str, start: int) -> str:
+    """Texte de ``code[start]`` (``{`` ou ``(``) à la fermeture correspondante (chaînes ignorées)."""
+    stack, i, quote = [code[start]], start + 1, None
+    while i < len(code) and stack:
+        c = code[i]
+        if quote:
+            if c == "\\": i += 1
+            elif c == quote: quote = None
+        elif c in "'\"`": quote = c
+        elif c in _JS_CLOSE: stack.append(c)
+        elif c in ")}" and _JS_CLOSE[stack[-1]] == c: stack.pop()
+        i += 1
+    return code[start:i]
+
+
+def _js_loops(code: str) -> List[Tuple[str, str]]:
+    """(mot-clé, corps) des boucles for/while et des callbacks forEach/map/reduce."""
+    return [(m.group("kw") or m.group("cb"), _js_block(code, m.end() - 1)) for m in JS_LOOP.finditer(code)]
+
+
+def detect_energy_smells_js(code: str) -> List[str]:
+    smells: List[str] = []
+    loops = _js_loops(code)
+    if any(re.search(r"\b\w+Sync\s*\(", body) for _, body in loops): smells.append("fs_sync_dans_boucle")
+    if any(re.search(r"\b(\w+)\s*\+=\s*[`'\"]|\b(\w+)\s*=\s*\2\s*\+\s*[`'\"]", body) for _, body in loops):
+        smells.append("concat_string_dans_boucle_js")
+    # for (…) { await … } : une promesse à la fois (for await…of et callbacks forEach exclus)
+    if any(kw in ("for", "while") and re.search(r"\bawait\b", body) for kw, body in loops):
+        smells.append("await_sequentiel_dans_boucle")
+    return smells
+
+
+def detect_energy_smells(code: str, lang: Optional[str] = None) -> List[str]:
+    """Motifs statiques selon le langage (Python ou JavaScript)."""
+    lang = lang or detect_language(code)
+    if lang == "python": return detect_energy_smells_python(code)
+    if lang == "javascript": return detect_energy_smells_js(code)
+    return []
+
+
+def suggestions_for(smells: List[str], frameworks: List[str]) -> List[str]:
+    s: List[str] = []
+    if "non_vectorise_alors_numpy_dispo" in smells: s.append("Vectoriser avec NumPy (np.dot, np.sum, broadcasting).")
+    if "sleep_dans_boucle" in smells: s.append("Éviter time.sleep() dans les boucles ; utiliser un scheduler/événements.")
+    if "IO_dans_boucle" in smells: s.append("Regrouper les I/O hors boucle (bufferisation, lecture/écriture en bloc).")
+    if "concat_string_dans_boucle" in smells: s.append("Utiliser ''.join() ou io.StringIO plutôt que s += ... en boucle.")
+    if "requetes_repetitives_sequentielles" in smells: s.append("Mutualiser (requests.Session) + paralléliser (asyncio/threading) avec throttling.")
+    if "allocations_intensives" in smells: s.append("Réduire les objets temporaires : générateurs, compréhensions, réutilisation de buffers, NumPy.")
+    if "gc_complet_repete" in smells: s.append("Limiter les gros graphes d’objets vivants (tuples/slots, tableaux) pour éviter les collectes complètes.")
+    if "pic_memoire_eleve" in smells: s.append("Traiter les données par morceaux (chunks, itérateurs) plutôt que tout charger en mémoire.")
+    if "croissance_quadratique" in smells: s.append("Coût mesuré en O(n²) : remplacer les boucles imbriquées par un dict/set, un tri ou une jointure.")
+    if "boucle_chaude" in smells: s.append("Boucle la plus exécutée : sortir les invariants, vectoriser ou mettre en cache ce qu'elle recalcule.")
+    if "recursion_sans_cache" in smells: s.append("Fonction pure récursive recalculant les mêmes valeurs : @functools.lru_cache (taille bornée).")
+    if "appel_pur_repete" in smells: s.append("Fonction pure coûteuse appelée en boucle : mettre ses résultats en cache (lru_cache).")
+    if "invariant_dans_boucle" in smells: s.append("Calcul identique à chaque itération : le sortir de la boucle.")
+    if "accumulation_iterrows" in smells: s.append("Remplacer iterrows()/itertuples() par des opérations sur les colonnes (df[\"a\"] * df[\"b\"]).sum().")
+    if "apply_ligne_par_ligne" in smells: s.append("apply(axis=1) appelle Python à chaque ligne : écrire l'expression sur les colonnes (np.where pour les conditions).")
+    if "affectation_chainee_boucle" in smells: s.append("df[col][i] = … en boucle : une seule affectation de colonne (et l'écriture chaînée est ignorée en copy-on-write).")
+    if "concat_dans_boucle" in smells: s.append("pd.concat en boucle recopie tout à chaque tour : collecter les morceaux dans une liste, un seul concat à la fin.")
+    if "fs_sync_dans_boucle" in smells: s.append("fs.*Sync en boucle bloque la boucle d'événements : fs.promises + Promise.all, ou un flux (createWriteStream).")
+    if "concat_string_dans_boucle_js" in smells: s.append("Accumuler les morceaux dans un tableau puis parts.join('') plutôt que s += … en boucle.")
+    if "await_sequentiel_dans_boucle" in smells: s.append("await dans une boucle sérialise les appels : Promise.all (ou un pool borné) sur les promesses.")
+    if "memoire_retenue" in smells: s.append("Libérer les structures inutiles (del, portée locale) et éviter les caches non bornés.")
+    if "pandas" in frameworks: s.append("Préférer les opérations Pandas vectorisées à apply/itertuples.")
+    return s
+
+
+def preflight_compile(code: str) -> Tuple[bool, Optional[str]]:
+    """Vérifie la validité syntaxique AVANT exécution"""
+    try:
+        compile(code, "<snippet>", "exec")
+        return True, None
+    except Exception:
+        return False, traceback.format_exc()
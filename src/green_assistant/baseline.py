@@ -0,0 +1,164 @@
+# src/green_assistant/baseline.py
+"""Stockage des baselines de bench et détection de régressions (énergie / durée)."""
+from __future__ import annotations
+import json, math, os, time
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+STORE_VERSION = 1
+DEFAULT_METRICS = ("energy_kwh", "duration_s")
+MAX_SAMPLES = 50  # on garde les N derniers échantillons par (cible, outil)
+
+
+# ───────────────────────────── Store ─────────────────────────────
+def load_store(path: str | Path) -> Dict[str, Any]:
+    p = Path(path)
+    if not p.exists():
+        return {"version": STORE_VERSION, "targets": {}}
+    with p.open("r", encoding="utf-8") as f:
+        store = json.load(f)
+    store.setdefault("version", STORE_VERSION)
+    store.setdefault("targets", {})
+    return store
+
+
+def save_store(path: str | Path, store: Dict[str, Any]) -> None:
+    """Écriture atomique (tmp + replace) pour ne jamais laisser un store tronqué."""
+    p = Path(path)
+    p.parent.mkdir(parents=True, exist_ok=True)
+    tmp = p.with_suffix(p.suffix + ".tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(store, f, ensure_ascii=False, indent=2, sort_keys=True, allow_nan=False)
+        f.write("\n")
+    os.replace(tmp, p)
+
+
+def get_samples(store: Dict[str, Any], target: str, tool: str) -> List[Dict[str, Any]]:
+    return list(((store.get("targets") or {}).get(target) or {}).get(tool, {}).get("samples") or [])
+
+
+def record(store: Dict[str, Any], target: str, tool: str, results: Sequence[Dict[str, Any]],
+           metrics: Sequence[str] = DEFAULT_METRICS, replace: bool = True) -> int:
+    """Enregistre les résultats valides (sans erreur) comme baseline. Renvoie le nb retenu."""
+    samples = [{m: (r.get(m) if _finite(r.get(m)) else None) for m in metrics} for r in results if is_valid(r, metrics)]
+    if not samples:
+        return 0
+    entry = store["targets"].setdefault(target, {}).setdefault(tool, {"samples": []})
+    entry["samples"] = (samples if replace else entry.get("samples", []) + samples)[-MAX_SAMPLES:]
+    entry["recorded_at"] = time.strftime("%Y-%m-%dT%H:%M:%S")
+    return len(samples)
+
+
+def is_valid(res: Dict[str, Any], metrics: Sequence[str] = DEFAULT_METRICS) -> bool:
+    if res.get("error") or res.get("run_error"):
+        return False
+    return any(_finite(res.get(m)) for m in metrics)
+
+
+def _finite(v: Any) -> bool:
+    return isinstance(v, (int, float)) and math.isfinite(v)
+
+
+# ───────────────────────────── Stats ─────────────────────────────
+def _mean_var(xs: Sequence[float]) -> Tuple[float, float]:
+    n = len(xs)
+    m = sum(xs) / n
+    v = sum((x - m) ** 2 for x in xs) / (n - 1) if n > 1 else 0.0
+    return m, v
+
+
+def _betacf(a: float, b: float, x: float) -> float:
+    """Fraction continue de la bêta incomplète (Numerical Recipes, Lentz)."""
+    tiny, qab, qap, qam = 1e-300, a + b, a + 1.0, a - 1.0
+    c, d = 1.0, 1.0 - qab * x / qap
+    d = 1.0 / (d if abs(d) > tiny else tiny)
+    h = d
+    for m in range(1, 201):
+        m2 = 2 * m
+        aa = m * (b - m) * x / ((qam + m2) * (a + m2))
+        d = 1.0 + aa * d; d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c; c = c if abs(c) > tiny else tiny
+        h *= d * c
+        aa = -(a + m) * (qab + m) * x / ((a + m2) * (qap + m2))
+        d = 1.0 + aa * d; d = 1.0 / (d if abs(d) > tiny else tiny)
+        c = 1.0 + aa / c; c = c if abs(c) > tiny else tiny
+        delta = d * c
+        h *= delta
+        if abs(delta - 1.0) < 1e-12:
+            break
+    return h
+
+
+def _betai(a: float, b: float, x: float) -> float:
+    """Bêta incomplète régularisée I_x(a, b)."""
+    if x <= 0.0: return 0.0
+    if x >= 1.0: return 1.0
+    lbt = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a * math.log(x) + b * math.log(1.0 - x)
+    if x < (a + 1.0) / (a + b + 2.0):
+        return math.exp(lbt) * _betacf(a, b, x) / a
+    return 1.0 - math.exp(lbt) * _betacf(b, a, 1.0 - x) / b
+
+
+def welch_t_test(base: Sequence[float], cur: Sequence[float]) -> Tuple[Optional[float], Optional[float]]:
+    """Test de Welch unilatéral (H1 : mean(cur) > mean(base)). Renvoie (t, p) ou (None, None).
+    Variances nulles des deux côtés : (None, p), t n'étant pas défini (pas d'Infinity en JSON)."""
+    if len(base) < 2 or len(cur) < 2:
+        return None, None
+    mb, vb = _mean_var(base); mc, vc = _mean_var(cur)
+    se2 = vb / len(base) + vc / len(cur)
+    if se2 <= 0.0:
+        # variances nulles : différence certaine (ou aucune)
+        return None, (0.0 if mc > mb else 1.0 if mc < mb else 0.5)
+    t = (mc - mb) / math.sqrt(se2)
+    df = se2 ** 2 / ((vb / len(base)) ** 2 / (len(base) - 1) + (vc / len(cur)) ** 2 / (len(cur) - 1))
+    tail = 0.5 * _betai(df / 2.0, 0.5, df / (df + t * t))
+    return t, (tail if t > 0 else 1.0 - tail)
+
+
+# ───────────────────────────── Comparaison ─────────────────────────────
+def compare_metric(base: Sequence[float], cur: Sequence[float], threshold: float, alpha: float) -> Dict[str, Any]:
+    """Régression = hausse relative > threshold ET (significative à alpha si on a ≥2 échantillons de chaque côté).
+    Baseline nulle : rel_change = None (zero_baseline), toute hausse compte comme au-delà du seuil."""
+    mb = sum(base) / len(base); mc = sum(cur) / len(cur)
+    zero_baseline = mb == 0 and mc > 0
+    rel = None if zero_baseline else ((mc - mb) / mb if mb else 0.0)
+    t, p = welch_t_test(base, cur)
+    significant = (p < alpha) if p is not None else None
+    regression = (zero_baseline or rel > threshold) and significant is not False
+    return {
+        "baseline_mean": mb, "current_mean": mc, "rel_change": rel, "zero_baseline": zero_baseline,
+        "n_baseline": len(base), "n_current": len(cur),
+        "t": t, "zero_variance": t is None and p is not None,
+        "p_value": p, "significant": significant, "regression": regression,
+    }
+
+
+def compare(store: Dict[str, Any], target: str, tool: str, results: Sequence[Dict[str, Any]],
+            metrics: Sequence[str] = DEFAULT_METRICS, threshold: float = 0.10, alpha: float = 0.05) -> Dict[str, Any]:
+    base = get_samples(store, target, tool)
+    entry: Dict[str, Any] = {"target": target, "tool": tool, "status": "ok", "metrics": {}}
+    if not base:
+        entry["status"] = "no_baseline"
+        return entry
+    valid = [r for r in results if is_valid(r, metrics)]
+    if not valid:
+        entry["status"] = "no_result"
+        return entry
+    for m in metrics:
+        b = [float(s[m]) for s in base if _finite(s.get(m))]
+        c = [float(r[m]) for r in valid if _finite(r.get(m))]
+        if b and c:
+            entry["metrics"][m] = compare_metric(b, c, threshold, alpha)
+    if any(v["regression"] for v in entry["metrics"].values()):
+        entry["status"] = "regression"
+    return entry
+
+
+def summarize(entries: Sequence[Dict[str, Any]], threshold: float, alpha: float) -> Dict[str, Any]:
+    """Diff lisible par machine (écrit par bench_all.py --diff-out)."""
+    return {
+        "version": STORE_VERSION,
+        "threshold": threshold, "alpha": alpha,
+        "regressions": sum(1 for e in entries if e["status"] == "regression"),
+        "entries": list(entries),
+    }
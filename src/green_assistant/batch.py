@@ -0,0 +1,124 @@
+# src/green_assistant/batch.py
+"""Mesure en lot : un manifeste (JSON/CSV) ou un glob -> un flux NDJSON.
+
+Utilisé par les scripts *-api.py via ``--batch`` : l'interpréteur et le
+backend ne sont initialisés qu'une fois, puis chaque script est mesuré à son
+tour (dans le process courant, ou dans un worker forké avec ``--isolate``).
+
+Manifeste JSON : ``["a.py", "b.py"]`` ou ``[{"id": "s1", "path": "a.py"}, ...]``
+(éventuellement sous une clé ``"scripts"``). CSV : colonnes ``path`` et ``id``
+(optionnelle). Les chemins relatifs sont résolus depuis le manifeste.
+"""
+from __future__ import annotations
+import argparse, contextlib, csv, glob, json, multiprocessing as mp, os, sys, time, traceback
+from pathlib import Path
+from typing import Any, Callable, ContextManager, Dict, IO, Iterator, List, Optional
+
+Measure = Callable[[str], Dict[str, Any]]
+
+
+def iter_targets(spec: str) -> List[Dict[str, str]]:
+    p = Path(spec)
+    if p.suffix.lower() == ".json" and p.is_file():
+        with p.open("r", encoding="utf-8") as f:
+            raw = json.load(f)
+        if isinstance(raw, dict):
+            raw = raw.get("scripts") or []
+        items = [{"path": r} if isinstance(r, str) else dict(r) for r in raw]
+        return [_normalize(it, p.parent) for it in items if it.get("path")]
+    if p.suffix.lower() == ".csv" and p.is_file():
+        with p.open("r", encoding="utf-8", newline="") as f:
+            rows = list(csv.DictReader(f))
+        return [_normalize(r, p.parent) for r in rows if (r.get("path") or "").strip()]
+    return [{"id": m, "path": str(Path(m).resolve())} for m in sorted(glob.glob(spec, recursive=True))
+            if Path(m).is_file()]
+
+
+def _normalize(item: Dict[str, Any], base: Path) -> Dict[str, str]:
+    path = Path(str(item["path"]).strip())
+    if not path.is_absolute():
+        path = base / path
+    return {"id": str(item.get("id") or item["path"]).strip(), "path": str(path.resolve())}
+
+
+# ───────────────────────────── Exécution ─────────────────────────────
+def _child(measure: Measure, path: str, conn) -> None:
+    try:
+        res = measure(path)
+    except BaseException:
+        res = {"error": "batch_worker", "stderr": traceback.format_exc()}
+    conn.send(res); conn.close()
+
+
+def _measure_isolated(measure: Measure, path: str) -> Dict[str, Any]:
+    """Un process par script : l'état global d'un snippet ne fuit pas sur le suivant.
+    fork (POSIX) garde les imports du parent chauds ; spawn sinon."""
+    ctx = mp.get_context("fork" if "fork" in mp.get_all_start_methods() else "spawn")
+    rx, tx = ctx.Pipe(duplex=False)
+    proc = ctx.Process(target=_child, args=(measure, path, tx), daemon=True)
+    proc.start(); tx.close()
+    try:
+        res = rx.recv()
+    except EOFError:
+        res = {"error": "batch_worker", "stderr": "worker terminé sans résultat"}
+    proc.join()
+    if proc.exitcode not in (0, None) and not res.get("error"):
+        res["worker_exitcode"] = proc.exitcode
+    return res
+
+
+def run_batch(targets: List[Dict[str, str]], measure: Measure, out: IO[str], isolate: bool = False) -> int:
+    """Mesure chaque cible et écrit une ligne JSON par résultat. Renvoie le nb d'échecs."""
+    failures = 0
+    for t in targets:
+        t0 = time.perf_counter()
+        if not os.path.exists(t["path"]):
+            res: Dict[str, Any] = {"error": f"File not found: {t['path']}"}
+        else:
+            # la sortie du snippet part sur stderr : stdout reste du NDJSON pur
+            with contextlib.redirect_stdout(sys.stderr):
+                try:
+                    res = _measure_isolated(measure, t["path"]) if isolate else measure(t["path"])
+                except Exception:
+                    res = {"error": "batch_measure", "stderr": traceback.format_exc()}
+        if res.get("error") or res.get("run_error"):
+            failures += 1
+        out.write(json.dumps({"id": t["id"], "path": t["path"], "batch_wall_s": time.perf_counter() - t0, **res},
+                             ensure_ascii=False) + "\n")
+        out.flush()
+    return failures
+
+
+def main(argv: List[str], measure: Measure,
+         session: Optional[Callable[[], ContextManager[Measure]]] = None) -> int:
+    """CLI commune : ``<tool>-api.py --batch SPEC [--isolate] [--out results.ndjson]``.
+
+    ``session`` (optionnel) ouvre un backend partagé par tout le lot et fournit
+    la fonction de mesure liée ; ignoré avec ``--isolate``.
+    """
+    ap = argparse.ArgumentParser(prog="--batch", description="Mesure en lot (NDJSON).")
+    ap.add_argument("spec", help="manifeste .json/.csv ou glob (ex: 'submissions/**/*.py')")
+    ap.add_argument("--isolate", action="store_true", help="un worker par script")
+    ap.add_argument("--out", default="-", help="fichier NDJSON (défaut : stdout)")
+    args = ap.parse_args(argv)
+
+    targets = iter_targets(args.spec)
+    if not targets:
+        print(f"Aucun script pour : {args.spec}", file=sys.stderr)
+        return 2
+    with _open_out(args.out) as out:
+        if session is None or args.isolate:
+            failures = run_batch(targets, measure, out, isolate=args.isolate)
+        else:
+            with session() as bound:
+                failures = run_batch(targets, bound, out)
+    return 1 if failures else 0
+
+
+@contextlib.contextmanager
+def _open_out(dest: str) -> Iterator[IO[str]]:
+    if dest == "-":
+        yield sys.stdout
+        return
+    with open(dest, "a", encoding="utf-8") as f:
+        yield f
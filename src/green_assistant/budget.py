@@ -0,0 +1,202 @@
+# src/green_assistant/budget.py
+"""Budgets par run (temps, CPU, énergie) et arrêt des mesures qui s'emballent.
+
+Limites (0 ou vide = pas de limite) :
+
+    GREEN_BUDGET_WALL_S   temps réel (défaut 120 s, l'ancien timeout de codecarbon-api.py)
+    GREEN_BUDGET_CPU_S    temps CPU de l'arbre de process du snippet
+    GREEN_BUDGET_J        énergie estimée en direct : CPU de l'arbre × puissance par cœur
+                          (TDP du profil d'hôte / nb de cœurs) ; le chiffre du tracker
+                          reste la mesure de référence
+
+Le contrôle se fait dans le thread de green_assistant.proctree, à chaque
+échantillon (``TreeSampler.on_sample``). Au dépassement :
+
+- snippet en sous-process (codecarbon-api.py) : l'arbre est tué ;
+- snippet dans le process (runpy) : ``BudgetExceeded`` est levée dans le thread
+  qui l'exécute (``with budget.guard():``) et les process que le snippet a
+  lancés sont tués (pas ceux qui existaient avant : threads du tracker, autres
+  mesures). Dans le thread principal, l'interruption passe par un signal
+  (SIGUSR1) : elle coupe aussi un appel bloquant en C (``time.sleep``, lecture
+  de socket). Ailleurs, ``PyThreadState_SetAsyncExc`` n'agit qu'au retour dans
+  l'interpréteur : d'où la mesure de l'app dans un process worker
+  (green_assistant.measure), tué par le parent au-delà du budget temps.
+
+La mesure partielle est rendue avec ``budget_exceeded`` (``attach``).
+"""
+from __future__ import annotations
+import ctypes, os, signal, threading, time
+from typing import Any, Callable, Dict, Optional
+
+import psutil
+
+from green_assistant import host, proctree
+
+ENV = {"wall_s": "GREEN_BUDGET_WALL_S", "cpu_s": "GREEN_BUDGET_CPU_S", "joules": "GREEN_BUDGET_J"}
+DEFAULT_WALL_S = 120.0
+DEFAULT_TDP_W = 65.0  # TDP inconnu : ordre de grandeur d'un CPU de bureau
+
+
+class BudgetExceeded(BaseException):
+    """Levée dans le thread du snippet ; BaseException pour ne pas être avalée par ``except Exception``."""
+
+
+def _env_float(name: str, default: Optional[float] = None) -> Optional[float]:
+    raw = os.environ.get(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        v = float(raw)
+    except ValueError:
+        return default
+    return v if v > 0 else None
+
+
+def watts_per_core() -> float:
+    tdp = (host.profile().get("location") or {}).get("cpu_tdp_w")
+    try: tdp = float(tdp) if tdp else DEFAULT_TDP_W
+    except ValueError: tdp = DEFAULT_TDP_W
+    return tdp / max(1, psutil.cpu_count(logical=True) or 1)
+
+
+def _async_raise(tid: int, exc: Optional[type]) -> None:
+    ctypes.pythonapi.PyThreadState_SetAsyncExc(ctypes.c_ulong(tid), ctypes.py_object(exc) if exc else None)
+
+
+class Budget:
+    """Limites d'un run ; ``watch(sampler)`` branche le contrôle sur l'échantillonneur."""
+
+    def __init__(self, wall_s: Optional[float] = None, cpu_s: Optional[float] = None,
+                 joules: Optional[float] = None) -> None:
+        self.wall_s, self.cpu_s, self.joules = wall_s, cpu_s, joules
+        self.exceeded: Optional[Dict[str, Any]] = None
+        self._w_core = watts_per_core() if joules else None
+        self._lock = threading.Lock()
+        self._abort: Optional[Callable[[], None]] = None
+        self._t0 = time.time()
+
+    @classmethod
+    def from_env(cls, **override: Optional[float]) -> "Budget":
+        """Limites GREEN_BUDGET_* ; ``override`` (non None) a priorité (UI, CLI)."""
+        b = {k: _env_float(name, DEFAULT_WALL_S if k == "wall_s" else None) for k, name in ENV.items()}
+        b.update({k: (v if v and v > 0 else None) for k, v in override.items() if v is not None})
+        return cls(**b)
+
+    @property
+    def active(self) -> bool:
+        return any((self.wall_s, self.cpu_s, self.joules))
+
+    def limits(self) -> Dict[str, Optional[float]]:
+        return {"wall_s": self.wall_s, "cpu_s": self.cpu_s, "joules": self.joules}
+
+    # ── contrôle ──
+    def watch(self, sampler: proctree.TreeSampler, abort: Callable[[], None]) -> "Budget":
+        """Vérifie les limites à chaque échantillon de ``sampler`` ; ``abort()`` au premier dépassement."""
+        self._abort, self._t0 = abort, time.time()
+        if self.active:
+            sampler.on_sample = self.check
+        return self
+
+    def check(self, sampler: proctree.TreeSampler) -> None:
+        if self.exceeded is not None:
+            return
+        cpu = sampler.tree_cpu_s()
+        usage = {"wall_s": time.time() - self._t0, "cpu_s": cpu,
+                 "joules": cpu * self._w_core if self._w_core else None}
+        for kind, limit in self.limits().items():
+            if limit is not None and usage[kind] is not None and usage[kind] > limit:
+                with self._lock:
+                    if self._abort is None:  # run déjà terminé
+                        return
+                    self.exceeded = {"kind": kind, "limit": limit, "value": usage[kind]}
+                    abort, self._abort = self._abort, None
+                abort()
+                return
+
+    def stop(self) -> None:
+        with self._lock:
+            self._abort = None
+
+    # ── snippet dans le process ──
+    def guard(self, sampler: proctree.TreeSampler) -> "_Guard":
+        """Contexte autour de ``runpy.run_path`` : le dépassement interrompt le snippet."""
+        return _Guard(self, sampler)
+
+
+_SIGNAL = getattr(signal, "SIGUSR1", None)
+
+
+def _raise_exceeded(signum, frame) -> None:
+    raise BudgetExceeded()
+
+
+class _Guard:
+    def __init__(self, budget: Budget, sampler: proctree.TreeSampler) -> None:
+        self.budget, self.sampler = budget, sampler
+        self._tid = threading.get_ident()
+        self._main = self._tid == threading.main_thread().ident and _SIGNAL is not None
+        self._before: set = set()
+        self._handler = None
+        self._lock, self._armed = threading.Lock(), False
+
+    def _spawned(self) -> list:
+        """Descendants apparus depuis l'entrée du contexte : lancés par le snippet."""
+        try:
+            return [p for p in psutil.Process(self.sampler.pid).children(recursive=True)
+                    if (p.pid, p.create_time()) not in self._before]
+        except psutil.Error:
+            return []
+
+    def _abort(self) -> None:
+        with self._lock:
+            if not self._armed:  # contexte déjà quitté : le gestionnaire d'origine est rétabli
+                return
+            if self._main:  # signal : interrompt aussi time.sleep / un read bloquant
+                os.kill(os.getpid(), _SIGNAL)
+            else:
+                _async_raise(self._tid, BudgetExceeded)
+        for p in self._spawned():  # le snippet ne tourne plus : ses enfants (multiprocessing, subprocess) non plus
+            proctree.kill_tree(p.pid)
+
+    def __enter__(self) -> "_Guard":
+        try:
+            self._before = {(p.pid, p.create_time()) for p in psutil.Process(self.sampler.pid).children(recursive=True)}
+        except psutil.Error:
+            self._before = set()
+        if self._main:
+            self._handler = signal.signal(_SIGNAL, _raise_exceeded)
+        self._armed = True
+        self.budget.watch(self.sampler, self._abort)
+        return self
+
+    def __exit__(self, et, ev, tb) -> bool:
+        try:
+            self.budget.stop()  # plus de levée après ce point
+            with self._lock:
+                self._armed = False
+                if self.budget.exceeded is not None and not self._main:
+                    _async_raise(self._tid, None)  # annule une exception pas encore livrée
+                if self._main:  # un signal encore en attente est ignoré une fois le gestionnaire rétabli
+                    signal.signal(_SIGNAL, self._handler if self._handler is not None else signal.SIG_DFL)
+        except BudgetExceeded:
+            pass
+        return et is not None and issubclass(et, BudgetExceeded)
+
+
+def env_for(limits: Dict[str, float]) -> Dict[str, str]:
+    """Variables GREEN_BUDGET_* à passer à un wrapper lancé en sous-process."""
+    return {ENV[k]: str(v) for k, v in limits.items() if k in ENV and v is not None}
+
+
+def attach(data: Dict[str, Any], budget: Optional[Budget]) -> Dict[str, Any]:
+    """Ajoute ``budget_exceeded`` (et le détail) au résultat d'un wrapper."""
+    if budget is None or not budget.active:
+        return data
+    data["budget"] = budget.limits()
+    data["budget_exceeded"] = budget.exceeded is not None
+    if budget.exceeded:
+        e = budget.exceeded
+        data["budget"]["exceeded"] = e
+        note = f"Budget dépassé ({e['kind']} : {e['value']:.3g} > {e['limit']:.3g}) : run interrompu, mesure partielle."
+        data["stderr"] = ((data.get("stderr") or "") + "\n" + note).strip()
+    return data
@@ -0,0 +1,243 @@
+# src/green_assistant/calibration.py
+"""Calibration croisée des trackers et estimation réconciliée.
+
+Les quatre backends divergent souvent de plusieurs ordres de grandeur sur le
+même script. On exécute des charges de référence (``data/workloads`` : CPU,
+mémoire, repos) sous chaque backend et on ajuste, par outil, un facteur
+multiplicatif vers une référence :
+
+- RAPL (``/sys/class/powercap``, énergie package lue autour du snippet, dans
+  la même fenêtre que le tracker) quand il est lisible ;
+- sinon le backend le plus fiable (``REFERENCE_TOOL``, CodeCarbon par défaut),
+  apparié par charge (médianes).
+
+L'ajustement se fait en log : facteur = exp(moyenne(log(ref / outil))), la
+dispersion des log-ratios donne la bande d'incertitude. Les facteurs sont
+stockés par empreinte d'hôte (calibration.json). ``reconcile()`` combine les
+estimations corrigées (moyenne pondérée par l'inverse des variances).
+L'échelle des émissions (g vs kg) est déduite de l'intensité implicite.
+"""
+from __future__ import annotations
+import glob, math, os, tempfile, time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from green_assistant import host
+
+WORKLOADS_DIR = Path(__file__).resolve().parent / "data" / "workloads"
+REFERENCE_TOOL = os.environ.get("GREEN_CALIB_REFERENCE", "codecarbon")
+Z = 1.96                     # bande à ~95 %
+MIN_LOG_SD = math.log(1.05)  # plancher : ±5 % même si les points s'alignent parfaitement
+GCO2_RANGE = (5.0, 1500.0)   # intensités plausibles (gCO2/kWh)
+
+RunTool = Callable[[str, str, Dict[str, str]], Dict[str, Any]]  # (outil, script, env) -> résultat
+
+
+# ───────────────────────────── RAPL ─────────────────────────────
+def _rapl_domains() -> List[Path]:
+    """Domaines package (intel-rapl:N), sans les sous-domaines core/uncore/dram."""
+    return [Path(p) for p in sorted(glob.glob("/sys/class/powercap/intel-rapl:*"))
+            if Path(p).name.count(":") == 1 and os.access(Path(p) / "energy_uj", os.R_OK)]
+
+
+def rapl_available() -> bool:
+    return bool(_rapl_domains())
+
+
+class RaplMeter:
+    """Énergie package cumulée (tous sockets), compteurs 32 bits rebouclés gérés."""
+
+    def __init__(self) -> None:
+        self.domains = _rapl_domains()
+        self._e0: List[int] = []
+        self.energy_kwh: Optional[float] = None
+        self.duration_s: Optional[float] = None
+
+    @staticmethod
+    def _read(p: Path, name: str) -> int:
+        return int((p / name).read_text().strip())
+
+    def __enter__(self) -> "RaplMeter":
+        self._t0 = time.perf_counter()
+        self._e0 = [self._read(d, "energy_uj") for d in self.domains]
+        return self
+
+    def __exit__(self, *exc) -> None:
+        total_uj = 0
+        for d, e0 in zip(self.domains, self._e0):
+            e1 = self._read(d, "energy_uj")
+            if e1 < e0:  # rebouclage
+                e1 += self._read(d, "max_energy_range_uj")
+            total_uj += e1 - e0
+        self.duration_s = time.perf_counter() - self._t0
+        self.energy_kwh = total_uj / 3.6e12 if self.domains else None
+
+    def result(self) -> Dict[str, Any]:
+        return {"energy_kwh": self.energy_kwh, "duration_s": self.duration_s, "domains": len(self.domains)}
+
+
+_REFERENCE_SCRIPT = """\
+import json, runpy
+from green_assistant.calibration import RaplMeter
+with RaplMeter() as _m:
+    runpy.run_path({workload!r}, run_name="__main__")
+with open({out!r}, "w", encoding="utf-8") as _f:
+    json.dump(_m.result(), _f)
+"""
+
+
+def workloads() -> Dict[str, Path]:
+    return {p.stem: p for p in sorted(WORKLOADS_DIR.glob("*.py"))}
+
+
+# ───────────────────────────── Ajustement ─────────────────────────────
+def _emissions_scale(points: List[Tuple[float, float]]) -> float:
+    """Facteur à appliquer à ``emissions_kg`` : 1, 1e-3 (outil en g) ou 1e3 (outil en t)."""
+    ratios = [e * 1000.0 / en for en, e in points if en and e and en > 0 and e > 0]  # gCO2/kWh implicite
+    if not ratios:
+        return 1.0
+    g = float(np.median(ratios))
+    for scale in (1.0, 1e-3, 1e3):
+        if GCO2_RANGE[0] <= g * scale <= GCO2_RANGE[1]:
+            return scale
+    return 1.0
+
+
+def fit(pairs: List[Tuple[float, float]]) -> Optional[Dict[str, Any]]:
+    """pairs = [(valeur outil, valeur référence)] -> facteur et dispersion (log)."""
+    pts = np.array([(x, y) for x, y in pairs if x and y and x > 0 and y > 0], dtype=np.float64)
+    if len(pts) == 0:
+        return None
+    lr = np.log(pts[:, 1] / pts[:, 0])
+    sd = float(lr.std(ddof=1)) if len(lr) > 1 else math.log(2.0)  # un seul point : bande large
+    return {"factor": float(math.exp(lr.mean())), "log_sd": max(sd, MIN_LOG_SD), "n": int(len(lr))}
+
+
+def calibrate(run_tool: RunTool, tools: List[str], repeats: int = 2, duration_s: float = 3.0,
+              reference: Optional[str] = None) -> Dict[str, Any]:
+    """Exécute les charges de référence et ajuste un facteur par outil.
+
+    ``reference`` : ``"rapl"``, un nom d'outil, ou None (RAPL si lisible, sinon REFERENCE_TOOL).
+    """
+    reference = reference or ("rapl" if rapl_available() else REFERENCE_TOOL)
+    if reference != "rapl" and reference not in tools:
+        tools = [reference] + list(tools)
+    env = {"GREEN_CALIB_DUR": str(duration_s), "GREEN_OVERHEAD": "off", "GREEN_SINK": ""}
+    tmp = Path(tempfile.mkdtemp(prefix="green_calib_"))
+    raw: Dict[str, List[Dict[str, Any]]] = {t: [] for t in tools}
+    for wname, wpath in workloads().items():
+        for r in range(repeats):
+            for tool in tools:
+                script, ref_out = wpath, None
+                if reference == "rapl":
+                    ref_out = tmp / f"{tool}-{wname}-{r}.rapl.json"
+                    script = tmp / f"{tool}-{wname}-{r}.py"
+                    script.write_text(_REFERENCE_SCRIPT.format(workload=str(wpath), out=str(ref_out)), encoding="utf-8")
+                res = run_tool(tool, str(script), env)
+                ref = host.read_json(ref_out) if ref_out else {}
+                raw[tool].append({"workload": wname, "energy_kwh": res.get("energy_kwh"),
+                                  "emissions_kg": res.get("emissions_kg"), "duration_s": res.get("duration_s"),
+                                  "ref_energy_kwh": ref.get("energy_kwh"), "error": res.get("error") or res.get("run_error")})
+
+    if reference != "rapl":  # pas de fenêtre commune : appariement par charge (médianes)
+        ref_by_w: Dict[str, float] = {}
+        for wname in workloads():
+            vals = [p["energy_kwh"] for p in raw[reference] if p["workload"] == wname and p["energy_kwh"]]
+            if vals: ref_by_w[wname] = float(np.median(vals))
+        for tool in tools:
+            for p in raw[tool]:
+                p["ref_energy_kwh"] = ref_by_w.get(p["workload"])
+
+    fitted: Dict[str, Any] = {}
+    for tool in tools:
+        pts = [p for p in raw[tool] if not p["error"]]
+        if reference != "rapl":  # médiane par charge, comme la référence
+            by_w: Dict[str, List[float]] = {}
+            for p in pts:
+                if p["energy_kwh"]: by_w.setdefault(p["workload"], []).append(p["energy_kwh"])
+            pairs = [(float(np.median(v)), next(q["ref_energy_kwh"] for q in pts if q["workload"] == w))
+                     for w, v in by_w.items()]
+        else:
+            pairs = [(p["energy_kwh"], p["ref_energy_kwh"]) for p in pts]
+        f = fit(pairs)
+        if f is None:
+            fitted[tool] = {"status": "no_data"}
+            continue
+        f["emissions_scale"] = _emissions_scale([(p["energy_kwh"], p["emissions_kg"]) for p in pts])
+        f["status"] = "reference" if tool == reference else "ok"
+        fitted[tool] = f
+    entry = {"host": host.profile_key(), "reference": reference, "fitted_at": time.time(), "workload_duration_s": duration_s,
+             "repeats": repeats, "tools": fitted, "points": raw}
+    save(entry)
+    return entry
+
+
+# ───────────────────────────── Stockage par hôte ─────────────────────────────
+def _store_path() -> Path:
+    return host.cache_dir() / "calibration.json"
+
+
+def save(entry: Dict[str, Any]) -> None:
+    store = host.read_json(_store_path())
+    store[host.profile_key()] = entry
+    host.write_json(_store_path(), store)
+
+
+def load(key: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    return host.read_json(_store_path()).get(key or host.profile_key())
+
+
+# ───────────────────────────── Réconciliation ─────────────────────────────
+def correct(tool: str, data: Dict[str, Any], cal: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+    """Estimation corrigée d'un outil : énergie, bande [lo, hi] et émissions remises en kg."""
+    cal = cal if cal is not None else load()
+    t = ((cal or {}).get("tools") or {}).get(tool) or {}
+    e = data.get("energy_kwh")
+    if t.get("status") not in ("ok", "reference") or not isinstance(e, (int, float)) or e <= 0:
+        return None
+    est = e * t["factor"]
+    band = math.exp(Z * t["log_sd"])
+    em = data.get("emissions_kg")
+    em = em * t.get("emissions_scale", 1.0) if isinstance(em, (int, float)) else None
+    return {"energy_kwh": est, "energy_kwh_low": est / band, "energy_kwh_high": est * band,
+            "log_sd": t["log_sd"], "factor": t["factor"],
+            # intensité implicite de l'outil (ses émissions rapportées à sa propre énergie)
+            "gco2_kwh": em * 1000.0 / e if em is not None else None,
+            "emissions_kg": est * em / e if em is not None else None}
+
+
+def reconcile(results: Dict[str, List[Dict[str, Any]]], cal: Optional[Dict[str, Any]] = None,
+              gco2_kwh: Optional[float] = None) -> Optional[Dict[str, Any]]:
+    """Combine les runs corrigés de tous les outils (moyenne log pondérée par 1/variance).
+
+    ``results`` : {outil: [résultats]} (cf. bench_all.run_tools). ``gco2_kwh`` : intensité
+    du réseau pour convertir l'énergie réconciliée ; sinon médiane des émissions corrigées.
+    """
+    cal = cal if cal is not None else load()
+    if not cal:
+        return None
+    logs, weights, per_tool, ems = [], [], {}, []
+    for tool, runs in results.items():
+        corr = [c for c in (correct(tool, r, cal) for r in runs) if c]
+        if not corr:
+            continue
+        e = float(np.median([c["energy_kwh"] for c in corr]))
+        sd = corr[0]["log_sd"]
+        per_tool[tool] = {"energy_kwh": e, "factor": corr[0]["factor"], "log_sd": sd, "runs": len(corr)}
+        logs.append(math.log(e)); weights.append(len(corr) / sd ** 2)
+        ems += [c["gco2_kwh"] for c in corr if c["gco2_kwh"]]
+    if not logs:
+        return None
+    w = np.array(weights)
+    mu = float(np.dot(w, logs) / w.sum())
+    sd = float(1.0 / math.sqrt(w.sum()))
+    if len(logs) > 1:  # désaccord résiduel entre outils : on ne le cache pas dans la bande
+        sd = max(sd, float(np.sqrt(np.dot(w, (np.array(logs) - mu) ** 2) / w.sum())))
+    e = math.exp(mu)
+    g = gco2_kwh or (float(np.median(ems)) if ems else None)
+    per_kwh = g / 1000.0 if g is not None else None
+    return {"energy_kwh": e, "energy_kwh_low": e * math.exp(-Z * sd), "energy_kwh_high": e * math.exp(Z * sd),
+            "emissions_kg": e * per_kwh if per_kwh is not None else None, "reference": cal.get("reference"),
+            "calibrated_at": cal.get("fitted_at"), "tools": per_tool}
@@ -0,0 +1,182 @@
+# src/green_assistant/capture.py
+"""Capture bornée de la sortie du snippet mesuré (GREEN_OUTPUT).
+
+Politiques :
+- ``ring`` (défaut) : garde les derniers GREEN_OUTPUT_KB Ko (64 par défaut) ;
+- ``discard`` : jette tout, ne compte que le volume ;
+- ``spill`` : écrit dans un fichier temporaire (chemin dans le résultat) ;
+- ``passthrough`` : écrit vers le terminal (stderr du wrapper, pour garder stdout
+  au JSON) ; le coût d'écriture terminal est alors inclus dans la mesure.
+
+``OutputCapture`` remplace sys.stdout/sys.stderr pour tout le process : une
+seule mesure à la fois par process (l'app mesure dans un worker,
+green_assistant.measure). ``ChildOutput.join`` est borné : un petit-enfant
+qui survit au snippet en gardant le pipe ouvert est tué au lieu de bloquer
+le wrapper (et bench_all.py).
+
+Le coût des écritures est relevé à part (``output`` : volume, nb d'écritures,
+temps passé à écrire, énergie estimée au prorata de ce temps).
+"""
+from __future__ import annotations
+import io, os, subprocess, sys, tempfile, threading, time
+from typing import Any, Dict, IO, List, Optional
+
+from green_assistant import proctree
+from green_assistant.channel import BoundedBuffer
+
+POLICIES = ("ring", "discard", "spill", "passthrough")
+DEFAULT_KB = 64
+JOIN_TIMEOUT_S = 5.0  # lecture des pipes après la fin du snippet
+
+
+def policy(default: str = "ring") -> str:
+    p = (os.environ.get("GREEN_OUTPUT") or default).strip().lower()
+    return p if p in POLICIES else default
+
+
+def limit_bytes() -> int:
+    try:
+        return max(0, int(os.environ.get("GREEN_OUTPUT_KB", DEFAULT_KB))) * 1024
+    except ValueError:
+        return DEFAULT_KB * 1024
+
+
+class _Stream(io.TextIOBase):
+    """sys.stdout / sys.stderr de remplacement pendant la mesure."""
+
+    def __init__(self, cap: "OutputCapture", name: str) -> None:
+        self._cap, self.name = cap, name
+
+    @property
+    def encoding(self) -> str:
+        return "utf-8"
+
+    def writable(self) -> bool:
+        return True
+
+    def isatty(self) -> bool:
+        return False
+
+    def write(self, s: str) -> int:
+        return self._cap._write(s, self.name)
+
+    def flush(self) -> None:
+        if self._cap.policy == "passthrough":
+            self._cap._term.flush()
+
+
+class OutputCapture:
+    """Contexte de capture pour un snippet exécuté dans le process (runpy)."""
+
+    def __init__(self, policy_: Optional[str] = None, limit: Optional[int] = None) -> None:
+        self.policy = policy_ if policy_ in POLICIES else policy()
+        self.limit = limit_bytes() if limit is None else limit
+        self.ring = BoundedBuffer(self.limit)
+        self.chars = 0
+        self.writes = 0
+        self.write_s = 0.0
+        self.spill_path: Optional[str] = None
+        self._spill: Optional[IO[str]] = None
+        self._term = sys.__stderr__ or sys.stderr
+        self._saved: List[Any] = []
+
+    def __enter__(self) -> "OutputCapture":
+        if self.policy == "spill":
+            fd, self.spill_path = tempfile.mkstemp(prefix="green_out_", suffix=".log")
+            self._spill = os.fdopen(fd, "w", encoding="utf-8", errors="replace")
+        self._saved = [sys.stdout, sys.stderr]
+        sys.stdout, sys.stderr = _Stream(self, "stdout"), _Stream(self, "stderr")
+        return self
+
+    def __exit__(self, *exc) -> None:
+        sys.stdout, sys.stderr = self._saved
+        if self._spill:
+            self._spill.close(); self._spill = None
+
+    def _write(self, s: str, name: str) -> int:
+        t = time.perf_counter()
+        n = len(s)
+        self.chars += n; self.writes += 1
+        if self.policy == "ring":
+            self.ring.write(s.encode("utf-8", errors="replace"))
+        elif self.policy == "spill":
+            self._spill.write(s)
+        elif self.policy == "passthrough":
+            self._term.write(s)
+        self.write_s += time.perf_counter() - t
+        return n
+
+    def to_dict(self, duration_s: Optional[float] = None, energy_kwh: Optional[float] = None) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"policy": self.policy, "chars": self.chars, "writes": self.writes,
+                               "write_s": self.write_s, "energy_kwh_est": None}
+        if self.policy == "ring": out["tail"] = self.ring.text()
+        if self.spill_path: out["spill_path"] = self.spill_path
+        if isinstance(energy_kwh, (int, float)) and duration_s:
+            out["energy_kwh_est"] = energy_kwh * min(1.0, self.write_s / duration_s)
+        return out
+
+
+# ───────────────────────── Snippet dans un process enfant ─────────────────────────
+class ChildOutput:
+    """Même politique pour un snippet lancé en sous-process (codecarbon-api.py) :
+    stdout selon la politique, stderr toujours en tampon borné (traceback)."""
+
+    def __init__(self, policy_: Optional[str] = None, limit: Optional[int] = None) -> None:
+        self.policy = policy_ if policy_ in POLICIES else policy()
+        self.limit = limit_bytes() if limit is None else limit
+        self.out, self.err = BoundedBuffer(self.limit), BoundedBuffer(max(self.limit, 16 * 1024))
+        self.spill_path: Optional[str] = None
+        self._spill: Optional[IO[bytes]] = None
+        self._threads: List[threading.Thread] = []
+        self.complete = True
+
+    def popen_kwargs(self) -> Dict[str, Any]:
+        if self.policy == "discard":
+            stdout: Any = subprocess.DEVNULL
+        elif self.policy == "spill":
+            fd, self.spill_path = tempfile.mkstemp(prefix="green_out_", suffix=".log")
+            self._spill = stdout = os.fdopen(fd, "wb")
+        elif self.policy == "passthrough":
+            stdout = (sys.__stderr__ or sys.stderr).fileno()
+        else:
+            stdout = subprocess.PIPE
+        return {"stdout": stdout, "stderr": subprocess.PIPE}
+
+    def start(self, p: subprocess.Popen) -> None:
+        for stream, buf in ((p.stdout, self.out), (p.stderr, self.err)):
+            if stream is None: continue
+            t = threading.Thread(target=_drain, args=(stream, buf), daemon=True)
+            t.start(); self._threads.append(t)
+
+    def join(self, timeout: float = JOIN_TIMEOUT_S, tree: Optional[proctree.TreeSampler] = None) -> bool:
+        """Attend la fin des lectures, au plus ``timeout`` s. Pipe encore ouvert (descendant qui survit
+        au snippet) : les process vus par ``tree`` sont tués, puis la lecture est abandonnée (threads
+        démons, sans effet sur la sortie du wrapper). False si la sortie est incomplète."""
+        deadline = time.monotonic() + timeout
+        for t in self._threads: t.join(max(0.0, deadline - time.monotonic()))
+        if any(t.is_alive() for t in self._threads) and tree is not None:
+            proctree.kill_seen(tree)
+            for t in self._threads: t.join(1.0)
+        if self._spill:
+            self._spill.close(); self._spill = None
+        self.complete = not any(t.is_alive() for t in self._threads)
+        return self.complete
+
+    @property
+    def stderr(self) -> str:
+        return self.err.text()
+
+    def to_dict(self) -> Dict[str, Any]:
+        out: Dict[str, Any] = {"policy": self.policy, "bytes": self.out.total if self.policy == "ring" else None}
+        if not self.complete: out["truncated"] = True  # pipe gardé ouvert par un descendant tué
+        if self.policy == "ring": out["tail"] = self.out.text()
+        if self.spill_path:
+            out["spill_path"] = self.spill_path
+            out["bytes"] = os.path.getsize(self.spill_path) if os.path.exists(self.spill_path) else None
+        return out
+
+
+def _drain(stream: IO[bytes], buf: BoundedBuffer) -> None:
+    with stream:
+        for chunk in iter(lambda: stream.read1(65536), b""):
+            buf.write(chunk)
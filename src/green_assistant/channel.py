@@ -0,0 +1,202 @@
+# src/green_assistant/channel.py
+"""Canal de résultat tramé entre un wrapper *-api.py et son lanceur (bench_all.py).
+
+Le résultat ne transite plus par le stdout partagé avec le snippet :
+
+- POSIX : le parent crée un pipe, passe l'extrémité d'écriture au wrapper
+  (``pass_fds``) et son numéro dans GREEN_RESULT_FD. Chaque record est
+  ``MAGIC`` + longueur (8 octets big-endian) + JSON UTF-8.
+- Ailleurs (Windows) : GREEN_RESULT_SENTINEL=1, le record est une ligne
+  ``SENTINEL <longueur> <json>`` sur stdout, extraite ligne à ligne.
+
+Les deux lectures sont linéaires. Le stdout/stderr du snippet est gardé à
+part, dans un tampon borné (les derniers ``limit`` octets).
+"""
+from __future__ import annotations
+import json, os, struct, subprocess, sys, threading
+from typing import Any, Dict, IO, List, Optional, Sequence
+
+from green_assistant import proctree
+
+MAGIC = b"GRN1"
+HEADER = struct.Struct(">4sQ")
+SENTINEL = "\x1eGREEN-RESULT"
+DEFAULT_LIMIT = 64 * 1024
+
+
+# ───────────────────────────── Côté wrapper ─────────────────────────────
+def _claim_fd() -> Optional[int]:
+    """Prend le fd du canal une fois pour toutes : retiré de l'environnement et
+    rendu non héritable, pour que les process lancés par le snippet ne le voient pas."""
+    raw = os.environ.pop("GREEN_RESULT_FD", None)
+    if not raw:
+        return None
+    try:
+        fd = int(raw)
+        os.set_inheritable(fd, False)
+        return fd
+    except (ValueError, OSError):
+        return None
+
+
+_FD = _claim_fd()
+_SENTINEL_MODE = os.environ.pop("GREEN_RESULT_SENTINEL", "") == "1"
+
+
+def encode(record: Dict[str, Any]) -> bytes:
+    payload = json.dumps(record, ensure_ascii=False).encode("utf-8")
+    return HEADER.pack(MAGIC, len(payload)) + payload
+
+
+def send(record: Dict[str, Any]) -> bool:
+    """Envoie un record sur le canal du parent, s'il y en a un."""
+    if _FD is not None:
+        view = memoryview(encode(record))
+        while view:
+            n = os.write(_FD, view)
+            view = view[n:]
+        return True
+    if _SENTINEL_MODE:
+        payload = json.dumps(record, ensure_ascii=False)  # une ligne : pas de \n dans le JSON
+        sys.stdout.write(f"\n{SENTINEL} {len(payload)} {payload}\n"); sys.stdout.flush()
+        return True
+    return False
+
+
+def publish(data: Dict[str, Any]) -> None:
+    """Sortie finale d'un wrapper : canal tramé, JSON_OUT, puis JSON sur stdout
+    (lu tel quel par les extensions VS Code)."""
+    send(data)
+    payload = json.dumps(data, ensure_ascii=False)
+    json_out = os.environ.get("JSON_OUT")
+    if json_out:
+        try:
+            with open(json_out, "w", encoding="utf-8") as f:
+                f.write(payload)
+        except Exception:
+            pass
+    print(payload)
+
+
+# ───────────────────────────── Côté lanceur ─────────────────────────────
+class BoundedBuffer:
+    """Garde les ``limit`` derniers octets ; compte ce qui a été écarté."""
+
+    def __init__(self, limit: int = DEFAULT_LIMIT) -> None:
+        self.limit = limit
+        self.buf = bytearray()
+        self.total = 0
+
+    def write(self, chunk: bytes) -> None:
+        self.total += len(chunk)
+        if self.limit <= 0:
+            return
+        self.buf += chunk
+        if len(self.buf) > self.limit:
+            del self.buf[: len(self.buf) - self.limit]
+
+    @property
+    def dropped(self) -> int:
+        return self.total - len(self.buf)
+
+    def text(self) -> str:
+        s = self.buf.decode("utf-8", errors="replace")
+        return (f"[… {self.dropped} octets tronqués]\n" + s) if self.dropped else s
+
+
+class FrameDecoder:
+    """Décodage incrémental des records tramés (chaque octet est lu une fois)."""
+
+    def __init__(self) -> None:
+        self.buf = bytearray()
+        self.records: List[Dict[str, Any]] = []
+        self.errors = 0
+
+    def feed(self, chunk: bytes) -> None:
+        self.buf += chunk
+        while len(self.buf) >= HEADER.size:
+            magic, n = HEADER.unpack_from(self.buf)
+            if magic != MAGIC:  # flux corrompu : on se resynchronise sur le prochain MAGIC
+                i = self.buf.find(MAGIC, 1)
+                self.errors += 1
+                del self.buf[: i if i > 0 else len(self.buf)]
+                continue
+            if len(self.buf) < HEADER.size + n:
+                return
+            payload = bytes(self.buf[HEADER.size: HEADER.size + n])
+            del self.buf[: HEADER.size + n]
+            try:
+                self.records.append(json.loads(payload.decode("utf-8")))
+            except ValueError:
+                self.errors += 1
+
+
+def parse_sentinel_line(line: str) -> Optional[Dict[str, Any]]:
+    if not line.startswith(SENTINEL):
+        return None
+    try:
+        n, payload = line[len(SENTINEL):].strip().split(" ", 1)
+        if len(payload) != int(n): return None
+        return json.loads(payload)
+    except ValueError:
+        return None
+
+
+def _pump(stream: IO[bytes], sink: BoundedBuffer, records: Optional[List[Dict[str, Any]]] = None) -> None:
+    """Vide un flux enfant dans un tampon borné ; en mode sentinelle, extrait les records."""
+    if records is None:
+        for chunk in iter(lambda: stream.read1(65536), b""):
+            sink.write(chunk)
+        return
+    for line in stream:  # lignes : la sentinelle est toujours en début de ligne
+        if line.startswith(SENTINEL.encode()):
+            rec = parse_sentinel_line(line.decode("utf-8", errors="replace").rstrip("\r\n"))
+            if rec is not None:
+                records.append(rec); continue
+        sink.write(line)
+
+
+def run(argv: Sequence[str], env: Optional[Dict[str, str]] = None, cwd: Optional[str] = None,
+        limit: int = DEFAULT_LIMIT, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Lance un wrapper avec un canal de résultat dédié.
+
+    Renvoie ``{"records", "stdout", "stderr", "returncode", "stdout_bytes", "stderr_bytes"}`` ;
+    stdout/stderr sont tronqués aux ``limit`` derniers octets.
+    """
+    env = dict(os.environ if env is None else env)
+    use_fd = os.name == "posix"
+    out_buf, err_buf = BoundedBuffer(limit), BoundedBuffer(limit)
+    decoder = FrameDecoder()
+    sentinel_records: List[Dict[str, Any]] = []
+    rfd = wfd = None
+    if use_fd:
+        rfd, wfd = os.pipe()
+        env["GREEN_RESULT_FD"] = str(wfd)
+    else:
+        env["GREEN_RESULT_SENTINEL"] = "1"
+    try:
+        p = subprocess.Popen(list(argv), stdout=subprocess.PIPE, stderr=subprocess.PIPE, cwd=cwd, env=env,
+                             pass_fds=(wfd,) if use_fd else ())
+    except BaseException:
+        if rfd is not None: os.close(rfd)
+        raise
+    finally:
+        if wfd is not None: os.close(wfd)  # sinon le pipe ne voit jamais EOF
+    threads = [threading.Thread(target=_pump, args=(p.stdout, out_buf, None if use_fd else sentinel_records), daemon=True),
+               threading.Thread(target=_pump, args=(p.stderr, err_buf), daemon=True)]
+    if use_fd:
+        def _read_results() -> None:
+            with os.fdopen(rfd, "rb", buffering=0) as r:
+                for chunk in iter(lambda: r.read(65536), b""):
+                    decoder.feed(chunk)
+        threads.append(threading.Thread(target=_read_results, daemon=True))
+    for t in threads: t.start()
+    try:
+        p.wait(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        proctree.kill_tree(p.pid)  # petits-enfants compris : ils tiennent les pipes ouverts
+        p.wait()
+    for t in threads: t.join()
+    return {"records": decoder.records if use_fd else sentinel_records,
+            "stdout": out_buf.text(), "stderr": err_buf.text(), "returncode": p.returncode,
+            "stdout_bytes": out_buf.total, "stderr_bytes": err_buf.total}
@@ -0,0 +1,229 @@
+# src/green_assistant/cli.py
+"""CLI sans interface du pipeline Green Assistant (pre-commit, CI).
+
+    python -m green_assistant analyse  src/**/*.py          # motifs + recos, JSON
+    python -m green_assistant generate script.py --write    # réécriture green
+    python -m green_assistant generate script.py --verify   # + exécution avant/après
+    python -m green_assistant measure  script.py --tool eco2ai
+    python -m green_assistant bench    script.py --tools codecarbon,tracarbon
+    python -m green_assistant measure  service.js           # JavaScript : sous node
+    python -m green_assistant scale    script.py --sizes 1000:1000000:6 --at 50000000
+
+Entrées : fichiers, répertoires (``*.py`` / ``*.js`` récursifs), globs, ``-`` pour
+stdin. Sortie : un tableau JSON (``--ndjson`` : une ligne par entrée, au fil de
+l'eau). N'importe ni Streamlit ni les trackers au démarrage : ``analyse`` et
+``generate`` ne chargent que des modules sans dépendance.
+
+Codes retour : 0 ok, 1 motif trouvé (``--fail-on``) ou mesure en échec, 2 usage.
+"""
+from __future__ import annotations
+import argparse, glob, json, os, sys
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from green_assistant.analysis import (detect_language, detect_frameworks_python, detect_energy_smells,
+                                      suggestions_for, preflight_compile)
+from green_assistant.patterns import retrieve_patterns, greenify_code, verify_rewrite
+
+SRC = Path(__file__).resolve().parent.parent  # les wrappers *-api.py
+BENCH_TOOLS = ("codecarbon", "carbontracker", "eco2ai", "tracarbon")
+SUFFIXES = (".py", ".js", ".mjs", ".cjs")
+JS_SUFFIXES = SUFFIXES[1:]  # mesurés par node-api.py, quel que soit --tools
+
+
+# ───────────────────────────── Entrées ─────────────────────────────
+def iter_inputs(specs: List[str]) -> Iterator[Tuple[str, str, Optional[str]]]:
+    """(chemin, code, erreur de lecture) pour chaque entrée ; ``-`` lit stdin une fois."""
+    seen = set()
+    for spec in specs:
+        if spec == "-":
+            if "-" not in seen:
+                seen.add("-"); yield "-", sys.stdin.read(), None
+            continue
+        p = Path(spec)
+        if p.is_dir():
+            paths = sorted(q for q in p.rglob("*") if q.suffix in SUFFIXES and q.is_file())
+        elif p.exists():
+            paths = [p]
+        else:
+            paths = [Path(q) for q in sorted(glob.glob(spec, recursive=True)) if Path(q).is_file()]
+            if not paths:
+                print(f"[green] entrée introuvable : {spec}", file=sys.stderr)
+        for q in paths:
+            key = str(q)
+            if key in seen: continue
+            seen.add(key)
+            try:
+                yield key, q.read_text(encoding="utf-8"), None
+            except (OSError, UnicodeDecodeError) as e:
+                yield key, "", str(e)
+
+
+# ───────────────────────────── Commandes ─────────────────────────────
+def analyse(path: str, code: str) -> Dict[str, Any]:
+    lang = detect_language(code)
+    fw = detect_frameworks_python(code) if lang == "python" else []
+    smells = detect_energy_smells(code, lang)
+    ok, tb = preflight_compile(code) if lang == "python" else (True, None)
+    out: Dict[str, Any] = {"path": path, "language": lang, "frameworks": fw, "smells": smells,
+                           "recommendations": suggestions_for(smells, fw), "syntax_ok": ok}
+    if tb: out["stderr"] = tb.strip()
+    return out
+
+
+def generate(path: str, code: str, write: bool = False, verify: bool = False) -> Dict[str, Any]:
+    lang = detect_language(code)
+    smells = detect_energy_smells(code, lang)
+    sources = retrieve_patterns(code, smells, top_k=4)
+    green, applied = greenify_code(code, smells, lang, verify=verify)
+    out = {"path": path, "language": lang, "smells": smells, "patterns": [f"{p.pid} — {p.title}" for p in sources],
+           "applied": applied, "changed": green != code}
+    if verify and green != code and lang == "python":
+        out["verify"] = verify_rewrite(code, green)
+    rejected = (out.get("verify") or {}).get("verdict") in ("divergent", "erreur")  # jamais écrit
+    if write and path != "-" and green != code and not rejected and lang == "python":
+        try:
+            compile(green, path, "exec")
+        except SyntaxError as e:  # ne jamais écraser le fichier avec du code invalide
+            out["error"] = "invalid_rewrite"; out["stderr"] = f"{type(e).__name__}: {e}"
+            rejected = True
+    if write and path != "-" and green != code and not rejected:
+        Path(path).write_text(green, encoding="utf-8")
+        out["written"] = True
+    else:
+        out["code"] = green
+    return out
+
+
+def _limits(args: argparse.Namespace) -> Dict[str, float]:
+    return {k: v for k, v in (("wall_s", args.budget_wall), ("cpu_s", args.budget_cpu), ("joules", args.budget_j))
+            if v is not None}
+
+
+def measure_one(path: str, code: str, args: argparse.Namespace) -> Dict[str, Any]:
+    from green_assistant import measure, sink  # trackers chargés à la demande
+    res = measure.measure(code, args.tool, args.overhead or "off", args.trace_alloc, args.output, _limits(args),
+                          args.hotspots)
+    if not res.get("error"):
+        target = path if path != "-" else "snippet"
+        sink.emit(res, f"cli-{args.tool}", target, meta={"code_sha": sink.code_sha(code)})
+    return {"path": path, "tool": args.tool, **res}
+
+
+def bench_one(path: str, tool: str, args: argparse.Namespace, extra_env: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Lance ``<tool>-api.py`` en sous-process (canal tramé), comme bench_all.py."""
+    from green_assistant import budget, channel
+    env = {**os.environ, **(extra_env or {})}
+    env.setdefault("CODECARBON_LOG_LEVEL", "error")
+    if args.overhead: env["GREEN_OVERHEAD"] = args.overhead
+    env.update(budget.env_for(_limits(args)))
+    if getattr(args, "hotspots", False): env["GREEN_HOTSPOTS"] = "1"
+    r = channel.run([sys.executable, str(SRC / f"{tool}-api.py"), path], env=env, limit=args.output_limit * 1024)
+    res = r["records"][-1] if r["records"] else {"error": "no_json", "stderr": r["stderr"].strip()}
+    return {"path": path, "tool": tool, **res}
+
+
+def scale_one(path: str, tool: str, args: argparse.Namespace) -> Dict[str, Any]:
+    """Mesure à chaque taille N puis ajustement O(·) (green_assistant.scaling)."""
+    from green_assistant import scaling
+    if tool == "time":
+        run_n = lambda n: scaling.run_local(path, n)
+    else:
+        run_n = lambda n: bench_one(path, tool, args, scaling.size_env(n))
+    points = scaling.measure_sizes(run_n, scaling.parse_sizes(args.sizes), args.repeat)
+    fit = scaling.analyse(points, scaling.parse_sizes(args.at) if args.at else [])
+    return {"path": path, "tool": tool, "points": points, "fit": fit,
+            **({"error": "scale_incomplete"} if any(p.get("error") for p in points) else {})}
+
+
+def _failed(res: Dict[str, Any]) -> bool:
+    return bool(res.get("error") or res.get("run_error") or res.get("budget_exceeded"))
+
+
+# ───────────────────────────── Entrée ─────────────────────────────
+def parse_args(argv=None) -> argparse.Namespace:
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("inputs", nargs="+", help="fichiers, répertoires, globs ou '-' (stdin)")
+    common.add_argument("--ndjson", action="store_true", help="une ligne JSON par entrée (flux)")
+    common.add_argument("--indent", type=int, default=None, help="indentation du JSON")
+
+    ap = argparse.ArgumentParser(prog="python -m green_assistant", description="Green Assistant sans interface.")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    a = sub.add_parser("analyse", parents=[common], help="motifs énergivores et recommandations (statique)")
+    a.add_argument("--fail-on", default=None, metavar="SMELLS",
+                   help="code retour 1 si l'un de ces motifs est trouvé ('all' = n'importe lequel)")
+    g = sub.add_parser("generate", parents=[common], help="réécriture green (P006–P008 vérifiés par exécution avec --verify)")
+    g.add_argument("--write", action="store_true", help="réécrit les fichiers en place")
+    g.add_argument("--verify", action="store_true",
+                   help="exécute original et réécriture : sorties identiques ? plus rapide ? (code retour 1 si divergent) ;"
+                        " sans --verify, le script n'est jamais exécuté")
+    for name, hlp in (("measure", "mesure dans le process (CodeCarbon / Eco2AI)"),
+                      ("bench", "mesure via les wrappers *-api.py (un sous-process par outil)"),
+                      ("scale", "complexité empirique : mesure à plusieurs tailles N et ajustement O(·)")):
+        m = sub.add_parser(name, parents=[common], help=hlp)
+        m.add_argument("--overhead", choices=["off", "report", "subtract"], default=None)
+        m.add_argument("--budget-wall", type=float, default=None, metavar="S", help="budget temps réel par run (0 = illimité)")
+        m.add_argument("--budget-cpu", type=float, default=None, metavar="S", help="budget CPU de l'arbre de process")
+        m.add_argument("--budget-j", type=float, default=None, metavar="J", help="budget énergie estimée (joules)")
+        m.add_argument("--hotspots", action="store_true", help="compteurs d'exécution par boucle/ligne (GREEN_HOTSPOTS)")
+        if name == "measure":
+            m.add_argument("--tool", choices=["codecarbon", "eco2ai"], default="codecarbon")
+            m.add_argument("--trace-alloc", action="store_true", help="profil des allocations (tracemalloc)")
+            m.add_argument("--output", default=None, help="politique de sortie du snippet (GREEN_OUTPUT)")
+        else:
+            m.add_argument("--tools", default="time" if name == "scale" else ",".join(BENCH_TOOLS),
+                           help="outils (séparés par des virgules)" + (" ; 'time' = chrono seul" if name == "scale" else ""))
+            m.add_argument("--output-limit", type=int, default=64, metavar="KB")
+        if name == "scale":
+            m.add_argument("--sizes", default="1000:100000:6", help="'MIN:MAX[:ÉTAPES]' (géométrique) ou 'N1,N2,…'")
+            m.add_argument("--at", default=None, help="tailles de production extrapolées")
+            m.add_argument("--repeat", type=int, default=1, help="runs par taille (médiane)")
+    return ap.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    fail_on = None
+    if args.cmd == "analyse" and args.fail_on:
+        fail_on = {s.strip() for s in args.fail_on.split(",") if s.strip()}
+    tools = [t.strip() for t in getattr(args, "tools", "").split(",") if t.strip()]
+    unknown = sorted(set(tools) - set(BENCH_TOOLS) - {"node"} - ({"time"} if args.cmd == "scale" else set()))
+    if unknown:
+        print(f"Outils inconnus : {', '.join(unknown)}", file=sys.stderr); return 2
+
+    results: List[Dict[str, Any]] = []
+    failures = 0
+
+    def out(res: Dict[str, Any]) -> None:
+        if args.ndjson: print(json.dumps(res, ensure_ascii=False, default=str), flush=True)
+        else: results.append(res)
+
+    n = 0
+    for path, code, err in iter_inputs(args.inputs):
+        n += 1
+        if err:
+            out({"path": path, "error": "read_error", "stderr": err}); failures += 1; continue
+        if args.cmd == "analyse":
+            res = analyse(path, code)
+            if fail_on and (set(res["smells"]) & fail_on or ("all" in fail_on and res["smells"])):
+                res["failed"] = True; failures += 1
+            out(res)
+        elif args.cmd == "generate":
+            res = generate(path, code, args.write, args.verify)
+            failures += bool(res.get("error")) or (res.get("verify") or {}).get("verdict") in ("divergent", "erreur")
+            out(res)
+        elif args.cmd == "measure":
+            res = measure_one(path, code, args); failures += _failed(res); out(res)
+        else:
+            if path == "-":
+                out({"path": path, "error": "stdin_unsupported", "notes": f"{args.cmd} attend des fichiers"}); failures += 1
+                continue
+            one = scale_one if args.cmd == "scale" else bench_one
+            js = Path(path).suffix.lower() in JS_SUFFIXES
+            for tool in (["time" if "time" in tools else "node"] if js else tools):
+                res = one(path, tool, args); failures += _failed(res); out(res)
+    if not args.ndjson:
+        print(json.dumps(results, ensure_ascii=False, indent=args.indent, default=str))
+    if n == 0:
+        return 2
+    return 1 if failures else 0
@@ -0,0 +1,119 @@
+# src/green_assistant/dashboard.py
+"""Agrégations de l'historique des mesures (vue « Comparaison » de l'app).
+
+L'historique est le puits colonnaire (green_assistant.sink) de GREEN_SINK,
+sinon ``<cache>/history``. Chaque run y porte ``code_sha`` (version du code),
+``family`` (version d'origine) et ``variant`` (``original`` / ``green``) : le
+lien entre un code et sa version générée est gardé dans ``lineage.json``.
+
+Tout est vectorisé (pandas/NumPy) ; l'app met les résultats en cache
+``st.cache_data`` avec ``sink.version()`` pour clé.
+"""
+from __future__ import annotations
+import os
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from green_assistant import host, sink
+
+METRICS = ("energy_kwh", "duration_s", "emissions_kg")
+IMPROVED, REGRESSED = -0.05, 0.05  # variation relative green vs original
+
+
+def history_path() -> Path:
+    return Path(os.environ.get("GREEN_SINK") or host.cache_dir() / "history")
+
+
+# ───────────────────────────── Lignée original → green ─────────────────────────────
+def _lineage_path() -> Path:
+    return host.cache_dir() / "lineage.json"
+
+
+def link(original_code: str, green_code: str) -> None:
+    """Mémorise qu'un code généré dérive d'un original (même famille)."""
+    orig, green = sink.code_sha(original_code), sink.code_sha(green_code)
+    if orig == green:
+        return
+    data = host.read_json(_lineage_path())
+    family = data.get(orig, {}).get("family", orig)  # green d'un green : famille d'origine
+    data[green] = {"family": family}
+    host.write_json(_lineage_path(), data)
+
+
+def meta_for(code: str) -> Dict[str, Any]:
+    """Colonnes de contexte d'un run (cf. sink.emit)."""
+    sha = sink.code_sha(code)
+    parent = host.read_json(_lineage_path()).get(sha)
+    if parent:
+        return {"code_sha": sha, "family": parent["family"], "variant": "green"}
+    return {"code_sha": sha, "family": sha, "variant": "original"}
+
+
+# ───────────────────────────── Agrégations ─────────────────────────────
+def load_runs(path: Optional[str | Path] = None, since_days: Optional[float] = None) -> pd.DataFrame:
+    df = sink.load(path or history_path(), "runs")
+    if not isinstance(df, pd.DataFrame) or df.empty:
+        return pd.DataFrame(columns=[c for c, _, _ in sink.RUNS])
+    df = df[~df["run_error"] & (df["error"] == "")]
+    if since_days:
+        df = df[df["ts"] >= pd.Timestamp.now() - pd.Timedelta(days=since_days)]
+    df = df.assign(variant=df["variant"].replace("", "original"),
+                   family=df["family"].where(df["family"] != "", df["code_sha"]))
+    return df.reset_index(drop=True)
+
+
+def by_version(df: pd.DataFrame) -> pd.DataFrame:
+    """Médiane / nb de runs par version de code et backend."""
+    if df.empty:
+        return pd.DataFrame()
+    g = df.groupby(["family", "variant", "code_sha", "backend"], sort=False)[list(METRICS)]
+    out = g.median().join(g.size().rename("runs"))
+    return out.reset_index().sort_values(["family", "backend", "variant"], ignore_index=True)
+
+
+def per_backend(df: pd.DataFrame) -> pd.DataFrame:
+    if df.empty:
+        return pd.DataFrame()
+    return df.groupby("backend")[list(METRICS)].agg(["median", "sum", "count"])
+
+
+def timeline(df: pd.DataFrame, freq: str = "D") -> pd.DataFrame:
+    """Énergie cumulée par période (une colonne par backend)."""
+    if df.empty:
+        return pd.DataFrame()
+    return df.pivot_table(index=pd.Grouper(key="ts", freq=freq), columns="backend", values="energy_kwh",
+                          aggfunc="sum", fill_value=0.0)
+
+
+def compare(df: pd.DataFrame) -> pd.DataFrame:
+    """Original vs green par famille et backend : médianes, variation relative, verdict."""
+    v = by_version(df)
+    if v.empty or not (v["variant"] == "green").any():
+        return pd.DataFrame()
+    # plusieurs versions green d'une même famille : médiane des médianes
+    med = v.groupby(["family", "backend", "variant"])[list(METRICS) + ["runs"]].agg(
+        {**{m: "median" for m in METRICS}, "runs": "sum"})
+    wide = med.unstack("variant")
+    if "original" not in wide.columns.get_level_values(1) or "green" not in wide.columns.get_level_values(1):
+        return pd.DataFrame()
+    out = pd.DataFrame(index=wide.index)
+    for m in METRICS:
+        o, g = wide[(m, "original")], wide[(m, "green")]
+        out[f"{m}_original"], out[f"{m}_green"] = o, g
+        out[f"{m}_delta"] = np.where(o > 0, (g - o) / o, np.nan)
+    out["runs_original"], out["runs_green"] = wide[("runs", "original")], wide[("runs", "green")]
+    d = out["energy_kwh_delta"]
+    out["verdict"] = np.select([d <= IMPROVED, d >= REGRESSED], ["mieux", "pire"], default="stable")
+    out.loc[d.isna(), "verdict"] = "—"
+    return out.dropna(subset=["energy_kwh_original", "energy_kwh_green"]).reset_index()
+
+
+def summary(df: pd.DataFrame) -> Dict[str, Any]:
+    if df.empty:
+        return {"runs": 0}
+    return {"runs": int(len(df)), "versions": int(df["code_sha"].nunique()), "families": int(df["family"].nunique()),
+            "energy_kwh": float(np.nansum(df["energy_kwh"])), "emissions_kg": float(np.nansum(df["emissions_kg"])),
+            "since": df["ts"].min(), "until": df["ts"].max()}
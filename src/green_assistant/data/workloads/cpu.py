@@ -0,0 +1,7 @@
+# Charge de référence : calcul flottant pur (un cœur), GREEN_CALIB_DUR secondes
+import math, os, time
+dur = float(os.getenv("GREEN_CALIB_DUR", "3"))
+t0 = time.time(); x = 0.0
+while time.time() - t0 < dur:
+    for i in range(50_000):
+        x += math.sin(i) * math.cos(i)
@@ -0,0 +1,3 @@
+# Charge de référence : machine au repos, GREEN_CALIB_DUR secondes
+import os, time
+time.sleep(float(os.getenv("GREEN_CALIB_DUR", "3")))
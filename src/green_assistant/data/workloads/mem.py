@@ -0,0 +1,9 @@
+# Charge de référence : parcours mémoire (≈ 256 Mo relus en boucle), GREEN_CALIB_DUR secondes
+import os, time
+dur = float(os.getenv("GREEN_CALIB_DUR", "3"))
+buf = bytearray(256 * 1024 * 1024)
+t0 = time.time(); n = 0
+while time.time() - t0 < dur:
+    for off in range(0, len(buf), 4096):
+        buf[off] = (buf[off] + 1) & 0xFF
+    n += 1
@@ -0,0 +1,512 @@
+# src/green_assistant/dataframes.py
+"""Boucles Pandas ligne par ligne ➜ opérations par colonne (AST).
+
+Quatre motifs, détectés puis réécrits quand l'expression se traduit telle
+quelle (arithmétique, comparaisons, ``x if c else y`` ➜ ``np.where``,
+``abs``/``min``/``max``/``math.*`` ➜ NumPy) :
+
+- ``accumulation_iterrows`` : ``for _, row in df.iterrows(): total += row["a"] * 2``
+  (ou ``itertuples``, ``lst.append(...)``, sous ``if``) ➜ une somme / un
+  ``extend`` sur les colonnes ;
+- ``apply_ligne_par_ligne`` : ``df.apply(lambda r: r["a"] + r["b"], axis=1)``
+  ➜ ``df["a"] + df["b"]`` ;
+- ``affectation_chainee_boucle`` : ``for i in range(len(df)): df["c"][i] = …``
+  (ou ``.loc``/``.at[i, "c"]``) ➜ ``df["c"] = …``. Avec le copy-on-write de
+  Pandas 3, l'affectation chaînée n'écrit même plus dans ``df`` : la
+  réécriture rétablit l'intention ;
+- ``concat_dans_boucle`` : ``out = pd.concat([out, part])`` en boucle
+  (quadratique) ➜ liste de morceaux et un seul ``concat`` après la boucle.
+
+Chaque réécriture est d'abord rejouée sur des DataFrames d'échantillon
+(flottants, entiers, mixtes) : original et version vectorisée doivent
+donner les mêmes valeurs, sinon la boucle est laissée telle quelle.
+"""
+from __future__ import annotations
+import ast, math, warnings
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from green_assistant.memoize import LOOPS, SourceEdits, import_line
+
+ROW_ITERS = ("iterrows", "itertuples")
+NP_FUNCS = {"abs": "abs", "min": "minimum", "max": "maximum", "math.sqrt": "sqrt", "math.exp": "exp",
+            "math.log": "log", "math.floor": "floor", "math.ceil": "ceil", "math.fabs": "abs"}
+SERIES_ATTRS = {"name", "index", "values", "dtype", "dtypes", "shape", "size", "empty", "T", "Index"}
+ARITH = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow)
+COMPARE = (ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+CONCAT_KW = {"ignore_index", "axis", "sort", "join"}
+REDUCE = {ast.Add: ("+=", "sum", 0), ast.Sub: ("-=", "sum", 0), ast.Mult: ("*=", "prod", 1)}
+SAMPLE_ROWS = 40
+
+
+def _dotted(node: ast.AST) -> str:
+    if isinstance(node, ast.Name): return node.id
+    if isinstance(node, ast.Attribute): return f"{_dotted(node.value)}.{node.attr}"
+    return ""
+
+
+def _col(df: str, name: str) -> ast.AST:
+    return ast.Subscript(value=ast.Name(df, ast.Load()), slice=ast.Constant(name), ctx=ast.Load())
+
+
+def _stored(nodes) -> Set[str]:
+    return {n.id for root in nodes for n in ast.walk(root) if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+
+
+# ───────────────────────────── Traduction ligne ➜ colonne ─────────────────────────────
+class _Vectorizer:
+    """Expression évaluée sur une ligne ➜ même expression sur des colonnes (None si intraduisible)."""
+
+    def __init__(self, col_ref: Callable[[ast.AST], Optional[str]], df: str, np_name: str, forbidden: Set[str]) -> None:
+        self.col_ref, self.df, self.np, self.forbidden = col_ref, df, np_name, forbidden
+        self.columns: Set[str] = set()
+        self.free: Set[str] = set()
+
+    def _np(self, fn: str, args: List[ast.AST]) -> ast.AST:
+        return ast.Call(func=ast.Attribute(ast.Name(self.np, ast.Load()), fn, ast.Load()), args=args, keywords=[])
+
+    def _test(self, node: ast.AST) -> Optional[ast.AST]:
+        """Condition : ``and``/``or``/``not`` ➜ ``&``/``|``/``~`` (comparaisons seulement)."""
+        if isinstance(node, ast.BoolOp):
+            parts = [self._test(v) for v in node.values]
+            if any(p is None for p in parts): return None
+            op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+            out = parts[0]
+            for p in parts[1:]: out = ast.BinOp(out, op, p)
+            return out
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not):
+            inner = self._test(node.operand)
+            return None if inner is None else ast.UnaryOp(ast.Invert(), inner)
+        return self(node) if isinstance(node, ast.Compare) else None
+
+    def __call__(self, node: ast.AST) -> Optional[ast.AST]:
+        col = self.col_ref(node)
+        if col is not None:
+            self.columns.add(col); return _col(self.df, col)
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (bytes, type(Ellipsis))):
+            return node
+        if isinstance(node, ast.Name):
+            if node.id in self.forbidden: return None
+            self.free.add(node.id); return ast.Name(node.id, ast.Load())
+        if isinstance(node, ast.BinOp) and isinstance(node.op, ARITH):
+            l, r = self(node.left), self(node.right)
+            return None if l is None or r is None else ast.BinOp(l, node.op, r)
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, (ast.USub, ast.UAdd)):
+            v = self(node.operand)
+            return None if v is None else ast.UnaryOp(node.op, v)
+        if isinstance(node, ast.Compare) and len(node.ops) == 1 and isinstance(node.ops[0], COMPARE):
+            l, r = self(node.left), self(node.comparators[0])
+            return None if l is None or r is None else ast.Compare(l, node.ops, [r])
+        if isinstance(node, ast.IfExp):
+            parts = [self._test(node.test), self(node.body), self(node.orelse)]
+            return None if any(p is None for p in parts) else self._np("where", parts)
+        if isinstance(node, ast.Call) and not node.keywords and _dotted(node.func) in NP_FUNCS:
+            name = _dotted(node.func)
+            if name in ("min", "max") and len(node.args) != 2 or name not in ("min", "max") and len(node.args) != 1:
+                return None
+            args = [self(a) for a in node.args]
+            return None if any(a is None for a in args) else self._np(NP_FUNCS[name], args)
+        return None
+
+
+def _row_ref(row: str, attrs: bool = True, items: bool = True) -> Callable[[ast.AST], Optional[str]]:
+    """``row["a"]`` / ``row.a`` ➜ ``"a"``."""
+    def ref(node: ast.AST) -> Optional[str]:
+        if items and isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id == row \
+                and isinstance(node.slice, ast.Constant) and isinstance(node.slice.value, str):
+            return node.slice.value
+        if attrs and isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name) and node.value.id == row \
+                and not node.attr.startswith("_") and node.attr not in SERIES_ATTRS:
+            return node.attr
+        return None
+    return ref
+
+
+def _cell_ref(df: str, i: str) -> Callable[[ast.AST], Optional[str]]:
+    """``df["a"][i]`` / ``df.loc[i, "a"]`` / ``df.at[i, "a"]`` ➜ ``"a"``."""
+    def ref(node: ast.AST) -> Optional[str]:
+        if not isinstance(node, ast.Subscript): return None
+        v, s = node.value, node.slice
+        if isinstance(s, ast.Name) and s.id == i and isinstance(v, ast.Subscript) and isinstance(v.value, ast.Name) \
+                and v.value.id == df and isinstance(v.slice, ast.Constant) and isinstance(v.slice.value, str):
+            return v.slice.value
+        if isinstance(v, ast.Attribute) and v.attr in ("loc", "at") and isinstance(v.value, ast.Name) and v.value.id == df \
+                and isinstance(s, ast.Tuple) and len(s.elts) == 2 and isinstance(s.elts[0], ast.Name) \
+                and s.elts[0].id == i and isinstance(s.elts[1], ast.Constant) and isinstance(s.elts[1].value, str):
+            return s.elts[1].value
+        return None
+    return ref
+
+
+# ───────────────────────────── Vérification sur échantillon ─────────────────────────────
+def _samples(columns: List[str]) -> List[Any]:
+    import numpy as np, pandas as pd
+    rng = np.random.default_rng(0)
+    nonzero = np.r_[-5:0, 1:10]  # pas de division par zéro
+    floats = lambda: rng.uniform(-10, 10, SAMPLE_ROWS).round(2)
+    ints = lambda: rng.choice(nonzero, SAMPLE_ROWS)
+    return [pd.DataFrame({c: floats() for c in columns}), pd.DataFrame({c: ints() for c in columns}),
+            pd.DataFrame({c: (floats() if k % 2 else ints()) for k, c in enumerate(columns)})]
+
+
+def _same(a: Any, b: Any) -> bool:
+    import numpy as np, pandas as pd
+    if isinstance(a, pd.DataFrame) or isinstance(b, pd.DataFrame):
+        if not (isinstance(a, pd.DataFrame) and isinstance(b, pd.DataFrame)) or list(a.columns) != list(b.columns) \
+                or not a.index.equals(b.index):
+            return False
+        return all(_same(a[c], b[c]) for c in a.columns)
+    try:
+        x, y = np.asarray(a, dtype=float), np.asarray(b, dtype=float)
+        return x.shape == y.shape and bool(np.allclose(x, y, rtol=1e-9, atol=1e-9, equal_nan=True))
+    except (TypeError, ValueError):
+        return bool(np.all(np.asarray(a, dtype=object) == np.asarray(b, dtype=object)))
+
+
+def _equivalent(before: str, after: str, make_ns: Callable[[Any], Dict[str, Any]], columns: List[str],
+                outputs: List[str]) -> bool:
+    """``before`` et ``after`` donnent les mêmes ``outputs`` sur chaque DataFrame d'échantillon."""
+    try:
+        import numpy as np
+        samples = _samples(columns)
+    except ImportError:  # Pandas absent : rien n'est réécrit sans preuve
+        return False
+    checked = 0
+    for df in samples:
+        ns = [make_ns(df.copy()), make_ns(df.copy())]
+        with warnings.catch_warnings(), np.errstate(all="ignore"):
+            warnings.simplefilter("ignore")
+            try:
+                exec(compile(before, "<green-before>", "exec"), ns[0])
+            except Exception:  # l'original échoue sur ces types (ex. float dans une colonne int) : non concluant
+                continue
+            try:
+                exec(compile(after, "<green-after>", "exec"), ns[1])
+            except Exception:
+                return False
+        if not all(_same(ns[0].get(k), ns[1].get(k)) for k in outputs):
+            return False
+        checked += 1
+    return checked > 0
+
+
+def _namespace(df_name: str, free: Set[str], aliases: Dict[str, str], extra: Dict[str, Any]) -> Callable[[Any], Dict[str, Any]]:
+    def make(df: Any) -> Dict[str, Any]:
+        import numpy, pandas
+        mods = {"numpy": numpy, "pandas": pandas}
+        ns: Dict[str, Any] = {name: 3 for name in free}  # variables du script : valeur quelconque, commune aux deux
+        ns.update({alias: mods[m] for m, alias in aliases.items()})
+        ns.update({"math": math, **{k: (v() if callable(v) else v) for k, v in extra.items()}, df_name: df})
+        return ns
+    return make
+
+
+# ───────────────────────────── Détection ─────────────────────────────
+def _row_loop(node: ast.AST) -> Optional[Tuple[str, str]]:
+    """(df, méthode) pour ``for … in df.iterrows()/itertuples()``."""
+    if isinstance(node, ast.For) and isinstance(node.iter, ast.Call) and isinstance(node.iter.func, ast.Attribute) \
+            and node.iter.func.attr in ROW_ITERS:
+        return _dotted(node.iter.func.value), node.iter.func.attr
+    return None
+
+
+def _is_apply_rows(node: ast.AST) -> bool:
+    return isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute) and node.func.attr == "apply" \
+        and any(k.arg == "axis" and isinstance(k.value, ast.Constant) and k.value.value in (1, "columns")
+                for k in node.keywords)
+
+
+def _chained_target(t: ast.AST) -> bool:
+    return isinstance(t, ast.Subscript) and (
+        (isinstance(t.value, ast.Subscript) and isinstance(t.value.slice, ast.Constant))
+        or (isinstance(t.value, ast.Attribute) and t.value.attr in ("loc", "at", "iloc", "iat")))
+
+
+def _concat_stmt(n: ast.AST) -> Optional[str]:
+    """Nom ``X`` pour ``X = <pd>.concat([X, …], …)``."""
+    if isinstance(n, ast.Assign) and len(n.targets) == 1 and isinstance(n.targets[0], ast.Name) \
+            and isinstance(n.value, ast.Call) and _dotted(n.value.func).endswith("concat") and n.value.args \
+            and isinstance(n.value.args[0], ast.List) and n.value.args[0].elts \
+            and isinstance(n.value.args[0].elts[0], ast.Name) and n.value.args[0].elts[0].id == n.targets[0].id:
+        return n.targets[0].id
+    return None
+
+
+def _loop_nodes(loop: ast.AST):
+    """Nœuds du corps de ``loop`` hors boucles et fonctions imbriquées."""
+    stack = list(loop.body)
+    while stack:
+        n = stack.pop()
+        yield n
+        if not isinstance(n, LOOPS + (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            stack.extend(ast.iter_child_nodes(n))
+
+
+def detect(code: str) -> List[str]:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return []
+    found: Set[str] = set()
+    for n in ast.walk(tree):
+        if _row_loop(n): found.add("accumulation_iterrows")
+        if _is_apply_rows(n): found.add("apply_ligne_par_ligne")
+        if isinstance(n, LOOPS):
+            for m in _loop_nodes(n):
+                if isinstance(m, ast.Assign) and any(_chained_target(t) for t in m.targets):
+                    found.add("affectation_chainee_boucle")
+                if _concat_stmt(m): found.add("concat_dans_boucle")
+    order = ("accumulation_iterrows", "apply_ligne_par_ligne", "affectation_chainee_boucle", "concat_dans_boucle")
+    return [s for s in order if s in found]
+
+
+# ───────────────────────────── Réécritures ─────────────────────────────
+class _Rewrite:
+    """État partagé : arbre, éditions, alias numpy/pandas (import ajouté si besoin)."""
+
+    def __init__(self, code: str) -> None:
+        self.tree = ast.parse(code)
+        self.src = SourceEdits(code)
+        self.aliases: Dict[str, str] = {}
+        self._missing: Dict[str, int] = {}
+        for module, default in (("numpy", "np"), ("pandas", "pd")):
+            line, alias = import_line(self.tree, module)
+            self.aliases[module] = alias or default
+            if alias is None: self._missing[module] = line
+        self._used: Set[str] = set()
+        self.count = 0
+
+    def alias(self, module: str) -> str:
+        self._used.add(module); return self.aliases[module]
+
+    def used_outside(self, names: Set[str], inside: ast.AST) -> bool:
+        """Un des ``names`` est-il lu hors de ``inside`` ? Les portées qui le redéfinissent (autre boucle
+        ``for i``, compréhension, paramètre de fonction/lambda) ne comptent pas."""
+        stack: List[ast.AST] = [self.tree]
+        while stack:
+            n = stack.pop()
+            if n is inside: continue
+            if isinstance(n, ast.Name) and n.id in names: return True
+            if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.Lambda)):
+                a = n.args
+                if names & {x.arg for x in a.posonlyargs + a.args + a.kwonlyargs}: continue
+            if isinstance(n, (ast.For, ast.AsyncFor)) and names & _stored([n.target]): continue
+            if isinstance(n, (ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)) \
+                    and names & _stored(g.target for g in n.generators): continue
+            stack.extend(ast.iter_child_nodes(n))
+        return False
+
+    def replace_stmt(self, node: ast.AST, lines: List[str]) -> None:
+        pad = self.src.indent(node.lineno)
+        self.src.replace(node, ("\n" + pad).join(lines))
+        self.count += 1
+
+    def result(self, code: str) -> Tuple[str, int]:
+        if not self.count:
+            return code, 0
+        for module in sorted(self._used & set(self._missing)):
+            self.src.insert_line(self._missing[module], f"import {module} as {self.aliases[module]}", first=True)
+        out = self.src.apply()
+        try:
+            compile(out, "<green>", "exec")
+        except SyntaxError:  # édition mal placée : on rend le code d'origine
+            return code, 0
+        return out, self.count
+
+
+def _accumulations(loop: ast.For, vec: Callable[[], _Vectorizer]) -> Optional[Tuple[List[str], List[str], Dict[str, Any], Set[str], Set[str]]]:
+    """Corps ``acc += expr`` / ``lst.append(expr)`` (éventuellement sous ``if``) ➜ lignes vectorisées."""
+    lines, outputs, init = [], [], {}
+    columns: Set[str] = set(); free: Set[str] = set()
+    for stmt in loop.body:
+        cond = None
+        if isinstance(stmt, ast.If) and not stmt.orelse and len(stmt.body) == 1:
+            cond, stmt = stmt.test, stmt.body[0]
+        v = vec()
+        test = v._test(cond) if cond is not None else None
+        if cond is not None and test is None:
+            return None
+        if isinstance(stmt, ast.AugAssign) and isinstance(stmt.target, ast.Name) and type(stmt.op) in REDUCE:
+            value = v(stmt.value)
+            if value is None or not (v.columns or test is not None): return None
+            op, how, neutral = REDUCE[type(stmt.op)]
+            if test is not None: value = v._np("where", [test, value, ast.Constant(neutral)])
+            lines.append(f"{stmt.target.id} {op} {ast.unparse(v._np('asarray', [value]))}.{how}()")
+            outputs.append(stmt.target.id); init[stmt.target.id] = neutral
+        elif isinstance(stmt, ast.Expr) and isinstance(stmt.value, ast.Call) and isinstance(stmt.value.func, ast.Attribute) \
+                and stmt.value.func.attr == "append" and isinstance(stmt.value.func.value, ast.Name) \
+                and len(stmt.value.args) == 1 and not stmt.value.keywords:
+            value = v(stmt.value.args[0])
+            if value is None or not v.columns: return None
+            arr = ast.unparse(v._np("asarray", [value]))
+            if test is not None: arr += f"[{ast.unparse(v._np('asarray', [test]))}]"
+            lst = stmt.value.func.value.id
+            lines.append(f"{lst}.extend({arr}.tolist())")
+            outputs.append(lst); init[lst] = list
+        else:
+            return None
+        columns |= v.columns; free |= v.free
+    return (lines, outputs, init, columns, free) if lines else None
+
+
+def rewrite_iterrows(code: str) -> Tuple[str, int]:
+    """``for … in df.iterrows()/itertuples()`` d'accumulation ➜ réductions sur les colonnes."""
+    rw = _Rewrite(code)
+    for loop in [n for n in ast.walk(rw.tree) if _row_loop(n)]:
+        df, how = _row_loop(loop)
+        call = loop.iter
+        if loop.orelse or not isinstance(call.func.value, ast.Name) or call.args \
+                or any(k.arg != "index" for k in call.keywords) or (how == "iterrows" and call.keywords):
+            continue
+        if how == "iterrows":
+            t = loop.target
+            if not (isinstance(t, ast.Tuple) and len(t.elts) == 2 and all(isinstance(e, ast.Name) for e in t.elts)):
+                continue
+            idx, row = t.elts[0].id, t.elts[1].id
+            ref, loop_vars = _row_ref(row), {idx, row}
+        else:
+            if not isinstance(loop.target, ast.Name): continue
+            row = loop.target.id
+            ref, loop_vars = _row_ref(row, items=False), {row}
+        if rw.used_outside(loop_vars, loop):  # variable de boucle lue après la boucle
+            continue
+        np_name = rw.aliases["numpy"]
+        forbidden = loop_vars | _stored(loop.body)
+        acc = _accumulations(loop, lambda: _Vectorizer(ref, df, np_name, forbidden))
+        if acc is None: continue
+        lines, outputs, init, columns, free = acc
+        make = _namespace(df, free, rw.aliases, init)
+        if not _equivalent(ast.unparse(loop), "\n".join(lines), make, sorted(columns), outputs):
+            continue
+        rw.alias("numpy"); rw.replace_stmt(loop, lines)
+    return rw.result(code)
+
+
+def rewrite_apply(code: str) -> Tuple[str, int]:
+    """``df.apply(lambda r: <arithmétique>, axis=1)`` ➜ expression sur les colonnes."""
+    rw = _Rewrite(code)
+    for call in [n for n in ast.walk(rw.tree) if _is_apply_rows(n)]:
+        fn = call.args[0] if len(call.args) == 1 else None
+        if not (isinstance(call.func.value, ast.Name) and isinstance(fn, ast.Lambda) and len(fn.args.args) == 1
+                and not (fn.args.vararg or fn.args.kwarg or fn.args.kwonlyargs)) or len(call.keywords) != 1:
+            continue
+        df, r = call.func.value.id, fn.args.args[0].arg
+        v = _Vectorizer(_row_ref(r), df, rw.aliases["numpy"], {r})
+        vec = v(fn.body)
+        if vec is None or not v.columns: continue
+        if isinstance(vec, ast.Call) and ast.unparse(vec.func).endswith(".where"):  # ndarray ➜ Series
+            vec = ast.Call(func=ast.Attribute(ast.Name(rw.aliases["pandas"], ast.Load()), "Series", ast.Load()),
+                           args=[vec], keywords=[ast.keyword("index", ast.Attribute(ast.Name(df, ast.Load()), "index", ast.Load()))])
+        text = ast.unparse(vec)
+        make = _namespace(df, v.free, rw.aliases, {})
+        if not _equivalent(f"_out = {ast.unparse(call)}", f"_out = {text}", make, sorted(v.columns), ["_out"]):
+            continue
+        if f"{rw.aliases['numpy']}." in text: rw.alias("numpy")
+        if f"{rw.aliases['pandas']}.Series(" in text: rw.alias("pandas")
+        rw.src.replace(call, f"({text})" if isinstance(vec, ast.BinOp) else text); rw.count += 1
+    return rw.result(code)
+
+
+class _ChainedToLoc(ast.NodeTransformer):
+    """``df["c"][i] = v`` ➜ ``df.loc[i, "c"] = v`` : l'intention, que le copy-on-write ignore."""
+
+    def visit_Assign(self, node: ast.Assign) -> ast.AST:
+        t = node.targets[0]
+        if isinstance(t, ast.Subscript) and isinstance(t.value, ast.Subscript):
+            loc = ast.Attribute(t.value.value, "loc", ast.Load())
+            node.targets = [ast.Subscript(loc, ast.Tuple([t.slice, t.value.slice], ast.Load()), ast.Store())]
+        return node
+
+
+def rewrite_chained(code: str) -> Tuple[str, int]:
+    """``for i in range(len(df)) / df.index: df["c"][i] = …`` ➜ ``df["c"] = …`` (``np.where`` pour les ``if``)."""
+    rw = _Rewrite(code)
+    for loop in [n for n in ast.walk(rw.tree) if isinstance(n, ast.For)]:
+        if loop.orelse or not isinstance(loop.target, ast.Name): continue
+        i, it = loop.target.id, loop.iter
+        if isinstance(it, ast.Call) and _dotted(it.func) == "range" and len(it.args) == 1 \
+                and isinstance(it.args[0], ast.Call) and _dotted(it.args[0].func) == "len" and len(it.args[0].args) == 1 \
+                and isinstance(it.args[0].args[0], ast.Name):
+            df = it.args[0].args[0].id
+        elif isinstance(it, ast.Attribute) and it.attr == "index" and isinstance(it.value, ast.Name):
+            df = it.value.id
+        else:
+            continue
+        if rw.used_outside({i}, loop): continue
+        ref = _cell_ref(df, i)
+        np_name = rw.aliases["numpy"]
+        lines: List[str] = []; columns: Set[str] = set(); free: Set[str] = set()
+        for stmt in loop.body:
+            v = _Vectorizer(ref, df, np_name, {i})
+            cond = None
+            if isinstance(stmt, ast.If) and len(stmt.body) == 1 and len(stmt.orelse) <= 1:
+                cond, other = v._test(stmt.test), (stmt.orelse[0] if stmt.orelse else None)
+                stmt = stmt.body[0]
+                if cond is None: lines = []; break
+            else:
+                other = None
+            if not (isinstance(stmt, ast.Assign) and len(stmt.targets) == 1): lines = []; break
+            col = ref(stmt.targets[0])
+            value = v(stmt.value)
+            if col is None or value is None: lines = []; break
+            if cond is not None:
+                if other is None: alt = _col(df, col)
+                elif isinstance(other, ast.Assign) and len(other.targets) == 1 and ref(other.targets[0]) == col:
+                    alt = v(other.value)
+                else:
+                    alt = None
+                if alt is None: lines = []; break
+                value = v._np("where", [cond, value, alt])
+            lines.append(f"{df}[{col!r}] = {ast.unparse(value)}")
+            columns |= v.columns | {col}; free |= v.free
+        if not lines: continue
+        make = _namespace(df, free, rw.aliases, {})
+        before = ast.unparse(_ChainedToLoc().visit(ast.parse(ast.unparse(loop))))
+        if not _equivalent(before, "\n".join(lines), make, sorted(columns), [df]):
+            continue
+        if f"{np_name}." in "".join(lines): rw.alias("numpy")
+        rw.replace_stmt(loop, lines)
+    return rw.result(code)
+
+
+def _concat_ok(pd_name: str, kwargs: Dict[str, Any]) -> bool:
+    """Concat incrémental et concat unique donnent le même DataFrame (échantillon, mêmes options)."""
+    try:
+        import pandas as pd
+        parts = [pd.DataFrame({"a": [k, k + 1], "b": [k * 1.5, -k]}) for k in range(3)]
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            for start in (pd.DataFrame(), parts[0]):
+                inc = start
+                for p in parts: inc = pd.concat([inc, p], **kwargs)
+                if not inc.equals(pd.concat([start] + parts, **kwargs)):
+                    return False
+    except Exception:
+        return False
+    return True
+
+
+def rewrite_concat(code: str) -> Tuple[str, int]:
+    """``X = pd.concat([X, part])`` en boucle ➜ ``_frames_X.append(part)`` + un ``concat`` après la boucle."""
+    rw = _Rewrite(code)
+    taken: Set[int] = set()
+    for loop in [n for n in ast.walk(rw.tree) if isinstance(n, LOOPS)]:
+        if loop.orelse: continue
+        for stmt in _loop_nodes(loop):
+            name = _concat_stmt(stmt)
+            if name is None or id(stmt) in taken: continue
+            call = stmt.value
+            kw = {k.arg: k.value.value for k in call.keywords if k.arg in CONCAT_KW and isinstance(k.value, ast.Constant)}
+            if len(call.args) != 1 or len(kw) != len(call.keywords): continue
+            reads = [n for n in ast.walk(loop) if isinstance(n, ast.Name) and n.id == name]
+            if len(reads) != 2 or not _concat_ok(_dotted(call.func), kw):  # X lu ailleurs dans la boucle
+                continue
+            frames = f"_frames_{name}"
+            extra = call.args[0].elts[1:]
+            seg = [rw.src.segment(e) for e in extra]
+            rw.src.replace(stmt, f"{frames}.append({seg[0]})" if len(seg) == 1 else f"{frames}.extend([{', '.join(seg)}])")
+            pad = rw.src.indent(loop.lineno)
+            opts = "".join(f", {k}={v!r}" for k, v in kw.items())
+            rw.src.insert_line(loop.lineno, f"{pad}{frames} = [{name}]")
+            rw.src.insert_line(loop.end_lineno + 1, f"{pad}{name} = {_dotted(call.func)}({frames}{opts})")
+            taken.add(id(stmt)); rw.count += 1
+    return rw.result(code)
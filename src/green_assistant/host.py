@@ -0,0 +1,173 @@
+# src/green_assistant/host.py
+"""Identité de l'hôte et répertoire de cache local (sans réseau)."""
+from __future__ import annotations
+import hashlib, json, os, platform, socket, sys, time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+
+def cache_dir() -> Path:
+    """GREEN_CACHE_DIR, sinon ~/.cache/green_assistant (%LOCALAPPDATA% sous Windows)."""
+    env = os.environ.get("GREEN_CACHE_DIR")
+    if env:
+        d = Path(env)
+    elif sys.platform == "win32" and os.environ.get("LOCALAPPDATA"):
+        d = Path(os.environ["LOCALAPPDATA"]) / "green_assistant"
+    else:
+        d = Path(os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache") / "green_assistant"
+    d.mkdir(parents=True, exist_ok=True)
+    return d
+
+
+def host_key() -> str:
+    """Clé courte de l'hôte (nom, OS, arch, nb de cœurs) — ne sonde aucun matériel lent."""
+    raw = "|".join([socket.gethostname(), platform.system(), platform.machine(), str(os.cpu_count())])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def read_json(path: Path) -> Dict[str, Any]:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def write_json(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(path.suffix + f".{os.getpid()}.tmp")
+    with tmp.open("w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# ───────────────────── Profil matériel / localisation (cache) ─────────────────────
+PROFILE_FILE = "host.json"
+PROFILE_TTL_S = 30 * 24 * 3600
+
+# ISO 3166 alpha-3 (CodeCarbon) -> alpha-2 (eco2ai, tracarbon)
+ISO3_TO_ISO2 = {
+    "FRA": "FR", "DEU": "DE", "BEL": "BE", "CHE": "CH", "ESP": "ES", "ITA": "IT", "PRT": "PT",
+    "NLD": "NL", "LUX": "LU", "GBR": "GB", "IRL": "IE", "AUT": "AT", "POL": "PL", "CZE": "CZ",
+    "SWE": "SE", "NOR": "NO", "FIN": "FI", "DNK": "DK", "GRC": "GR", "ROU": "RO", "HUN": "HU",
+    "USA": "US", "CAN": "CA", "MEX": "MX", "BRA": "BR", "ARG": "AR", "CHL": "CL",
+    "MAR": "MA", "DZA": "DZ", "TUN": "TN", "SEN": "SN", "CIV": "CI", "EGY": "EG", "ZAF": "ZA",
+    "CHN": "CN", "JPN": "JP", "KOR": "KR", "IND": "IN", "SGP": "SG", "AUS": "AU", "NZL": "NZ",
+}
+
+
+def _cpu_model() -> Optional[str]:
+    """Nom du CPU sans py-cpuinfo (lent) : /proc/cpuinfo, sysctl, sinon platform."""
+    try:
+        with open("/proc/cpuinfo", "r", encoding="utf-8", errors="ignore") as f:
+            for line in f:
+                if line.lower().startswith("model name"):
+                    return line.split(":", 1)[1].strip()
+    except OSError:
+        pass
+    if sys.platform == "darwin":
+        try:
+            import subprocess
+            return subprocess.run(["sysctl", "-n", "machdep.cpu.brand_string"], capture_output=True,
+                                  text=True, timeout=2).stdout.strip() or None
+        except Exception:
+            pass
+    return platform.processor() or None
+
+
+def _ram_bytes() -> Optional[int]:
+    try:
+        return int(os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES"))
+    except (AttributeError, ValueError, OSError):
+        pass
+    try:
+        import psutil
+        return int(psutil.virtual_memory().total)
+    except Exception:
+        return None
+
+
+def fingerprint() -> Dict[str, Any]:
+    """Empreinte matérielle peu coûteuse : tout changement invalide le profil en cache."""
+    return {
+        "host_key": host_key(), "system": platform.system(), "machine": platform.machine(),
+        "cpu_count": os.cpu_count(), "cpu_model": _cpu_model(), "ram_bytes": _ram_bytes(),
+    }
+
+
+def _fp_hash(fp: Dict[str, Any]) -> str:
+    return hashlib.sha1(json.dumps(fp, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def _env_location() -> Dict[str, Any]:
+    loc = {
+        "country_iso_code": os.environ.get("GREEN_COUNTRY_ISO"),
+        "country_iso2": os.environ.get("GREEN_COUNTRY_ISO2"),
+        "region": os.environ.get("GREEN_REGION"),
+        "cloud_provider": os.environ.get("GREEN_CLOUD_PROVIDER"),
+        "cpu_tdp_w": os.environ.get("GREEN_CPU_TDP_W"),
+    }
+    return {k: v for k, v in loc.items() if v}
+
+
+def profile(ttl_s: float = PROFILE_TTL_S, refresh: bool = False) -> Dict[str, Any]:
+    """Profil de l'hôte, 100 % hors-ligne.
+
+    ``hardware`` est re-sondé si l'empreinte change ou après ``ttl_s`` ;
+    ``location`` (pays, région, cloud, TDP appris) vient des variables GREEN_*
+    ou de ce que les trackers ont déjà détecté (voir ``remember``).
+    """
+    path = cache_dir() / PROFILE_FILE
+    cached = read_json(path)
+    fp = fingerprint()
+    h = _fp_hash(fp)
+    fresh = (not refresh and cached.get("fingerprint") == h
+             and time.time() - cached.get("probed_at", 0) < ttl_s)
+    if not fresh:
+        location = (cached.get("location") or {}) if cached.get("fingerprint") == h else {}
+        cached = {"fingerprint": h, "probed_at": time.time(), "hardware": fp, "location": location}
+        try: write_json(path, cached)
+        except Exception: pass
+    loc = dict(cached.get("location") or {})
+    loc.update(_env_location())
+    if loc.get("country_iso_code") and not loc.get("country_iso2"):
+        iso2 = ISO3_TO_ISO2.get(str(loc["country_iso_code"]).upper())
+        if iso2: loc["country_iso2"] = iso2
+    return {"fingerprint": h, "hardware": cached.get("hardware") or fp, "location": loc}
+
+
+def profile_key() -> str:
+    """Empreinte matérielle du profil : clé des caches à invalider quand le matériel change
+    (calibration, surcoût d'instrumentation, sondes des trackers)."""
+    return profile()["fingerprint"]
+
+
+def remember_hardware(**fields: Any) -> None:
+    """Mémorise un sondage matériel d'un tracker (TDP trouvé dans sa table…) : valable tant que
+    l'empreinte ne change pas, re-sondé avec ``hardware`` sinon."""
+    path = cache_dir() / PROFILE_FILE
+    cached = read_json(path)
+    if not cached.get("fingerprint"):
+        profile(); cached = read_json(path)
+    hw = cached.setdefault("hardware", {})
+    if all(hw.get(k) == v for k, v in fields.items()):
+        return
+    hw.update(fields)
+    try: write_json(path, cached)
+    except Exception: pass
+
+
+def remember(**fields: Any) -> None:
+    """Mémorise ce qu'un tracker a détecté (pays, région, TDP…) pour les runs suivants."""
+    fields = {k: v for k, v in fields.items() if v not in (None, "", "None")}
+    if not fields:
+        return
+    path = cache_dir() / PROFILE_FILE
+    cached = read_json(path)
+    if not cached.get("fingerprint"):
+        profile(); cached = read_json(path)
+    loc = cached.setdefault("location", {})
+    if all(loc.get(k) == v for k, v in fields.items()):
+        return
+    loc.update(fields)
+    try: write_json(path, cached)
+    except Exception: pass
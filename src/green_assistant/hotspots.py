@@ -0,0 +1,207 @@
+# src/green_assistant/hotspots.py
+"""Points chauds à l'exécution : combien de fois chaque boucle, ligne, fonction du snippet tourne.
+
+Opt-in (GREEN_HOTSPOTS=1 ou ``enabled=True``), seul le fichier du snippet est
+instrumenté :
+
+- Python ≥ 3.12 : ``sys.monitoring`` (PEP 669). Compte exact des lignes
+  (LINE), des appels (PY_START) et des itérations de boucle (sauts arrière
+  JUMP/BRANCH, rapportés à la ligne d'en-tête). Les événements hors snippet
+  sont désactivés à leur premier passage (``DISABLE``) : surcoût limité au
+  code mesuré ;
+- avant 3.12 : échantillonnage du thread du snippet (``sys._current_frames``,
+  toutes les ``interval`` s). Les compteurs sont alors des échantillons, donc
+  proportionnels au temps passé et non au nombre d'exécutions.
+
+``attach`` croise ces compteurs avec les motifs statiques localisés
+(analysis.locate_smells_python) et les classe par fréquence réelle.
+"""
+from __future__ import annotations
+import ast, os, sys, threading
+from collections import Counter
+from typing import Any, Dict, List, Optional, Tuple
+
+from green_assistant.analysis import locate_smells_python, loop_spans
+
+HOT_SHARE = 0.10  # boucle sans motif statique signalée si ≥ 10 % de la boucle la plus chaude
+TOP = 10
+
+
+def enabled() -> bool:
+    return os.environ.get("GREEN_HOTSPOTS", "").lower() in ("1", "true", "yes", "on")
+
+
+class Tracer:
+    """Contexte autour de ``runpy.run_path(path)`` ; ``result`` après la sortie."""
+
+    def __init__(self, path: str, enabled_: Optional[bool] = None, interval: float = 0.001) -> None:
+        self.path = str(path)
+        self.enabled = enabled() if enabled_ is None else enabled_
+        self.interval = interval
+        self.mode = "monitoring" if hasattr(sys, "monitoring") else "sampling"
+        self.lines: Counter = Counter()
+        self.loops: Counter = Counter()
+        self.calls: Counter = Counter()
+        self.result: Optional[Dict[str, Any]] = None
+        self._tool: Optional[int] = None
+        self._offsets: Dict[Any, Dict[int, int]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def __enter__(self) -> "Tracer":
+        if self.enabled and not (self.mode == "monitoring" and self._start_monitoring()):
+            self.mode = "sampling"
+            self._start_sampling()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        if not self.enabled:
+            return
+        if self.mode == "monitoring":
+            self._stop_monitoring()
+        else:
+            self._stop.set()
+            if self._thread: self._thread.join(timeout=2.0)
+            self._loops_from_samples()
+        self.result = {
+            "mode": self.mode, "unit": "executions" if self.mode == "monitoring" else "samples",
+            "interval_s": None if self.mode == "monitoring" else self.interval,
+            "lines": dict(self.lines), "loops": dict(self.loops), "calls": dict(self.calls),
+        }
+
+    # ── sys.monitoring (3.12+) ──
+    def _start_monitoring(self) -> bool:
+        mon = sys.monitoring
+        for tool in (mon.PROFILER_ID, 3, 4):
+            try:
+                mon.use_tool_id(tool, "green-hotspots"); self._tool = tool; break
+            except ValueError:  # id déjà pris (profiler, couverture…)
+                continue
+        if self._tool is None:
+            return False
+        E = mon.events
+        DISABLE, path = mon.DISABLE, self.path
+        lines, calls = self.lines, self.calls
+
+        def on_line(code, line):
+            if code.co_filename != path: return DISABLE
+            lines[line] += 1
+
+        def on_start(code, offset):
+            if code.co_filename != path: return DISABLE
+            calls[f"{code.co_qualname}:{code.co_firstlineno}"] += 1
+
+        def on_jump(code, src, dest):
+            if code.co_filename != path: return DISABLE
+            if dest < src:  # saut arrière = une itération de boucle
+                self.loops[self._line_at(code, dest)] += 1
+
+        self._events = [(E.LINE, on_line), (E.PY_START, on_start), (E.JUMP, on_jump)]
+        branch = getattr(E, "BRANCH", None)
+        if branch is not None: self._events.append((branch, on_jump))
+        mask = 0
+        for ev, cb in self._events:
+            mon.register_callback(self._tool, ev, cb); mask |= ev
+        mon.restart_events()  # réactive ce qu'un run précédent a désactivé
+        mon.set_events(self._tool, mask)
+        return True
+
+    def _stop_monitoring(self) -> None:
+        mon = sys.monitoring
+        mon.set_events(self._tool, 0)
+        for ev, _ in self._events:
+            mon.register_callback(self._tool, ev, None)
+        mon.free_tool_id(self._tool)
+        self._tool = None
+
+    def _line_at(self, code, offset: int) -> int:
+        table = self._offsets.get(code)
+        if table is None:
+            table = self._offsets[code] = {}
+            for start, end, line in code.co_lines():
+                if line is None: continue
+                for o in range(start, end, 2): table[o] = line
+        return table.get(offset, code.co_firstlineno)
+
+    # ── échantillonnage (< 3.12) ──
+    def _start_sampling(self) -> None:
+        tid = threading.get_ident()
+        self._thread = threading.Thread(target=self._sample, args=(tid,), name="green-hotspots", daemon=True)
+        self._thread.start()
+
+    def _sample(self, tid: int) -> None:
+        path, lines, calls = self.path, self.lines, self.calls
+        while not self._stop.wait(self.interval):
+            f = sys._current_frames().get(tid)
+            inner = True
+            while f is not None:
+                if f.f_code.co_filename == path:
+                    if inner:  # ligne en cours d'exécution dans le snippet
+                        lines[f.f_lineno] += 1; inner = False
+                    calls[f"{getattr(f.f_code, 'co_qualname', f.f_code.co_name)}:{f.f_code.co_firstlineno}"] += 1
+                f = f.f_back
+
+    def _loops_from_samples(self) -> None:
+        """Échantillons d'une ligne attribués à toutes les boucles qui l'englobent."""
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                spans = loop_spans(ast.parse(fh.read()))
+        except (OSError, SyntaxError, ValueError):
+            return
+        for line, n in self.lines.items():
+            for head, end in spans:
+                if head <= line <= end: self.loops[head] += n
+
+
+# ───────────────────────────── Croisement statique × dynamique ─────────────────────────────
+def _top(counter: Dict[Any, int], n: int = TOP) -> List[Tuple[Any, int]]:
+    return sorted(((k, v) for k, v in counter.items()), key=lambda kv: kv[1], reverse=True)[:n]
+
+
+def rank(findings: List[Dict[str, Any]], hot: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Motifs statiques pondérés par leur fréquence d'exécution, + boucles chaudes sans motif."""
+    loops = {int(k): v for k, v in (hot.get("loops") or {}).items()}
+    lines = {int(k): v for k, v in (hot.get("lines") or {}).items()}
+    out = []
+    for f in findings:
+        weight = loops.get(f["loop_line"]) or lines.get(f["line"]) or 0
+        out.append({**f, "count": weight})
+    flagged = {f["loop_line"] for f in findings}
+    peak = max(loops.values(), default=0)
+    for line, n in loops.items():
+        if line not in flagged and peak and n >= HOT_SHARE * peak:
+            out.append({"smell": "boucle_chaude", "line": line, "loop_line": line, "count": n})
+    for f in out:
+        f["share"] = (f["count"] / peak) if peak else None  # relatif à la boucle la plus chaude
+    out.sort(key=lambda f: f["count"], reverse=True)
+    return out
+
+
+def order_smells(smells: List[str], findings: List[Dict[str, Any]]) -> List[str]:
+    """Motifs triés par fréquence d'exécution (les plus chauds d'abord), nouveaux motifs dynamiques inclus."""
+    count: Dict[str, int] = {}
+    for f in findings:
+        count[f["smell"]] = max(count.get(f["smell"], 0), f["count"])
+    return sorted(dict.fromkeys(list(smells) + list(count)), key=lambda s: -count.get(s, -1))
+
+
+def attach(data: Dict[str, Any], hot: Optional[Dict[str, Any]], code: Optional[str] = None,
+           path: Optional[str] = None) -> Dict[str, Any]:
+    """Ajoute ``hotspots`` (top lignes / boucles / appels + motifs classés) au résultat d'un wrapper.
+    Source du snippet : ``code``, sinon relue depuis ``path``."""
+    if not hot:
+        return data
+    if code is None:
+        try:
+            with open(path, encoding="utf-8", errors="replace") as fh: code = fh.read()
+        except (OSError, TypeError):
+            code = ""
+    data["hotspots"] = {
+        "mode": hot["mode"], "unit": hot["unit"], "interval_s": hot.get("interval_s"),
+        "loops": [{"line": int(l), "count": n} for l, n in _top(hot["loops"])],
+        "lines": [{"line": int(l), "count": n} for l, n in _top(hot["lines"])],
+        "calls": [{"function": k.rsplit(":", 1)[0], "line": int(k.rsplit(":", 1)[1]), "count": n}
+                  for k, n in _top(hot["calls"]) if not k.startswith("<module>")],
+        "findings": rank(locate_smells_python(code), hot),
+    }
+    return data
@@ -0,0 +1,226 @@
+# src/green_assistant/intensity.py
+"""Intensité carbone du réseau, hors-ligne : séries horaires CSV -> index NumPy.
+
+Format CSV (lignes ``#`` ignorées) : ``region,timestamp,gco2_kwh``
+- ``region`` : code pays ISO alpha-2 (ou zone libre, ex. ``FR``, ``US-CAL``)
+- ``timestamp`` : ISO 8601 (UTC si pas de fuseau) ; vide = valeur constante
+- ``gco2_kwh`` : intensité en gCO2eq/kWh, valable jusqu'au point suivant
+
+Sources : ``data/intensity/*.csv`` (moyennes fournies), puis les CSV de
+GREEN_INTENSITY_DIR (séries horaires utilisateur, prioritaires). Les CSV
+parsés sont mis en cache en ``.npz`` dans le répertoire de cache.
+"""
+from __future__ import annotations
+import csv, glob, hashlib, os, time
+from datetime import datetime, timezone
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from green_assistant import host
+
+DATA_DIR = Path(__file__).resolve().parent / "data" / "intensity"
+STATIC = np.iinfo(np.int64).min  # timestamp sentinelle d'une valeur constante
+DEFAULT_STEP_S = 3600
+
+
+def _parse_ts(s: str) -> int:
+    dt = datetime.fromisoformat(s.strip().replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp())
+
+
+def _read_csv(path: Path) -> Dict[str, np.ndarray]:
+    regions: List[str] = []; times: List[int] = []; values: List[float] = []
+    with path.open("r", encoding="utf-8", newline="") as f:
+        rows = csv.DictReader(line for line in f if line.strip() and not line.lstrip().startswith("#"))
+        for r in rows:
+            try:
+                v = float(r["gco2_kwh"])
+            except (KeyError, TypeError, ValueError):
+                continue
+            ts = (r.get("timestamp") or "").strip()
+            regions.append(r["region"].strip().upper())
+            times.append(_parse_ts(ts) if ts else STATIC)
+            values.append(v)
+    names, idx = np.unique(np.array(regions, dtype=str), return_inverse=True)
+    return {"names": names, "region_idx": idx.astype(np.int32),
+            "times": np.array(times, dtype=np.int64), "values": np.array(values, dtype=np.float32)}
+
+
+def _load_cached(path: Path) -> Dict[str, np.ndarray]:
+    st = path.stat()
+    key = hashlib.sha1(f"{path.resolve()}|{st.st_mtime_ns}|{st.st_size}".encode()).hexdigest()[:20]
+    npz = host.cache_dir() / "intensity" / f"{key}.npz"
+    if npz.exists():
+        try:
+            with np.load(npz, allow_pickle=False) as z:
+                return {k: z[k] for k in z.files}
+        except Exception:
+            pass
+    arrs = _read_csv(path)
+    try:
+        npz.parent.mkdir(parents=True, exist_ok=True)
+        np.savez_compressed(npz, **arrs)
+    except Exception:
+        pass
+    return arrs
+
+
+class IntensityIndex:
+    """Séries par région (timestamps int64 triés + valeurs float32) et constantes de repli."""
+
+    def __init__(self) -> None:
+        self._series: Dict[str, Tuple[np.ndarray, np.ndarray, int]] = {}
+        self._static: Dict[str, float] = {}
+        self.sources: List[str] = []
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str | Path]) -> "IntensityIndex":
+        idx = cls()
+        for p in paths:
+            idx.load_csv(p)
+        return idx
+
+    def load_csv(self, path: str | Path) -> None:
+        arrs = _load_cached(Path(path))
+        names, ridx, times, values = arrs["names"], arrs["region_idx"], arrs["times"], arrs["values"]
+        for i, name in enumerate(names.tolist()):
+            m = ridx == i
+            t, v = times[m], values[m]
+            static = t == STATIC
+            if static.any():
+                self._static[name] = float(v[static][-1])
+            t, v = t[~static], v[~static]
+            if t.size:
+                self._add_series(name, t, v)
+        self.sources.append(str(path))
+
+    def _add_series(self, region: str, t: np.ndarray, v: np.ndarray) -> None:
+        if region in self._series:  # fusion : les derniers chargés gagnent sur les doublons
+            t0, v0, _ = self._series[region]
+            t, v = np.concatenate([t0, t]), np.concatenate([v0, v])
+        order = np.argsort(t, kind="stable")
+        t, v = t[order], v[order]
+        keep = np.r_[t[1:] != t[:-1], True]  # dernier doublon gardé
+        t, v = t[keep], v[keep]
+        step = int(np.median(np.diff(t))) if t.size > 1 else DEFAULT_STEP_S
+        self._series[region] = (t, v, step)
+
+    def regions(self) -> List[str]:
+        return sorted(set(self._series) | set(self._static))
+
+    def has(self, region: Optional[str]) -> bool:
+        return bool(region) and (region.upper() in self._series or region.upper() in self._static)
+
+    def source_kind(self, region: str) -> Optional[str]:
+        region = region.upper()
+        return "series" if region in self._series else ("average" if region in self._static else None)
+
+    def lookup(self, region: str, ts: float | np.ndarray) -> Optional[float | np.ndarray]:
+        """Intensité (gCO2/kWh) à l'instant ``ts`` (epoch s) ; vectorisé sur un tableau."""
+        region = region.upper()
+        scalar = np.ndim(ts) == 0
+        ts_arr = np.atleast_1d(np.asarray(ts, dtype=np.float64))
+        if region in self._series:
+            t, v, step = self._series[region]
+            i = np.searchsorted(t, ts_arr, side="right") - 1
+            ok = (i >= 0) & (ts_arr < t[np.clip(i, 0, None)] + step)
+            fallback = self._static.get(region, float(v.mean()))
+            out = np.where(ok, v[np.clip(i, 0, None)], fallback).astype(np.float64)
+        elif region in self._static:
+            out = np.full(ts_arr.shape, self._static[region], dtype=np.float64)
+        else:
+            return None
+        return float(out[0]) if scalar else out
+
+    def mean(self, region: str, t0: float, t1: float) -> Optional[float]:
+        """Moyenne pondérée par le temps sur [t0, t1] (fonction en escalier)."""
+        if t1 <= t0:
+            return self.lookup(region, t0)
+        region = region.upper()
+        if region not in self._series:
+            return self.lookup(region, t0)
+        t, _, step = self._series[region]
+        inner = t[(t > t0) & (t < t1)]
+        ends = t[(t + step > t0) & (t + step < t1)] + step  # sorties de couverture
+        pts = np.unique(np.concatenate([[t0], inner, ends, [t1]]).astype(np.float64))
+        vals = self.lookup(region, pts[:-1])
+        w = np.diff(pts)
+        return float(np.dot(vals, w) / w.sum())
+
+    def emissions_g(self, region: str, energy_kwh: Optional[float] = None,
+                    t0: Optional[float] = None, t1: Optional[float] = None,
+                    samples: Optional[Sequence[Tuple[float, float]]] = None) -> Optional[float]:
+        """Émissions (g) : soit ``samples`` = [(t, kWh cumulés)], intégrés intervalle par
+        intervalle ; soit ``energy_kwh`` à puissance constante sur [t0, t1]."""
+        if samples is not None and len(samples) >= 2:
+            s = np.asarray(samples, dtype=np.float64)
+            de = np.diff(s[:, 1])
+            mid = (s[1:, 0] + s[:-1, 0]) / 2.0
+            g = self.lookup(region, mid)
+            return None if g is None else float(np.dot(de, g))
+        if energy_kwh is None or t0 is None:
+            return None
+        g = self.mean(region, t0, t1 if t1 is not None else t0)
+        return None if g is None else energy_kwh * g
+
+
+# ───────────────────────────── Index par défaut ─────────────────────────────
+def default_paths() -> List[Path]:
+    paths = sorted(DATA_DIR.glob("*.csv"))
+    user = os.environ.get("GREEN_INTENSITY_DIR")
+    if user:
+        paths += sorted(Path(p) for p in glob.glob(os.path.join(user, "*.csv")))
+    return paths
+
+
+@lru_cache(maxsize=1)
+def default_index() -> IntensityIndex:
+    return IntensityIndex.from_files(default_paths())
+
+
+def host_region() -> Optional[str]:
+    """GREEN_GRID_REGION, sinon le pays (alpha-2) du profil d'hôte en cache."""
+    r = os.environ.get("GREEN_GRID_REGION") or host.profile()["location"].get("country_iso2")
+    return r.upper() if r else None
+
+
+def annotate(data: Dict[str, Any], t0: float, t1: float, region: Optional[str] = None,
+             index: Optional[IntensityIndex] = None,
+             samples: Optional[Sequence[Tuple[float, float]]] = None) -> Dict[str, Any]:
+    """Ajoute l'estimation locale au résultat d'un wrapper.
+
+    ``samples`` = [(t, kWh cumulés)] (cf. ``TreeSampler.energy_samples``) : chaque
+    intervalle est pondéré par son intensité ; sinon puissance constante sur [t0, t1].
+    Les émissions du tracker sont conservées ; l'estimation locale les remplace
+    seulement si elles manquent, ou si GREEN_INTENSITY=local.
+    """
+    idx = index or default_index()
+    region = (region or host_region() or "").upper()
+    energy = data.get("energy_kwh")
+    if not idx.has(region) or not isinstance(energy, (int, float)):
+        return data
+    weighted = samples is not None and len(samples) >= 2
+    g = idx.emissions_g(region, energy, t0, t1, samples if weighted else None)
+    if g is None:
+        return data
+    gco2 = g / energy if weighted and energy > 0 else idx.mean(region, t0, t1)
+    data["grid"] = {"region": region, "gco2_kwh": gco2, "source": idx.source_kind(region),
+                    "window": [t0, t1], "weighting": "cpu" if weighted else "uniform"}
+    data["emissions_kg_local"] = g / 1000.0
+    if data.get("emissions_kg") is None or os.environ.get("GREEN_INTENSITY") == "local":
+        data["emissions_kg"] = g / 1000.0
+        if "co2eq_g" in data: data["co2eq_g"] = g
+        data["emissions_source"] = "local"
+    if "country" in data and not data["country"]:
+        data["country"] = region
+    return data
+
+
+def now_intensity(region: Optional[str] = None) -> Optional[float]:
+    region = region or host_region()
+    return default_index().lookup(region, time.time()) if region else None
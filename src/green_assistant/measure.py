@@ -0,0 +1,257 @@
+# src/green_assistant/measure.py
+"""Mesure d'un snippet Python (CodeCarbon, Eco2AI) dans un process worker.
+
+``measure()`` lance ``python -m green_assistant.measure`` : tracker, runpy,
+capture de sortie et échantillonneur de l'arbre (green_assistant.proctree)
+tournent dans ce worker. Dans l'app Streamlit, l'arbre attribué au snippet
+est donc le worker et ses enfants, pas le serveur avec les threads des autres
+sessions ; le remplacement de sys.stdout ne touche que le worker ; un
+dépassement de budget ne tue que les process du snippet, et le parent tue le
+worker s'il ne rend pas la main (appel bloquant en C) au-delà du budget
+temps.
+
+Les trackers sont importés à l'appel : un tracker absent donne
+``{"error": "<outil>_missing"}`` au lieu d'empêcher l'import du module.
+Un snippet JavaScript part sous ``node`` (green_assistant.node), en process
+enfant. Utilisé par l'app Streamlit et par ``python -m green_assistant measure``.
+"""
+from __future__ import annotations
+import csv, json, os, runpy, subprocess, sys, tempfile, time, traceback
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from green_assistant import budget, calibration, capture, hotspots, intensity, memory, node, overhead, proctree, trackers
+from green_assistant.analysis import detect_language, preflight_compile
+from green_assistant.work import WorkMeter
+
+
+def _write_snippet(code: str) -> Path:
+    tmp = Path(tempfile.mkdtemp(prefix="code_")) / "snippet.py"; tmp.write_text(code, encoding="utf-8"); return tmp
+
+
+def measure_with_codecarbon(code: str, overhead_mode: str = "off", trace_alloc: bool = False,
+                            output_policy: Optional[str] = None, limits: Optional[Dict[str, float]] = None,
+                            hot_loops: bool = False) -> Dict[str, Any]:
+    try:
+        from codecarbon import EmissionsTracker
+    except Exception as e:
+        return {"error":"codecarbon_missing","notes":"Installe : pip install codecarbon psutil","stderr":str(e)}
+    out_dir = Path(tempfile.mkdtemp(prefix="cc_run_")); csv_path = out_dir / "emissions.csv"
+    os.environ.setdefault("CODECARBON_LOG_LEVEL","error")
+    tracker = trackers.codecarbon_tracker(output_dir=str(out_dir), output_file="emissions.csv", measure_power_secs=1, save_to_file=True, log_level="error")
+    run_err, err_text, emissions_kg = False, "", None; tmp = _write_snippet(code)
+    meter = WorkMeter(); tree = proctree.TreeSampler(os.getpid()); mem = memory.MemoryProfiler(trace_alloc)
+    out = capture.OutputCapture(output_policy)  # sys.stdout du worker seulement (une mesure par process)
+    bud = budget.Budget.from_env(**(limits or {}))  # une boucle infinie collée ne bloque pas le serveur
+    hot = hotspots.Tracer(str(tmp), hot_loops or None)
+    try:
+        tracker.start(); meter.start(); tree.start(); mem.start()
+        try:
+            with out, bud.guard(tree), hot: runpy.run_path(str(tmp), init_globals=meter.globals(), run_name="__main__")
+        except SystemExit: pass
+        except Exception:
+            run_err, err_text = True, traceback.format_exc()
+        finally: mem.stop(); tree.stop(); meter.stop(); emissions_kg = tracker.stop()
+    finally:
+        time.sleep(0.1)
+        try: tmp.unlink(missing_ok=True)
+        except Exception: pass
+    res = {"duration_s": None, "energy_kwh": None, "cpu_energy_kwh": None, "gpu_energy_kwh": None, "ram_energy_kwh": None,
+           "emissions_kg": float(emissions_kg) if emissions_kg is not None else None}
+    try:
+        if csv_path.exists():
+            with csv_path.open("r", encoding="utf-8") as f: rows = list(csv.DictReader(f))
+            if rows:
+                last = rows[-1]
+                def ffloat(x):
+                    try: return float(x) if x not in (None,"","None") else None
+                    except: return None
+                res["duration_s"]     = ffloat(last.get("duration"))
+                res["energy_kwh"]     = ffloat(last.get("energy_consumed"))
+                res["cpu_energy_kwh"] = ffloat(last.get("cpu_energy"))
+                res["gpu_energy_kwh"] = ffloat(last.get("gpu_energy"))
+                res["ram_energy_kwh"] = ffloat(last.get("ram_energy"))
+                res["country"] = last.get("country_name") or None; res["region"] = last.get("region") or None
+                res["cloud_provider"] = last.get("cloud_provider") or None
+                trackers.remember_codecarbon_row(last)
+    except Exception: pass
+    if run_err: res["run_error"]=True; res["stderr"]=err_text.strip()
+    res["output"] = out.to_dict(res["duration_s"], res["energy_kwh"])
+    budget.attach(res, bud)
+    overhead.process(res, "app-codecarbon", lambda f: measure_with_codecarbon(Path(f).read_text(encoding="utf-8")), overhead_mode)
+    intensity.annotate(res, meter.started_at or time.time(), meter.ended_at or time.time(),
+                       samples=tree.energy_samples(res.get("energy_kwh")))
+    proctree.attach(res, tree)
+    memory.attach(res, mem.result)
+    hotspots.attach(res, hot.result, code)
+    res.update(meter.summarize(res["energy_kwh"], res["duration_s"]))
+    return res
+
+
+def measure_with_eco2ai(code: str, overhead_mode: str = "off", trace_alloc: bool = False,
+                        output_policy: Optional[str] = None, limits: Optional[Dict[str, float]] = None,
+                        hot_loops: bool = False) -> Dict[str, Any]:
+    try:
+        import eco2ai  # type: ignore
+        import eco2ai.utils as eco_utils
+    except Exception as e:
+        return {"error": "eco2ai_missing", "notes": "Installe : pip install eco2ai psutil", "stderr": str(e)}
+    out_dir = Path(tempfile.mkdtemp(prefix="eco2ai_out_"))
+    cfg_dir = Path(tempfile.mkdtemp(prefix="eco2ai_cfg_"))
+    csv_path = out_dir / "emissions.csv"
+    cfg_file = cfg_dir / "config.txt"
+    eco_utils.CONFIG_FILE = str(cfg_file)
+    orig_set_params = getattr(eco_utils, "set_params")
+    def forced_set_params(*args, **kwargs):
+        kwargs.setdefault("filename", str(cfg_file))
+        return orig_set_params(*args, **kwargs)
+    tmp = Path(tempfile.mkdtemp(prefix="code_")) / "snippet.py"
+    tmp.write_text(code, encoding="utf-8")
+    data: Dict[str, Any] = {
+        "duration_s": None, "energy_kwh": None,
+        "co2eq_g": None, "emissions_kg": None, "country": None
+    }
+    run_err, err_text = False, ""
+    meter = WorkMeter(); tree = proctree.TreeSampler(os.getpid()); mem = memory.MemoryProfiler(trace_alloc)
+    out = capture.OutputCapture(output_policy)
+    bud = budget.Budget.from_env(**(limits or {}))
+    hot = hotspots.Tracer(str(tmp), hot_loops or None)
+    cwd = os.getcwd()
+    try:
+        eco_utils.set_params = forced_set_params
+        os.chdir(cfg_dir)
+        tracker = eco2ai.Tracker(
+            project_name="GreenAssistant",
+            experiment_description="Eco2AI run",
+            file_name=str(csv_path),
+            **trackers.eco2ai_kwargs()
+        )
+        tracker.start(); meter.start(); tree.start(); mem.start()
+        try:
+            with out, bud.guard(tree), hot:
+                runpy.run_path(str(tmp), init_globals=meter.globals(), run_name="__main__")
+        except SystemExit:
+            pass
+        except Exception:
+            run_err, err_text = True, traceback.format_exc()
+        finally:
+            mem.stop(); tree.stop(); meter.stop()
+            try: tracker.stop()
+            except Exception: pass
+    finally:
+        eco_utils.set_params = orig_set_params
+        try: os.chdir(cwd)
+        except Exception: pass
+        try: tmp.unlink(missing_ok=True)
+        except Exception: pass
+    try:
+        if csv_path.exists():
+            with csv_path.open("r", encoding="utf-8") as f:
+                rows = list(csv.DictReader(f))
+            if rows:
+                last = rows[-1]
+                def ffloat(x, default=None):
+                    try: return float(x) if x not in (None, "", "None") else default
+                    except: return default
+                data["duration_s"] = ffloat(last.get("duration(s)"))
+                data["energy_kwh"] = ffloat(last.get("power_consumption(kWTh)"))
+                co2_kg = ffloat(last.get("CO2_emissions(kg)"))
+                data["emissions_kg"] = co2_kg
+                data["co2eq_g"] = co2_kg * 1000.0 if co2_kg is not None else None
+                data["country"] = last.get("country") or None
+    except Exception:
+        pass
+    if run_err:
+        data["run_error"] = True
+        data["stderr"] = err_text.strip()
+    data["output"] = out.to_dict(data["duration_s"], data["energy_kwh"])
+    budget.attach(data, bud)
+    overhead.process(data, "app-eco2ai", lambda f: measure_with_eco2ai(Path(f).read_text(encoding="utf-8")), overhead_mode)
+    intensity.annotate(data, meter.started_at or time.time(), meter.ended_at or time.time(),
+                       samples=tree.energy_samples(data.get("energy_kwh")))
+    proctree.attach(data, tree)
+    memory.attach(data, mem.result)
+    hotspots.attach(data, hot.result, code)
+    data.update(meter.summarize(data["energy_kwh"], data["duration_s"]))
+    return data
+
+
+def measure_with_node(code: str, tool: str = "codecarbon", output_policy: Optional[str] = None,
+                      limits: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Snippet JavaScript : tracker CodeCarbon autour du process node, sinon estimation CPU de l'arbre.
+    (Pas de surcoût d'instrumentation, de tracemalloc ni de points chauds côté JS.)"""
+    return node.measure_code(code, limits=limits, output_policy=output_policy, tracker=tool)
+
+
+BACKENDS: Dict[str, Callable[..., Dict[str, Any]]] = {"codecarbon": measure_with_codecarbon, "eco2ai": measure_with_eco2ai}
+
+
+def measure(code: str, tool: str = "codecarbon", overhead_mode: str = "off", trace_alloc: bool = False,
+            output_policy: Optional[str] = None, limits: Optional[Dict[str, float]] = None,
+            hot_loops: bool = False) -> Dict[str, Any]:
+    """Pré-vérification syntaxique, mesure avec ``tool`` puis correction de calibration de l'hôte.
+
+    ``limits`` : budgets ``{"wall_s", "cpu_s", "joules"}`` (défaut : GREEN_BUDGET_*).
+    ``hot_loops`` : compteurs d'exécution par boucle (défaut : GREEN_HOTSPOTS).
+    """
+    if detect_language(code) == "javascript":
+        if tool.lower() not in BACKENDS:
+            return {"error": "unsupported_tool", "notes": "Outil non pris en charge."}
+        return measure_with_node(code, tool.lower(), output_policy, limits)  # pas de calibration node
+    ok, tb = preflight_compile(code)
+    if not ok:  # ne lance pas les trackers si la syntaxe est invalide
+        return {"run_error": True, "stderr": tb}
+    if tool.lower() not in BACKENDS:
+        return {"error": "unsupported_tool", "notes": "Outil non pris en charge."}
+    res = _in_worker(tool.lower(), code, overhead_mode, trace_alloc, output_policy, limits, hot_loops)
+    cal = calibration.correct(tool.lower(), res)  # facteurs de l'hôte (bench_all.py --calibrate)
+    if cal: res["calibrated"] = cal
+    return res
+
+
+# ───────────────────────────── Process worker ─────────────────────────────
+SRC_DIR = Path(__file__).resolve().parents[1]
+WORKER_GRACE_S = 30.0  # démarrage du tracker + arrêt après le budget temps, avant de tuer le worker
+
+
+def _in_worker(tool: str, code: str, overhead_mode: str, trace_alloc: bool, output_policy: Optional[str],
+               limits: Optional[Dict[str, float]], hot_loops: bool) -> Dict[str, Any]:
+    """``BACKENDS[tool]`` dans ``python -m green_assistant.measure`` ; résultat par fichier JSON."""
+    work = Path(tempfile.mkdtemp(prefix="green_measure_"))
+    req, out, err = work / "request.json", work / "result.json", work / "worker.log"
+    req.write_text(json.dumps({"tool": tool, "code": code, "overhead_mode": overhead_mode, "trace_alloc": trace_alloc,
+                               "output_policy": output_policy, "limits": limits, "hot_loops": hot_loops}),
+                   encoding="utf-8")
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC_DIR), env.get("PYTHONPATH")]))
+    bud = budget.Budget.from_env(**(limits or {}))
+    t0 = time.time()
+    with err.open("wb") as log:
+        p = subprocess.Popen([sys.executable, "-m", "green_assistant.measure", str(req), str(out)],
+                             env=env, stdout=log if output_policy != "passthrough" else None, stderr=log)
+        try:
+            p.wait(timeout=bud.wall_s + WORKER_GRACE_S if bud.wall_s else None)
+        except subprocess.TimeoutExpired:  # snippet bloqué hors de l'interpréteur : le signal n'a pas suffi
+            proctree.kill_tree(p.pid)
+            bud.exceeded = {"kind": "wall_s", "limit": bud.wall_s, "value": time.time() - t0}
+    try:
+        return json.loads(out.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        data: Dict[str, Any] = {"duration_s": time.time() - t0, "energy_kwh": None, "emissions_kg": None}
+        if bud.exceeded is None:
+            tail = err.read_text(encoding="utf-8", errors="replace")[-4000:] if err.exists() else ""
+            return {**data, "error": "worker_failed", "notes": f"Le process de mesure s'est arrêté (code {p.returncode}).",
+                    "stderr": tail.strip()}
+        return budget.attach({**data, "run_error": True}, bud)
+
+
+def _worker_main(argv: List[str]) -> int:
+    req = json.loads(Path(argv[0]).read_text(encoding="utf-8"))
+    res = BACKENDS[req["tool"]](req["code"], req["overhead_mode"], req["trace_alloc"], req["output_policy"],
+                                req["limits"], req["hot_loops"])
+    Path(argv[1]).write_text(json.dumps(res, default=str), encoding="utf-8")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(_worker_main(sys.argv[1:]))
@@ -0,0 +1,410 @@
+# src/green_assistant/memoize.py
+"""Calcul pur répété : mémoïsation et sortie des invariants de boucle (AST).
+
+Trois motifs, détectés puis réécrits par édition du texte aux positions de
+l'AST (commentaires et mise en forme conservés) :
+
+- ``recursion_sans_cache`` : fonction pure qui s'appelle plusieurs fois
+  (Fibonacci naïf…) ➜ ``@functools.lru_cache(maxsize=MAXSIZE)`` ;
+- ``appel_pur_repete`` : fonction pure coûteuse (boucle ou appel interne)
+  appelée dans une boucle ➜ même décorateur ;
+- ``invariant_dans_boucle`` : appel pur dont les arguments sont des littéraux
+  ou des noms immuables que la boucle ne relie pas ➜ calculé une fois avant
+  la boucle (``_inv_N``). Un appel non pur dans la boucle peut modifier tout
+  objet mutable (alias, état global) : les noms liés à une liste, un
+  paramètre ou tout objet de type inconnu ne sont jamais sortis.
+
+« Pure » est décidé de façon conservatrice : fonction de module sans
+décorateur, ni global/nonlocal, ni yield/await, ni écriture d'attribut ou
+d'indice, qui ne lit aucune variable de module, n'appelle que des builtins
+purs, ``math.*`` ou d'autres fonctions pures, et dont les paramètres ne sont
+pas manipulés comme des conteneurs (``in``, itération, indice, attribut :
+non hachables pour le cache). Une réécriture reste une proposition :
+patterns.greenify_code la vérifie par exécution (verify_rewrite) avant de la
+garder.
+"""
+from __future__ import annotations
+import ast
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+MAXSIZE = 1024
+PURE_BUILTINS = {"abs", "len", "sum", "min", "max", "round", "int", "float", "str", "bool", "tuple", "frozenset",
+                 "pow", "divmod", "hash", "ord", "chr", "any", "all", "range", "isinstance"}
+CONTAINER_RESULT = {"list", "dict", "set", "sorted", "bytearray"}  # résultats mutables : jamais partagés
+ITERATING = {"len", "sum", "sorted", "any", "all", "tuple", "frozenset", "list", "set", "dict", "enumerate", "zip",
+             "map", "filter", "iter", "next", "reversed"}  # parcourent leur argument : conteneur
+SCALAR_RESULT = {"len", "int", "float", "str", "bool", "hash", "ord", "chr", "any", "all",
+                 "isinstance"}  # résultat immuable quels que soient les arguments (abs, sum… : numpy)
+IMPURE_METHODS = {"append", "extend", "insert", "pop", "remove", "clear", "update", "add", "discard", "sort",
+                  "reverse", "setdefault", "popitem", "write", "writelines", "read", "readline", "send", "put"}
+_SCOPES = (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda,
+           ast.ListComp, ast.SetComp, ast.DictComp, ast.GeneratorExp)
+_CONDITIONAL = (ast.If, ast.IfExp, ast.Try, ast.BoolOp, ast.With, ast.AsyncWith, ast.Match)
+LOOPS = (ast.For, ast.AsyncFor, ast.While)
+
+
+def _dotted(node: ast.AST) -> str:
+    if isinstance(node, ast.Name): return node.id
+    if isinstance(node, ast.Attribute): return f"{_dotted(node.value)}.{node.attr}"
+    return ""
+
+
+def _walk_scope(nodes) -> Any:
+    """Nœuds sous ``nodes`` sans entrer dans les fonctions/classes/lambdas imbriquées."""
+    stack = list(nodes)
+    while stack:
+        n = stack.pop()
+        yield n
+        if not isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef, ast.Lambda)):
+            stack.extend(ast.iter_child_nodes(n))
+
+
+# ───────────────────────────── Fonctions pures ─────────────────────────────
+def _param_names(fn: ast.FunctionDef) -> Set[str]:
+    a = fn.args
+    names = {x.arg for x in a.posonlyargs + a.args + a.kwonlyargs}
+    if a.vararg: names.add(a.vararg.arg)
+    if a.kwarg: names.add(a.kwarg.arg)
+    return names
+
+
+def _container_use(n: ast.AST, params: Set[str]) -> bool:
+    """Paramètre manipulé comme un conteneur ou un objet : non hachable ou mutable, mal servi par un cache."""
+    is_param = lambda x: isinstance(x, ast.Name) and x.id in params
+    if isinstance(n, (ast.Subscript, ast.Attribute)):
+        return is_param(n.value)
+    if isinstance(n, (ast.For, ast.AsyncFor, ast.comprehension)):
+        return is_param(n.iter)
+    if isinstance(n, ast.Compare):  # i in xs
+        return any(isinstance(op, (ast.In, ast.NotIn)) and is_param(c) for op, c in zip(n.ops, n.comparators))
+    if isinstance(n, ast.Starred):
+        return is_param(n.value)
+    if isinstance(n, ast.Call):
+        name = _dotted(n.func)
+        if name in ITERATING or (name in ("min", "max") and len(n.args) == 1):
+            return any(is_param(a) for a in n.args)
+    return False
+
+
+def _local_candidate(fn: ast.FunctionDef) -> Tuple[bool, Set[str]]:
+    """(structure compatible avec un cache, noms de fonctions appelées)."""
+    if fn.decorator_list or fn.args.vararg or fn.args.kwarg:
+        return False, set()
+    if any(isinstance(d, (ast.List, ast.Dict, ast.Set)) for d in fn.args.defaults + fn.args.kw_defaults if d):
+        return False, set()
+    params = _param_names(fn)
+    nodes = list(_walk_scope(fn.body))
+    local = params | {n.id for n in nodes if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Store)}
+    callees = {id(n.func) for n in nodes if isinstance(n, ast.Call)}
+    called: Set[str] = set()
+    for n in nodes:
+        if isinstance(n, (ast.Global, ast.Nonlocal, ast.Yield, ast.YieldFrom, ast.Await, ast.Delete)):
+            return False, set()
+        if isinstance(n, (ast.Assign, ast.AugAssign, ast.AnnAssign)):
+            targets = n.targets if isinstance(n, ast.Assign) else [n.target]
+            if any(isinstance(t, (ast.Attribute, ast.Subscript)) for t in targets):
+                return False, set()
+        if _container_use(n, params):
+            return False, set()
+        # lecture d'un nom de module (hors fonction appelée, ``math``) : l'état global peut changer entre deux appels
+        if isinstance(n, ast.Name) and isinstance(n.ctx, ast.Load) and n.id not in local \
+                and id(n) not in callees and n.id != "math":
+            return False, set()
+        if isinstance(n, ast.Call):
+            name = _dotted(n.func)
+            if isinstance(n.func, ast.Attribute) and n.func.attr in IMPURE_METHODS:
+                return False, set()
+            if name.startswith("math.") or name in PURE_BUILTINS:
+                continue
+            if not name or "." in name:
+                return False, set()
+            if name not in local: called.add(name)
+    return True, called
+
+
+def pure_functions(tree: ast.Module) -> Dict[str, ast.FunctionDef]:
+    """Fonctions de module pures (point fixe : une fonction pure n'appelle que du pur)."""
+    defs = {n.name: n for n in tree.body if isinstance(n, ast.FunctionDef)}
+    info = {name: _local_candidate(fn) for name, fn in defs.items()}
+    pure = {name for name, (ok, _) in info.items() if ok}
+    changed = True
+    while changed:
+        changed = False
+        for name in list(pure):
+            if not info[name][1] <= pure:
+                pure.discard(name); changed = True
+    return {name: defs[name] for name in pure}
+
+
+def _self_calls(fn: ast.FunctionDef) -> int:
+    return sum(1 for n in _walk_scope(fn.body) if isinstance(n, ast.Call) and _dotted(n.func) == fn.name)
+
+
+def _expensive(fn: ast.FunctionDef) -> bool:
+    return any(isinstance(n, LOOPS + (ast.ListComp, ast.GeneratorExp, ast.SetComp, ast.DictComp))
+               for n in _walk_scope(fn.body)) or _self_calls(fn) > 0
+
+
+def _returns_container(fn: ast.FunctionDef) -> bool:
+    for n in _walk_scope(fn.body):
+        if isinstance(n, ast.Return) and n.value is not None:
+            v = n.value
+            if isinstance(v, (ast.List, ast.Dict, ast.Set, ast.ListComp, ast.DictComp, ast.SetComp)):
+                return True
+            if isinstance(v, ast.Call) and _dotted(v.func) in CONTAINER_RESULT:
+                return True
+    return False
+
+
+# ───────────────────────────── Invariants de boucle ─────────────────────────────
+def _pure_call(n: ast.Call, pure: Set[str]) -> bool:
+    name = _dotted(n.func)
+    return name in PURE_BUILTINS or name.startswith("math.") or name in pure
+
+
+def _stored(loop: ast.AST) -> Set[str]:
+    """Noms liés ou possiblement modifiés dans la boucle (affectation, indice/attribut, appel de méthode)."""
+    out: Set[str] = set()
+    for n in _walk_scope([loop]):
+        if isinstance(n, ast.Name) and isinstance(n.ctx, (ast.Store, ast.Del)):
+            out.add(n.id)
+        elif isinstance(n, (ast.Subscript, ast.Attribute)) and isinstance(n.ctx, (ast.Store, ast.Del)) \
+                or isinstance(n, ast.Call) and isinstance(n.func, ast.Attribute):
+            base = n.func.value if isinstance(n, ast.Call) else n.value
+            while isinstance(base, (ast.Subscript, ast.Attribute)): base = base.value
+            if isinstance(base, ast.Name) and base.id != "math": out.add(base.id)
+        elif isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            out.add(n.name)
+    return out
+
+
+def _immutable_expr(v: ast.AST, names: Set[str]) -> bool:
+    if isinstance(v, ast.Constant):
+        return True
+    if isinstance(v, ast.Name):
+        return v.id in names
+    if isinstance(v, ast.Tuple):
+        return all(_immutable_expr(e, names) for e in v.elts)
+    if isinstance(v, ast.UnaryOp):
+        return _immutable_expr(v.operand, names)
+    if isinstance(v, ast.BinOp):
+        return _immutable_expr(v.left, names) and _immutable_expr(v.right, names)
+    if isinstance(v, ast.BoolOp):
+        return all(_immutable_expr(e, names) for e in v.values)
+    if isinstance(v, ast.Compare):  # arr > 0 est un tableau numpy : opérandes immuables exigés
+        return all(_immutable_expr(e, names) for e in [v.left] + v.comparators)
+    if isinstance(v, ast.Call):  # int(input()), len(xs), math.sqrt(…) : scalaire quels que soient les arguments
+        name = _dotted(v.func)
+        return name in SCALAR_RESULT or name.startswith("math.")
+    return False
+
+
+def immutable_names(scope: ast.AST, rebound: Set[str]) -> Set[str]:
+    """Noms de ``scope`` liés uniquement à des valeurs immuables (littéraux, scalaires) : ni un alias
+    ni un appel ne peut les modifier. ``rebound`` : noms déclarés global/nonlocal quelque part (exclus)."""
+    bindings: Dict[str, List[Optional[ast.AST]]] = {}
+    bind = lambda name, value: bindings.setdefault(name, []).append(value)  # None : valeur de type inconnu
+    if isinstance(scope, (ast.FunctionDef, ast.AsyncFunctionDef)):
+        for p in _param_names(scope): bind(p, None)
+    nodes = list(_walk_scope(scope.body))
+    known: Set[int] = set()
+    for n in nodes:
+        if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+            bind(n.name, None)
+        elif isinstance(n, ast.Assign):
+            for t in n.targets:
+                if isinstance(t, ast.Name): bind(t.id, n.value); known.add(id(t))
+        elif isinstance(n, (ast.AugAssign, ast.AnnAssign)) and isinstance(n.target, ast.Name):
+            bind(n.target.id, n.value if n.value is not None else ast.Constant(None)); known.add(id(n.target))
+        elif isinstance(n, (ast.For, ast.AsyncFor)) and isinstance(n.target, ast.Name):
+            rng = isinstance(n.iter, ast.Call) and _dotted(n.iter.func) == "range"
+            bind(n.target.id, ast.Constant(0) if rng else None); known.add(id(n.target))
+        elif isinstance(n, (ast.Import, ast.ImportFrom)):
+            for a in n.names: bind((a.asname or a.name).split(".")[0], None)
+    for n in nodes:  # autres liaisons (cibles de tuple, with/except … as, :=, comprehension)
+        if isinstance(n, ast.Name) and isinstance(n.ctx, (ast.Store, ast.Del)) and id(n) not in known:
+            bind(n.id, None)
+    names = set(bindings) - rebound
+    changed = True
+    while changed:  # point fixe : b = a + 1 n'est immuable que si a l'est
+        changed = False
+        for k in list(names):
+            if not all(v is not None and _immutable_expr(v, names) for v in bindings[k]):
+                names.discard(k); changed = True
+    return names
+
+
+def _is_invariant(node: ast.Call, hoistable: Set[str], pure: Dict[str, ast.FunctionDef]) -> bool:
+    """Appel pur dont chaque nom lu est un littéral ou un nom immuable non modifié par la boucle."""
+    callees = {id(n.func) for n in ast.walk(node) if isinstance(n, ast.Call)}
+    modules = {id(n.value) for n in ast.walk(node) if isinstance(n, ast.Attribute) and _dotted(n).startswith("math.")}
+    for n in ast.walk(node):
+        if isinstance(n, _SCOPES) or isinstance(n, (ast.NamedExpr, ast.Starred, ast.Await)):
+            return False
+        if isinstance(n, ast.Name) and id(n) not in callees and id(n) not in modules and n.id not in hoistable:
+            return False
+        if isinstance(n, ast.Attribute) and id(n) not in callees and not _dotted(n).startswith("math."):
+            return False
+        if isinstance(n, ast.Call):
+            name = _dotted(n.func)
+            if name.startswith("math.") or name in PURE_BUILTINS:
+                continue
+            if name in pure and not _returns_container(pure[name]):
+                continue
+            return False
+    return True
+
+
+def _invariant_calls(loop: ast.AST, pure: Dict[str, ast.FunctionDef], immutable: Set[str]) -> List[ast.Call]:
+    """Appels maximaux invariants, exécutés à chaque itération (hors branches conditionnelles).
+
+    Un appel non pur dans la boucle peut tout modifier (alias, état global) : seuls restent
+    hoistables les littéraux et les noms ``immutable`` que la boucle ne relie pas."""
+    hoistable = immutable - _stored(loop)
+    found: List[ast.Call] = []
+
+    def visit(node: ast.AST) -> None:
+        for child in ast.iter_child_nodes(node):
+            if isinstance(child, _SCOPES + _CONDITIONAL):
+                continue
+            if isinstance(child, ast.Call) and child.args + child.keywords and _is_invariant(child, hoistable, pure):
+                if _dotted(child.func) != "range":  # itérable d'une boucle interne : sans intérêt
+                    found.append(child); continue
+            visit(child)
+
+    for stmt in loop.body:
+        if not isinstance(stmt, _SCOPES + _CONDITIONAL):
+            visit(stmt)
+    return found
+
+
+def _loops_by_scope(tree: ast.Module) -> List[Tuple[ast.AST, List[ast.AST]]]:
+    """(portée, boucles qu'elle contient directement) pour le module et chaque fonction."""
+    scopes = [tree] + [n for n in ast.walk(tree) if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+    return [(sc, [n for n in _walk_scope(sc.body) if isinstance(n, LOOPS)]) for sc in scopes]
+
+
+# ───────────────────────────── Détection ─────────────────────────────
+def analyse(code: str) -> Dict[str, Any]:
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return {"recursive": [], "repeated": [], "invariants": []}
+    pure = pure_functions(tree)
+    recursive = [fn for fn in pure.values() if _self_calls(fn) >= 2]
+    in_loops: Set[str] = set()
+    invariants: List[Tuple[ast.AST, List[ast.Call]]] = []
+    taken: Set[int] = set()
+    rebound = {name for n in ast.walk(tree) if isinstance(n, (ast.Global, ast.Nonlocal)) for name in n.names}
+    for scope, loops in _loops_by_scope(tree):
+        immutable = immutable_names(scope, rebound)
+        for loop in sorted(loops, key=lambda n: (n.lineno, n.col_offset)):
+            for n in _walk_scope(loop.body):
+                if isinstance(n, ast.Call) and _dotted(n.func) in pure: in_loops.add(_dotted(n.func))
+            calls = [c for c in _invariant_calls(loop, pure, immutable) if id(c) not in taken]
+            for c in calls:
+                taken.update(id(x) for x in ast.walk(c))  # déjà sorti d'une boucle englobante
+            if calls: invariants.append((loop, calls))
+    invariants.sort(key=lambda li: (li[0].lineno, li[0].col_offset))
+    repeated = [pure[name] for name in sorted(in_loops)
+                if pure[name] not in recursive and _expensive(pure[name])]
+    return {"tree": tree, "recursive": recursive, "repeated": repeated, "invariants": invariants}
+
+
+def detect(code: str) -> List[str]:
+    a = analyse(code)
+    return ([s for s, k in (("recursion_sans_cache", "recursive"), ("appel_pur_repete", "repeated"),
+                            ("invariant_dans_boucle", "invariants")) if a[k]])
+
+
+# ───────────────────────────── Réécriture ─────────────────────────────
+class SourceEdits:
+    """Éditions par positions AST (lignes 1-based, colonnes en octets UTF-8)."""
+
+    def __init__(self, code: str) -> None:
+        self.code = code if code.endswith("\n") or not code else code + "\n"
+        self.lines = self.code.splitlines(keepends=True)
+        self._starts = [0]
+        for line in self.lines: self._starts.append(self._starts[-1] + len(line))
+        self.edits: List[Tuple[int, int, str]] = []
+
+    def index(self, lineno: int, col: int) -> int:
+        line = self.lines[lineno - 1] if lineno - 1 < len(self.lines) else ""
+        return self._starts[lineno - 1] + len(line.encode("utf-8")[:col].decode("utf-8", errors="ignore"))
+
+    def indent(self, lineno: int) -> str:
+        line = self.lines[lineno - 1]
+        return line[: len(line) - len(line.lstrip())]
+
+    def insert_line(self, lineno: int, text: str, first: bool = False) -> None:
+        """``first`` : avant les insertions déjà enregistrées à la même ligne (imports)."""
+        i = self._starts[min(max(lineno, 1), len(self._starts)) - 1]  # au-delà de la fin : fin du code
+        edit = (i, i, text if text.endswith("\n") else text + "\n")
+        if first: self.edits.insert(0, edit)
+        else: self.edits.append(edit)
+
+    def replace(self, node: ast.AST, text: str) -> None:
+        self.edits.append((self.index(node.lineno, node.col_offset), self.index(node.end_lineno, node.end_col_offset), text))
+
+    def segment(self, node: ast.AST) -> str:
+        return self.code[self.index(node.lineno, node.col_offset): self.index(node.end_lineno, node.end_col_offset)]
+
+    def apply(self) -> str:
+        out = self.code
+        order = sorted(range(len(self.edits)), key=lambda k: (self.edits[k][0], self.edits[k][1], k), reverse=True)
+        for start, end, text in (self.edits[k] for k in order):  # même position : ordre d'ajout conservé
+            out = out[:start] + text + out[end:]
+        return out
+
+
+def import_line(tree: ast.Module, module: str) -> Tuple[int, Optional[str]]:
+    """(ligne où insérer ``import <module>``, nom local si déjà importé : ``np`` pour ``import numpy as np``)."""
+    after = 1
+    body = tree.body
+    if body and isinstance(body[0], ast.Expr) and isinstance(getattr(body[0], "value", None), ast.Constant) \
+            and isinstance(body[0].value.value, str):
+        after = body[0].end_lineno + 1
+    for n in body:
+        if isinstance(n, ast.Import):
+            for a in n.names:
+                if a.name == module: return 0, a.asname or module
+    for n in body:
+        if isinstance(n, ast.ImportFrom) and n.module == "__future__":
+            after = n.end_lineno + 1
+    return after, None
+
+
+def rewrite_memoize(code: str) -> Tuple[str, List[str]]:
+    """Ajoute ``@functools.lru_cache`` aux fonctions pures récursives ou appelées en boucle."""
+    a = analyse(code)
+    fns = a["recursive"] + a["repeated"]
+    if not fns:
+        return code, []
+    src = SourceEdits(code)
+    line, alias = import_line(a["tree"], "functools")  # ``import functools as ft`` => @ft.lru_cache
+    for fn in fns:
+        src.insert_line(fn.lineno, f"{src.indent(fn.lineno)}@{alias or 'functools'}.lru_cache(maxsize={MAXSIZE})")
+    if alias is None:
+        src.insert_line(line, "import functools", first=True)  # avant un décorateur en ligne 1
+    return src.apply(), [fn.name for fn in fns]
+
+
+def rewrite_hoist(code: str) -> Tuple[str, int]:
+    """Sort les appels invariants des boucles (``_inv_N = …`` avant la boucle)."""
+    a = analyse(code)
+    if not a["invariants"]:
+        return code, 0
+    src = SourceEdits(code)
+    k, used = 0, {n.id for n in ast.walk(a["tree"]) if isinstance(n, ast.Name)}
+    for loop, calls in a["invariants"]:
+        seen: Dict[str, str] = {}  # même expression => même variable
+        for c in calls:
+            seg = src.segment(c)
+            if seg not in seen:
+                k += 1
+                while f"_inv_{k}" in used: k += 1
+                seen[seg] = f"_inv_{k}"
+            src.replace(c, seen[seg])
+        pad = src.indent(loop.lineno)
+        src.insert_line(loop.lineno, "".join(f"{pad}{v} = {seg}\n" for seg, v in seen.items()))
+    return src.apply(), k
@@ -0,0 +1,148 @@
+# src/green_assistant/memory.py
+"""Empreinte mémoire du snippet mesuré : RSS, allocations, sites chauds.
+
+Toujours relevés (coût négligeable) : RSS début/fin, blocs alloués nets
+(``sys.getallocatedblocks``) et collectes du GC par génération ; une collecte
+de génération 0 a lieu tous les ``gc.get_threshold()[0]`` conteneurs alloués
+nets, d'où une estimation du nombre d'allocations.
+
+Opt-in (GREEN_TRACEMALLOC=1 ou ``trace=True``) : pic ``tracemalloc`` et top
+des lignes qui allouent, relevé au voisinage du pic (un thread reprend un
+instantané à chaque hausse de 20 %). tracemalloc ralentit fortement le code
+alloueur : l'énergie mesurée dans ce mode est surestimée.
+"""
+from __future__ import annotations
+import gc, os, sys, threading, tracemalloc
+from typing import Any, Dict, List, Optional
+
+import psutil
+
+MB = 1024 * 1024
+# fichiers de la machinerie de mesure, exclus du top des allocations
+_IGNORED = ("<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<frozen runpy>",
+            "<unknown>", tracemalloc.__file__, threading.__file__, __file__)
+PEAK_STEP = 1.2  # nouvel instantané quand la mémoire tracée dépasse le précédent de 20 %
+
+
+def tracing_enabled() -> bool:
+    return os.environ.get("GREEN_TRACEMALLOC", "").lower() in ("1", "true", "yes", "on")
+
+
+def _gc_collections() -> List[int]:
+    return [int(s.get("collections", 0)) for s in gc.get_stats()]
+
+
+class MemoryProfiler:
+    def __init__(self, trace: Optional[bool] = None, top: int = 10, frames: int = 1, interval: float = 0.1) -> None:
+        self.trace = tracing_enabled() if trace is None else trace
+        self.top, self.frames, self.interval = top, frames, interval
+        self._proc = psutil.Process()
+        self._owns_trace = False
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._peak_snap: Optional[tracemalloc.Snapshot] = None
+        self._peak_size = 0
+        self.result: Dict[str, Any] = {}
+
+    def start(self) -> "MemoryProfiler":
+        if self.trace:
+            if tracemalloc.is_tracing():
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start(self.frames); self._owns_trace = True
+            self._traced0 = tracemalloc.get_traced_memory()[0]
+            self._thread = threading.Thread(target=self._watch, name="green-memory", daemon=True)
+            self._thread.start()
+        self._rss0 = self._proc.memory_info().rss
+        self._blocks0 = sys.getallocatedblocks()
+        self._gc0 = _gc_collections()
+        return self
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            current = tracemalloc.get_traced_memory()[0] - self._traced0
+            if current > max(MB, self._peak_size * PEAK_STEP):
+                self._peak_snap, self._peak_size = tracemalloc.take_snapshot(), current
+
+    def stop(self) -> Dict[str, Any]:
+        if not hasattr(self, "_rss0"):  # jamais démarré
+            return self.result
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        gc_delta = [b - a for a, b in zip(self._gc0, _gc_collections())]
+        out: Dict[str, Any] = {
+            "rss_start_mb": self._rss0 / MB, "rss_end_mb": self._proc.memory_info().rss / MB,
+            "allocated_blocks_delta": sys.getallocatedblocks() - self._blocks0,
+            "gc_collections": gc_delta,
+            "container_allocs_est": gc_delta[0] * gc.get_threshold()[0] if gc_delta else None,
+            "tracemalloc": None,
+        }
+        if self.trace and tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            filters = [tracemalloc.Filter(False, f) for f in _IGNORED if f]
+            end_stats = tracemalloc.take_snapshot().filter_traces(filters).statistics("lineno")
+            at_peak = self._peak_snap is not None and self._peak_size > current - self._traced0
+            stats = self._peak_snap.filter_traces(filters).statistics("lineno") if at_peak else end_stats
+            if self._owns_trace:
+                tracemalloc.stop()
+            self._peak_snap = None
+            out["tracemalloc"] = {
+                "peak_mb": max(0, peak - self._traced0) / MB,
+                "retained_mb": max(0, current - self._traced0) / MB,
+                "live_blocks": sum(s.count for s in end_stats),
+                "top_at": "peak" if at_peak else "end",
+                "top": [{"file": s.traceback[0].filename, "line": s.traceback[0].lineno,
+                         "size_kb": s.size / 1024, "count": s.count} for s in stats[: self.top]],
+            }
+        self.result = out
+        return out
+
+
+# ───────────────────────────── Motifs mémoire ─────────────────────────────
+ALLOC_RATE_HIGH = 1e6   # conteneurs alloués / s
+GEN2_HIGH = 3           # collectes complètes pendant la mesure
+PEAK_HIGH_MB = 256.0
+RETAINED_HIGH_MB = 64.0
+
+
+def smells(mem: Dict[str, Any], duration_s: Optional[float] = None, energy_kwh: Optional[float] = None,
+           ram_energy_kwh: Optional[float] = None) -> List[Dict[str, Any]]:
+    """Motifs « allocation → énergie » déduits de la mesure (et non du code source)."""
+    out: List[Dict[str, Any]] = []
+    ram_share = (ram_energy_kwh / energy_kwh) if (isinstance(ram_energy_kwh, (int, float))
+                                                  and isinstance(energy_kwh, (int, float)) and energy_kwh) else None
+    allocs = mem.get("container_allocs_est") or 0
+    if duration_s and allocs / duration_s > ALLOC_RATE_HIGH:
+        out.append({"smell": "allocations_intensives",
+                    "detail": f"~{allocs / duration_s:,.0f} objets alloués/s : le temps CPU part en malloc/GC."})
+    gen2 = (mem.get("gc_collections") or [0, 0, 0])[-1]
+    if gen2 >= GEN2_HIGH:
+        out.append({"smell": "gc_complet_repete", "detail": f"{gen2} collectes complètes (génération 2) pendant la mesure."})
+    tm = mem.get("tracemalloc") or {}
+    peak = tm.get("peak_mb")
+    if peak is None and mem.get("peak_rss_mb") is not None:
+        peak = mem["peak_rss_mb"] - (mem.get("rss_start_mb") or 0.0)
+    if peak is not None and peak > PEAK_HIGH_MB:
+        detail = f"Pic de {peak:.0f} Mo"
+        if ram_share is not None: detail += f" ; la RAM compte pour {ram_share:.0%} de l'énergie"
+        out.append({"smell": "pic_memoire_eleve", "detail": detail + "."})
+    if (tm.get("retained_mb") or 0.0) > RETAINED_HIGH_MB:
+        out.append({"smell": "memoire_retenue", "detail": f"{tm['retained_mb']:.0f} Mo encore alloués en fin d'exécution."})
+    return out
+
+
+def attach(data: Dict[str, Any], mem: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Ajoute ``memory`` (et ``memory_smells``) au résultat d'un wrapper.
+    À appeler après proctree.attach : le pic RSS vient de l'échantillonneur."""
+    if not mem:
+        return data
+    mem = dict(mem)
+    pt = data.get("process_tree") or {}
+    if pt.get("peak_rss_mb") is not None:
+        mem["peak_rss_mb"] = pt["peak_rss_mb"]
+    data["memory"] = mem
+    found = smells(mem, data.get("duration_s"), data.get("energy_kwh"), data.get("ram_energy_kwh"))
+    if found:
+        data["memory_smells"] = found
+    return data
@@ -0,0 +1,147 @@
+# src/green_assistant/node.py
+"""Snippets JavaScript : exécution sous ``node``, process enfant suivi.
+
+Binaire : GREEN_NODE, sinon ``node`` du PATH. Le snippet est lancé comme le
+runner Python de codecarbon-api.py : sortie bornée (capture.ChildOutput),
+arbre de process échantillonné (child_process, workers en process séparés),
+budgets GREEN_BUDGET_* (l'arbre est tué au dépassement).
+
+Énergie :
+
+- CodeCarbon installé (``tracker="codecarbon"``) : le tracker encadre le
+  process, l'énergie machine est attribuée à l'arbre au prorata du CPU
+  (green_assistant.proctree) ;
+- sinon : estimation CPU de l'arbre × puissance par cœur (TDP du profil
+  d'hôte / nb de cœurs, comme le budget énergie), ``energy_source`` le dit.
+
+Le CPU de l'arbre est le plus grand de l'échantillonnage et du temps CPU des
+enfants récoltés (``os.times``) : un snippet trop bref pour être échantillonné
+est quand même compté.
+"""
+from __future__ import annotations
+import os, shutil, subprocess, tempfile, time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import psutil
+
+from green_assistant import budget, capture, intensity, proctree, trackers
+
+SUFFIXES = (".js", ".mjs", ".cjs")
+KWH = 3.6e6  # J
+
+
+def binary() -> Optional[str]:
+    return shutil.which(os.environ.get("GREEN_NODE") or "node")
+
+
+def version(node: str) -> Optional[str]:
+    try:
+        return subprocess.run([node, "--version"], capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def is_js(path: str | Path) -> bool:
+    return Path(path).suffix.lower() in SUFFIXES
+
+
+def _children_cpu_s() -> float:
+    t = os.times()
+    return t.children_user + t.children_system
+
+
+def _tracker(name: Optional[str]):
+    """Tracker autour du process node (CodeCarbon seulement), None s'il est absent."""
+    if name != "codecarbon":
+        return None
+    try:
+        return trackers.codecarbon_tracker(output_dir=tempfile.mkdtemp(prefix="cc_node_"), measure_power_secs=1,
+                                           save_to_file=False, log_level="error")
+    except Exception:  # codecarbon absent ou mal configuré : estimation CPU
+        return None
+
+
+def _from_tracker(tracker, emissions_kg: Optional[float], data: Dict[str, Any]) -> None:
+    e = getattr(tracker, "final_emissions_data", None)
+    for key, attr in (("energy_kwh", "energy_consumed"), ("cpu_energy_kwh", "cpu_energy"),
+                      ("ram_energy_kwh", "ram_energy"), ("gpu_energy_kwh", "gpu_energy")):
+        v = getattr(e, attr, None)
+        data[key] = float(v) if isinstance(v, (int, float)) else None
+    data["emissions_kg"] = float(emissions_kg) if isinstance(emissions_kg, (int, float)) else None
+    data["energy_source"] = "codecarbon"
+
+
+def _estimate(data: Dict[str, Any], cpu_s: float) -> None:
+    kwh = cpu_s * budget.watts_per_core() / KWH
+    data.update({"energy_kwh": kwh, "cpu_energy_kwh": kwh, "energy_source": "estimation_cpu"})
+    pt = data.get("process_tree")
+    if pt:  # l'estimation porte déjà sur l'arbre seul : rien à répartir au prorata de la machine
+        pt["energy_kwh_attributed"] = kwh
+        for c in pt["children"]:
+            c["energy_kwh"] = kwh * c["cpu_share_of_tree"] if c.get("cpu_share_of_tree") is not None else None
+
+
+def measure(path: str | Path, limits: Optional[Dict[str, float]] = None, output_policy: Optional[str] = None,
+            tracker: Optional[str] = "codecarbon") -> Tuple[Dict[str, Any], Optional[proctree.TreeSampler]]:
+    """Exécute ``node <path>`` et renvoie (résultat, échantillonneur de l'arbre)."""
+    node = binary()
+    if node is None:
+        return {"error": "node_missing", "notes": "Installe Node.js (https://nodejs.org) ou définis GREEN_NODE.",
+                "stderr": ""}, None
+    script = Path(path).resolve()  # cwd = dossier du script : un chemin relatif serait résolu deux fois
+    if not script.is_file():
+        return {"error": "script_not_found", "notes": f"Fichier introuvable : {script}", "stderr": ""}, None
+    out = capture.ChildOutput(output_policy)
+    bud = budget.Budget.from_env(**(limits or {}))
+    tr = _tracker(tracker)
+    tree: Optional[proctree.TreeSampler] = None
+    cpu0 = _children_cpu_s()
+    if tr is not None: tr.start()
+    t0 = time.time()
+    try:
+        p = subprocess.Popen([node, str(script)], cwd=str(script.parent), **out.popen_kwargs())
+        out.start(p)
+        try:
+            tree = proctree.TreeSampler(p.pid).start()
+            bud.watch(tree, lambda: proctree.kill_tree(p.pid))
+        except psutil.Error:  # déjà terminé : seul le CPU récolté (os.times) compte
+            tree = None
+        p.wait()
+        bud.stop()
+        out.join(tree=tree)
+        if tree: tree.stop()
+    finally:
+        t1 = time.time()
+        emissions = tr.stop() if tr is not None else None
+    cpu_s = max(tree.tree_cpu_s() if tree else 0.0, _children_cpu_s() - cpu0)
+    data: Dict[str, Any] = {
+        "duration_s": t1 - t0, "energy_kwh": None, "cpu_energy_kwh": None, "gpu_energy_kwh": None,
+        "ram_energy_kwh": None, "emissions_kg": None, "cpu_time_s": cpu_s,
+        "returncode": p.returncode, "stderr": out.stderr.strip() if p.returncode else "",
+        "output": out.to_dict(), "runtime": {"language": "javascript", "node": version(node)},
+    }
+    if p.returncode and bud.exceeded is None:
+        data["run_error"] = True
+    budget.attach(data, bud)
+    if data.get("run_error") and f"Cannot find module '{script}'" in data["stderr"]:
+        data["notes"] = "Le script n'a pas démarré : aucune énergie attribuée."  # node n'a rien exécuté
+        if tree: proctree.attach(data, tree)
+    elif tr is not None:
+        _from_tracker(tr, emissions, data)
+        if tree: proctree.attach(data, tree)
+    else:
+        if tree: proctree.attach(data, tree)
+        _estimate(data, cpu_s)
+    intensity.annotate(data, t0, t1, samples=tree.energy_samples(data.get("energy_kwh")) if tree else None)
+    return data, tree
+
+
+def measure_code(code: str, **kwargs: Any) -> Dict[str, Any]:
+    """``measure`` sur un snippet en mémoire (fichier temporaire ``.js``)."""
+    tmp = Path(tempfile.mkdtemp(prefix="code_")) / "snippet.js"
+    tmp.write_text(code, encoding="utf-8")
+    try:
+        return measure(tmp, **kwargs)[0]
+    finally:
+        tmp.unlink(missing_ok=True)
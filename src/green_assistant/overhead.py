@@ -0,0 +1,83 @@
+# src/green_assistant/overhead.py
+"""Surcoût fixe d'instrumentation : auto-calibration par backend et par hôte.
+
+Chaque backend mesure un snippet vide (``pass``) avec sa propre configuration ;
+le résultat (médiane de quelques runs) est mis en cache par (empreinte
+matérielle de l'hôte, backend) et rapporté dans le champ ``overhead``. En mode
+``subtract``, il est retranché des totaux (valeurs brutes conservées dans
+``raw_*``).
+
+Mode piloté par GREEN_OVERHEAD = off (défaut) | report | subtract.
+"""
+from __future__ import annotations
+import os, statistics, tempfile, time
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional
+
+from green_assistant.host import cache_dir, profile_key, read_json, write_json
+
+MODES = ("off", "report", "subtract")
+METRICS = ("duration_s", "energy_kwh", "emissions_kg")
+TTL_S = 7 * 24 * 3600
+CACHE_FILE = "overhead.json"
+
+
+def mode(default: str = "off") -> str:
+    m = (os.environ.get("GREEN_OVERHEAD") or default).strip().lower()
+    return m if m in MODES else default
+
+
+def calibrate(backend: str, measure: Callable[[str], Dict[str, Any]], repeats: int = 3,
+              force: bool = False, ttl_s: float = TTL_S) -> Optional[Dict[str, Any]]:
+    """Renvoie le surcoût (médianes) du backend, depuis le cache ou en mesurant un snippet vide."""
+    path = cache_dir() / CACHE_FILE
+    cache = read_json(path)
+    key = f"{profile_key()}::{backend}"  # empreinte matérielle, comme calibration.json
+    hit = cache.get(key)
+    if hit and not force and time.time() - hit.get("measured_at", 0) < ttl_s:
+        return hit
+
+    with tempfile.TemporaryDirectory(prefix="green_overhead_") as d:
+        empty = Path(d) / "empty.py"
+        empty.write_text("pass\n", encoding="utf-8")
+        runs = []
+        for _ in range(max(1, repeats)):
+            try: runs.append(measure(str(empty)))
+            except Exception: pass
+    entry: Dict[str, Any] = {"backend": backend, "measured_at": time.time(), "n": 0}
+    for m in METRICS:
+        vals = [float(r[m]) for r in runs if isinstance(r.get(m), (int, float))]
+        entry[m] = statistics.median(vals) if vals else None
+        entry["n"] = max(entry["n"], len(vals))
+    if not entry["n"]:
+        return None
+    cache = read_json(path)  # relu : un autre process a pu écrire entre-temps
+    cache[key] = entry
+    try: write_json(path, cache)
+    except Exception: pass
+    return entry
+
+
+def apply(data: Dict[str, Any], overhead: Optional[Dict[str, Any]], subtract: bool) -> Dict[str, Any]:
+    if not overhead:
+        return data
+    data["overhead"] = {m: overhead.get(m) for m in METRICS} | {"n": overhead.get("n")}
+    if subtract:
+        for m in METRICS:
+            v, o = data.get(m), overhead.get(m)
+            if isinstance(v, (int, float)) and isinstance(o, (int, float)):
+                data["raw_" + m] = v
+                data[m] = max(0.0, v - o)
+        if isinstance(data.get("emissions_kg"), (int, float)) and "co2eq_g" in data:
+            data["co2eq_g"] = data["emissions_kg"] * 1000.0
+        data["overhead_subtracted"] = True
+    return data
+
+
+def process(data: Dict[str, Any], backend: str, measure: Callable[[str], Dict[str, Any]],
+            mode_: Optional[str] = None) -> Dict[str, Any]:
+    """Point d'entrée des wrappers : calibre (si besoin) puis rapporte / soustrait."""
+    m = mode_ or mode()
+    if m == "off" or data.get("error"):
+        return data
+    return apply(data, calibrate(backend, measure), subtract=(m == "subtract"))
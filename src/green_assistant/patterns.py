@@ -0,0 +1,244 @@
+# src/green_assistant/patterns.py
+"""RAG local : patterns « green » et réécriture prudente du code (génération).
+
+``verify_rewrite`` exécute l'original et la réécriture (sous-process, plusieurs
+runs) : mêmes sorties et mêmes globals simples, et gain de temps ou non.
+"""
+from __future__ import annotations
+import hashlib, json, os, re, statistics, subprocess, sys, tempfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from green_assistant import dataframes, memoize
+
+
+class GreenPattern:
+    def __init__(self, pid: str, title: str, smell: Optional[str], keywords: List[str], template_hint: str):
+        self.pid = pid; self.title = title; self.smell = smell; self.keywords = keywords; self.template_hint = template_hint
+
+
+GREEN_PATTERNS: List[GreenPattern] = [
+    GreenPattern("P001","Concaténation en boucle ➜ join()/StringIO","concat_string_dans_boucle",
+                 ["+=", "string", "boucle", "for", "concat"], "Remplacer s += ... par ''.join(parts)."),
+    GreenPattern("P002","HTTP répétitives ➜ Session + parallélisme","requetes_repetitives_sequentielles",
+                 ["requests.get","for","http","url","session"], "Session + ThreadPoolExecutor / asyncio."),
+    GreenPattern("P003","I/O dans boucle ➜ bufferisation","IO_dans_boucle",
+                 ["open(","read(","write(","for"], "open() hors boucle + écriture en bloc."),
+    GreenPattern("P004","sleep() en boucle ➜ scheduler/backoff","sleep_dans_boucle",
+                 ["time.sleep(","for","polling"], "Scheduler, events, backoff exponentiel."),
+    GreenPattern("P005","NumPy dispo ➜ vectorisation","non_vectorise_alors_numpy_dispo",
+                 ["numpy","for","+=","array"], "Remplacer boucles par opérations vectorisées."),
+    GreenPattern("P006","Récursion pure ➜ functools.lru_cache","recursion_sans_cache",
+                 ["def","return","recursion","fib"], "@functools.lru_cache(maxsize=1024) sur la fonction pure."),
+    GreenPattern("P007","Appel pur répété en boucle ➜ cache borné","appel_pur_repete",
+                 ["def","for","while","cache"], "Mémoïser la fonction pure (lru_cache borné)."),
+    GreenPattern("P008","Invariant de boucle ➜ calcul avant la boucle","invariant_dans_boucle",
+                 ["for","while","len(","math."], "Calculer une fois avant la boucle, réutiliser la variable."),
+    GreenPattern("P009","iterrows/itertuples ➜ réduction sur les colonnes","accumulation_iterrows",
+                 ["iterrows","itertuples","pandas","+=","append"], "(df[\"a\"] * df[\"b\"]).sum() au lieu d'accumuler ligne par ligne."),
+    GreenPattern("P010","apply(axis=1) ➜ expression vectorisée","apply_ligne_par_ligne",
+                 ["apply(","axis=1","lambda","pandas"], "df[\"a\"] * 2 + df[\"b\"] ; np.where pour les conditions."),
+    GreenPattern("P011","df[col][i] = … en boucle ➜ affectation de colonne","affectation_chainee_boucle",
+                 [".loc[",".at[","range(len(","pandas"], "df[\"c\"] = df[\"a\"] + df[\"b\"] en une fois."),
+    GreenPattern("P012","pd.concat en boucle ➜ un seul concat","concat_dans_boucle",
+                 ["concat(","for","pandas","append"], "parts.append(part) puis pd.concat(parts) après la boucle."),
+    GreenPattern("P013","JS : fs.*Sync en boucle ➜ fs.promises / flux","fs_sync_dans_boucle",
+                 ["readFileSync","writeFileSync","appendFileSync","for"], "await Promise.all(files.map(f => fs.promises.readFile(f)))."),
+    GreenPattern("P014","JS : concaténation en boucle ➜ tableau + join","concat_string_dans_boucle_js",
+                 ["+=","let","for","string"], "parts.push(x) puis parts.join('')."),
+    GreenPattern("P015","JS : await séquentiel ➜ Promise.all","await_sequentiel_dans_boucle",
+                 ["await","for","async","fetch("], "await Promise.all(items.map(async x => …)) (pool borné si besoin)."),
+]
+
+
+def retrieve_patterns(code: str, smells: List[str], top_k: int = 3) -> List[GreenPattern]:
+    scored: List[Tuple[float, GreenPattern]] = []
+    code_l = code.lower()
+    for p in GREEN_PATTERNS:
+        score = (2.0 if (p.smell and p.smell in smells) else 0.0) + sum(1 for kw in p.keywords if kw.lower() in code_l)
+        if score > 0: scored.append((score, p))
+    scored.sort(key=lambda t: t[0], reverse=True)
+    return [p for _, p in scored[:top_k]]
+
+
+def _rewrite_concat_in_loop(code: str) -> Tuple[str, bool]:
+    changed = False; out = code
+    loop_rg = re.compile(r"(^[ \t]*for\s+[^\n]+:\n)([\s\S]*?)(?=^[^\s]|$(?!\n))", re.M)
+    for m in list(loop_rg.finditer(out)):
+        loop_header, loop_body = m.group(1), m.group(2)
+        concat_rg = re.compile(r"^[ \t]*([A-Za-z_]\w*)\s*\+=\s*(.+)$", re.M)
+        candidates = list(concat_rg.finditer(loop_body))
+        if not candidates: continue
+        var = candidates[0].group(1); parts_name = f"_parts_{var}"
+        new_body = concat_rg.sub(lambda mm: f"{' ' * (len(mm.group(0)) - len(mm.group(0).lstrip()))}{parts_name}.append({mm.group(2).strip()})", loop_body)
+        before, after = out[:m.start()], out[m.end():]
+        indent = re.match(r"^([ \t]*)", loop_header).group(1)
+        init_line = f"{indent}{parts_name} = []\n"
+        join_line = f"\n{indent}{var} = ''.join({parts_name})\n"
+        out = before + init_line + loop_header + new_body + join_line + after
+        changed = True
+        return out, changed
+    return out, changed
+
+
+def _rewrite_requests_parallel(code: str) -> Tuple[str, bool]:
+    if "requests." not in code or "for " not in code: return code, False
+    tpl = r'''
+# ───────────────────────── Code optimisé : HTTP en parallèle ─────────────────────────
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import requests
+def _fetch(session: requests.Session, url: str, timeout: float = 10.0):
+    with session.get(url, timeout=timeout) as r:
+        r.raise_for_status()
+        return r.text
+def fetch_all(urls: list[str], max_workers: int = 8):
+    results = {}
+    with requests.Session() as session:
+        with ThreadPoolExecutor(max_workers=max_workers) as ex:
+            futs = {ex.submit(_fetch, session, u): u for u in urls}
+            for fut in as_completed(futs):
+                u = futs[fut]
+                try: results[u] = fut.result()
+                except Exception as e: results[u] = f"ERROR: {e}"
+    return results
+# Exemple: data_by_url = fetch_all(URLS, max_workers=8)
+'''
+    if tpl.strip() in code: return code, False
+    return (code.rstrip() + "\n\n" + tpl.strip() + "\n"), True
+
+
+def _append_note(code: str, text_block: str) -> Tuple[str, bool]:
+    if text_block.strip() in code: return code, False
+    return (code.rstrip() + "\n\n" + text_block.strip() + "\n"), True
+
+
+VERIFY_TIMEOUT = 20.0  # s par exécution de la vérification d'une réécriture
+
+
+def _equivalent(before: str, after: str, verify: bool) -> bool:
+    """Réécriture AST gardée seulement si l'exécution le confirme (verify_rewrite) : original
+    déterministe, même stdout, mêmes globals. Sans ``verify`` : acceptée sur la seule analyse."""
+    if not verify:
+        return True
+    v = verify_rewrite(before, after, repeats=2, timeout=VERIFY_TIMEOUT)
+    return v["verdict"] not in ("divergent", "erreur") and v["deterministic"]
+
+
+def greenify_code(code: str, smells: List[str], lang: str, verify: bool = True) -> Tuple[str, List[str]]:
+    """Réécritures sûres + notes. ``verify`` : lru_cache et sortie d'invariants (P006–P008) sont exécutés
+    avant/après et écartés s'ils changent le comportement ; les réécritures pandas ont leur contrôle sur
+    échantillons (green_assistant.dataframes)."""
+    applied: List[str] = []; out = code
+    if lang == "python":
+        for smell, rewrite, label in (  # AST : avant les réécritures regex
+                ("accumulation_iterrows", dataframes.rewrite_iterrows, "P009: {} boucle(s) iterrows ➜ colonnes"),
+                ("apply_ligne_par_ligne", dataframes.rewrite_apply, "P010: {} apply(axis=1) vectorisé(s)"),
+                ("affectation_chainee_boucle", dataframes.rewrite_chained, "P011: {} boucle(s) d'affectation ➜ colonne"),
+                ("concat_dans_boucle", dataframes.rewrite_concat, "P012: {} concat en boucle ➜ un seul concat")):
+            if smell in smells:
+                out, n = rewrite(out); applied += [label.format(n)] if n else []
+        if "invariant_dans_boucle" in smells:
+            green, n = memoize.rewrite_hoist(out)
+            if n and _equivalent(out, green, verify):
+                out = green; applied.append(f"P008: {n} invariant(s) sorti(s) de boucle")
+            elif n:
+                applied.append("P008: sortie d'invariants écartée (non équivalente à l'exécution)")
+        if "recursion_sans_cache" in smells or "appel_pur_repete" in smells:
+            green, names = memoize.rewrite_memoize(out)
+            if names and _equivalent(out, green, verify):
+                out = green; applied.append(f"P006/P007: lru_cache sur {', '.join(names)}()")
+            elif names:
+                applied.append("P006/P007: lru_cache écarté (non équivalent à l'exécution)")
+        if "concat_string_dans_boucle" in smells:
+            out, ok = _rewrite_concat_in_loop(out);  applied += ["P001: Concat ➜ join()"] if ok else []
+        if "requetes_repetitives_sequentielles" in smells:
+            out, ok = _rewrite_requests_parallel(out); applied += ["P002: Session + ThreadPoolExecutor"] if ok else []
+        if "IO_dans_boucle" in smells:
+            tip = "# Astuce green : I/O hors des boucles → bufferiser et écrire en bloc."
+            out, ok = _append_note(out, tip); applied += ["P003: I/O hors boucle (note)"] if ok else []
+        if "sleep_dans_boucle" in smells:
+            tip = "# Note : éviter time.sleep() en boucle → scheduler / events / backoff."
+            out, ok = _append_note(out, tip); applied += ["P004: sleep ➜ scheduler/backoff (note)"] if ok else []
+        if "non_vectorise_alors_numpy_dispo" in smells:
+            tip = "# Astuce : Vectorisation NumPy (remplacer boucles par opérations vectorisées)."
+            out, ok = _append_note(out, tip); applied += ["P005: Vectorisation NumPy (note)"] if ok else []
+    elif lang == "javascript":  # pas de réécriture JS : notes seulement
+        for smell, label, tip in (
+                ("fs_sync_dans_boucle", "P013: fs.*Sync ➜ fs.promises (note)",
+                 "// Astuce green : fs.*Sync en boucle → fs.promises + Promise.all, ou un flux."),
+                ("concat_string_dans_boucle_js", "P014: Concat ➜ tableau + join (note)",
+                 "// Astuce green : accumuler dans un tableau puis parts.join('')."),
+                ("await_sequentiel_dans_boucle", "P015: await séquentiel ➜ Promise.all (note)",
+                 "// Astuce green : await en boucle → Promise.all (pool borné).")):
+            if smell in smells:
+                out, ok = _append_note(out, tip); applied += [label] if ok else []
+    return out, applied
+
+
+# ───────────────────────────── Vérification avant/après ─────────────────────────────
+_VERIFY_DRIVER = r"""
+import hashlib, json, os, runpy, sys, time
+t0 = time.perf_counter(); g = runpy.run_path(sys.argv[1], run_name="__main__"); dt = time.perf_counter() - t0
+simple = (int, float, complex, str, bytes, bool, type(None), tuple, list, dict, set, frozenset)
+def norm(v):  # np.float64(1.5) == 1.5, 3 == 3.0 ; sommes dans un autre ordre : 9 chiffres significatifs
+    if getattr(v, "ndim", None) == 0 and hasattr(v, "item"): v = v.item()
+    if isinstance(v, (int, float)) and not isinstance(v, bool): return float(f"{v:.9g}")
+    if type(v) in (list, tuple): return type(v)(norm(x) for x in v)
+    return v
+state = {k: hashlib.sha1(repr(norm(v)).encode()).hexdigest() for k, v in g.items()
+         if not k.startswith("_") and isinstance(norm(v), simple)}
+with open(os.environ["GREEN_VERIFY_OUT"], "w", encoding="utf-8") as fh: json.dump({"wall_s": dt, "globals": state}, fh)
+"""
+GAIN = 0.05  # écart de médiane sous lequel on conclut « neutre »
+
+
+def _run_once(code: str, timeout: float) -> Dict[str, Any]:
+    work = Path(tempfile.mkdtemp(prefix="green_verify_"))
+    script, result = work / "snippet.py", work / "result.json"
+    script.write_text(code, encoding="utf-8")
+    env = {**os.environ, "GREEN_VERIFY_OUT": str(result), "PYTHONHASHSEED": "0"}
+    try:
+        p = subprocess.run([sys.executable, "-c", _VERIFY_DRIVER, str(script)], cwd=work, env=env,
+                           capture_output=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return {"error": "timeout"}
+    if p.returncode:
+        return {"run_error": True, "stderr": p.stderr.decode("utf-8", errors="replace").strip()[-2000:]}
+    try:
+        data = json.loads(result.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        return {"error": "no_result", "stderr": str(e)}
+    data["stdout_sha"] = hashlib.sha1(p.stdout).hexdigest()
+    return data
+
+
+def verify_rewrite(before: str, after: str, repeats: int = 3, timeout: float = 60.0) -> Dict[str, Any]:
+    """Exécute les deux versions ``repeats`` fois ; verdict gain / neutre / régression / divergent / erreur.
+    Équivalence : même stdout et mêmes globals publics simples (les ``_inv_*`` etc. sont ignorés),
+    contrôlée seulement si l'original est déterministe."""
+    runs: Dict[str, List[Dict[str, Any]]] = {"before": [], "after": []}
+    for _ in range(max(1, repeats)):  # alterné : une dérive thermique pèse sur les deux versions
+        for key, code in (("before", before), ("after", after)):
+            r = _run_once(code, timeout); runs[key].append(r)
+            if r.get("error") or r.get("run_error"):
+                failed = {"error": r.get("error") or "run_error", "stderr": r.get("stderr", "")}
+                return {"verdict": "erreur", "failed": key, **failed}
+    b, a = runs["before"][0], runs["after"][0]
+    # l'original varie d'un run à l'autre (random, horloge) : équivalence non vérifiable
+    stable = all(r["stdout_sha"] == b["stdout_sha"] and r["globals"] == b["globals"] for r in runs["before"])
+    out: Dict[str, Any] = {"deterministic": stable, "same_stdout": b["stdout_sha"] == a["stdout_sha"]}
+    # noms absents d'un côté (variable d'une boucle supprimée) : un usage ultérieur aurait échoué au run
+    out["diverging_globals"] = sorted(k for k in set(b["globals"]) & set(a["globals"])
+                                      if b["globals"][k] != a["globals"][k])
+    tb = statistics.median(r["wall_s"] for r in runs["before"])
+    ta = statistics.median(r["wall_s"] for r in runs["after"])
+    out.update({"before_s": tb, "after_s": ta, "speedup": (tb / ta) if ta > 0 else None, "repeats": len(runs["after"])})
+    if stable and (not out["same_stdout"] or out["diverging_globals"]):
+        out["verdict"] = "divergent"
+    elif ta < tb * (1 - GAIN):
+        out["verdict"] = "gain"
+    elif ta > tb * (1 + GAIN):
+        out["verdict"] = "régression"
+    else:
+        out["verdict"] = "neutre"
+    return out
@@ -0,0 +1,193 @@
+# src/green_assistant/proctree.py
+"""Attribution de l'énergie à l'arbre de process du snippet (psutil).
+
+Les trackers mesurent la machine entière. Un thread échantillonne ici le
+process racine et tous ses descendants (multiprocessing, subprocess…) :
+temps CPU cumulé, RSS, détail par enfant. L'énergie machine est ensuite
+attribuée à l'arbre au prorata de sa part du CPU consommé sur la fenêtre.
+"""
+from __future__ import annotations
+import os, threading, time
+from typing import Any, Dict, List, Optional, Tuple
+
+import psutil
+
+MB = 1024 * 1024
+
+
+def _cpu_s(t) -> float:
+    return float(t.user + t.system)
+
+
+def _machine_busy_s() -> float:
+    t = psutil.cpu_times()
+    idle = t.idle + getattr(t, "iowait", 0.0)
+    return float(sum(t) - idle)
+
+
+class TreeSampler:
+    """Échantillonne ``pid`` et ses descendants toutes les ``interval`` secondes."""
+
+    def __init__(self, pid: Optional[int] = None, interval: float = 0.2) -> None:
+        self.pid = pid or os.getpid()
+        self.interval = interval
+        self.samples: List[Tuple[float, float, int]] = []  # (t, cpu arbre cumulé, rss arbre)
+        self.procs: Dict[int, Dict[str, Any]] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._root: Optional[psutil.Process] = None
+        self._reaped0 = 0.0
+        self._reaped = 0.0
+        self._machine0 = 0.0
+        self._t0 = 0.0
+        self.on_sample = None  # callback(sampler) optionnel, appelé à chaque échantillon
+
+    # ── cycle ──
+    def start(self) -> "TreeSampler":
+        self._root = psutil.Process(self.pid)
+        t = self._root.cpu_times()
+        self._reaped0 = self._reaped = float(t.children_user + t.children_system)
+        self._machine0 = _machine_busy_s()
+        self._t0 = time.time()
+        self._thread = threading.Thread(target=self._loop, name="green-proctree", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._root is None:  # jamais démarré (échec du tracker)
+            return
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2.0)
+        self.sample()
+        self.machine_busy_s = max(0.0, _machine_busy_s() - self._machine0)
+        self.wall_s = time.time() - self._t0
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.sample()
+            if self.on_sample:
+                try: self.on_sample(self)
+                except Exception: pass
+
+    # ── échantillonnage ──
+    def sample(self) -> None:
+        root = self._root
+        if root is None:
+            return
+        with self._lock:
+            now = time.time()
+            try:
+                members = [root] + root.children(recursive=True)
+            except psutil.Error:
+                members = []  # racine terminée : on garde les dernières valeurs vues
+            alive = set()
+            for p in members:
+                try:
+                    with p.oneshot():
+                        t = p.cpu_times(); rss = p.memory_info().rss
+                        if p.pid not in self.procs:
+                            self.procs[p.pid] = {"pid": p.pid, "name": p.name(), "cmd": " ".join(p.cmdline()[:3]),
+                                                 "created": p.create_time(),
+                                                 "cpu0": _cpu_s(t) if p.pid == root.pid else 0.0, "peak_rss": 0}
+                except psutil.Error:
+                    continue
+                if p.pid == root.pid:
+                    self._reaped = float(t.children_user + t.children_system)
+                info = self.procs[p.pid]
+                info["cpu"] = _cpu_s(t); info["rss"] = rss
+                info["peak_rss"] = max(info["peak_rss"], rss)
+                alive.add(p.pid)
+            for pid, info in self.procs.items():
+                info["alive"] = pid in alive
+                if pid not in alive: info["rss"] = 0
+            self.samples.append((now, self.tree_cpu_s(), sum(i.get("rss", 0) for i in self.procs.values())))
+
+    def tree_cpu_s(self) -> float:
+        """CPU de l'arbre : racine (delta) + enfants vivants + enfants terminés.
+        Pour ces derniers, children_* de la racine (exact une fois récoltés) couvre
+        aussi les process trop brefs pour avoir été échantillonnés."""
+        root = self.procs.get(self.pid)
+        root_cpu = max(0.0, root.get("cpu", 0.0) - root["cpu0"]) if root else 0.0
+        kids = [i for pid, i in self.procs.items() if pid != self.pid]
+        alive = sum(i.get("cpu", 0.0) for i in kids if i.get("alive"))
+        dead = sum(i.get("cpu", 0.0) for i in kids if not i.get("alive"))
+        return root_cpu + alive + max(dead, self._reaped - self._reaped0)
+
+    # ── résultat ──
+    def summary(self, energy_kwh: Optional[float] = None, cpu_energy_kwh: Optional[float] = None,
+                ram_energy_kwh: Optional[float] = None) -> Dict[str, Any]:
+        tree_cpu = self.tree_cpu_s()
+        busy = getattr(self, "machine_busy_s", None) or 0.0
+        share = min(1.0, tree_cpu / busy) if busy > 0 else None
+        peak_rss = max((s[2] for s in self.samples), default=0)
+        attributed = None
+        if share is not None:
+            if isinstance(cpu_energy_kwh, (int, float)):
+                ram_share = min(1.0, peak_rss / psutil.virtual_memory().used) if peak_rss else 0.0
+                attributed = cpu_energy_kwh * share + (ram_energy_kwh or 0.0) * ram_share
+            elif isinstance(energy_kwh, (int, float)):
+                attributed = energy_kwh * share
+        children = []
+        for pid, i in self.procs.items():
+            if pid == self.pid: continue
+            c = max(0.0, i.get("cpu", 0.0) - i["cpu0"])
+            children.append({
+                "pid": pid, "name": i["name"], "cmd": i["cmd"], "cpu_time_s": c,
+                "peak_rss_mb": i["peak_rss"] / MB,
+                "cpu_share_of_tree": (c / tree_cpu) if tree_cpu else None,
+                "energy_kwh": (attributed * c / tree_cpu) if (attributed is not None and tree_cpu) else None,
+            })
+        children.sort(key=lambda c: c["cpu_time_s"], reverse=True)
+        return {
+            "pid": self.pid, "n_processes": len(self.procs), "cpu_time_s": tree_cpu,
+            "machine_cpu_busy_s": busy, "cpu_share": share, "peak_rss_mb": peak_rss / MB,
+            "energy_kwh_attributed": attributed, "children": children,
+        }
+
+    def energy_samples(self, energy_kwh: Optional[float]) -> Optional[List[Tuple[float, float]]]:
+        """[(t, kWh cumulés)] : ``energy_kwh`` réparti dans le temps selon le CPU
+        cumulé de l'arbre (pour pondérer l'intensité réseau intervalle par intervalle).
+        None sans énergie, sans échantillons ou sans CPU consommé."""
+        if not isinstance(energy_kwh, (int, float)) or len(self.samples) < 2:
+            return None
+        cpu_end = self.samples[-1][1]
+        if cpu_end <= 0:
+            return None
+        out, peak = [(self._t0, 0.0)], 0.0
+        for t, cpu, _ in self.samples:
+            peak = max(peak, cpu)  # monotone : tree_cpu_s peut fléchir quand un enfant meurt
+            out.append((t, energy_kwh * min(1.0, peak / cpu_end)))
+        return out
+
+
+def kill_tree(pid: int) -> None:
+    """Termine un process et tous ses descendants (timeouts, budgets)."""
+    try:
+        root = psutil.Process(pid)
+        procs = root.children(recursive=True) + [root]
+    except psutil.Error:
+        return
+    for p in procs:
+        try: p.kill()
+        except psutil.Error: pass
+    psutil.wait_procs(procs, timeout=3)
+
+
+def kill_seen(sampler: TreeSampler) -> None:
+    """Tue les process déjà vus par ``sampler`` encore en vie, même rattachés à init depuis la fin
+    de leur parent (même pid et même date de création : pas un pid réutilisé)."""
+    for pid, info in list(sampler.procs.items()):
+        try:
+            if psutil.Process(pid).create_time() == info.get("created"):
+                kill_tree(pid)
+        except psutil.Error:
+            continue
+
+
+def attach(data: Dict[str, Any], sampler: TreeSampler) -> Dict[str, Any]:
+    """Ajoute ``process_tree`` au résultat d'un wrapper."""
+    data["process_tree"] = sampler.summary(data.get("energy_kwh"), data.get("cpu_energy_kwh"),
+                                           data.get("ram_energy_kwh"))
+    return data
@@ -0,0 +1,43 @@
+# src/green_assistant/runner.py
+"""Lanceur enfant : ``python -m green_assistant.runner <snippet.py>``.
+
+Utilisé quand le tracker mesure la machine depuis un autre process
+(codecarbon-api.py) : exécute le snippet comme ``python snippet.py`` tout en
+lui injectant les hooks de green_assistant.work. L'état (travail + mémoire,
+cf. green_assistant.memory, + points chauds si GREEN_HOTSPOTS=1, cf.
+green_assistant.hotspots) est écrit dans le fichier pointé par GREEN_WORK_OUT.
+"""
+from __future__ import annotations
+import json, os, runpy, sys
+from pathlib import Path
+
+from green_assistant.hotspots import Tracer
+from green_assistant.memory import MemoryProfiler
+from green_assistant.work import WorkMeter
+
+
+def main(argv=None) -> int:
+    argv = list(sys.argv[1:] if argv is None else argv)
+    if not argv:
+        print("Usage: python -m green_assistant.runner <code_file.py> [args...]", file=sys.stderr)
+        return 1
+    script = argv[0]
+    sys.argv = argv  # le snippet voit ses propres arguments
+    sys.path.insert(0, str(Path(script).resolve().parent))  # comme `python script.py`
+    meter = WorkMeter(); mem = MemoryProfiler(); hot = Tracer(script)
+    meter.start(); mem.start()
+    try:
+        with hot:
+            runpy.run_path(script, init_globals=meter.globals(), run_name="__main__")
+    finally:
+        mem.stop(); meter.stop()
+        out = os.environ.get("GREEN_WORK_OUT")
+        if out:
+            try: Path(out).write_text(json.dumps({**meter.to_dict(), "memory": mem.result,
+                                                               "hotspots": hot.result}), encoding="utf-8")
+            except Exception: pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
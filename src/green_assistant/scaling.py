@@ -0,0 +1,157 @@
+# src/green_assistant/scaling.py
+"""Complexité empirique : mesure d'un snippet à plusieurs tailles d'entrée.
+
+Le snippet expose sa taille comme ``DUR`` dans bench_cpu_60s.py :
+
+    N = int(os.getenv("N", "10000"))        # ou
+    N = globals().get("N", 10_000)          # injecté par WorkMeter.globals()
+
+On l'exécute à une série géométrique de tailles (GREEN_N / N), puis on ajuste
+temps et énergie sur ``a + b·f(n)`` pour f ∈ {1, n, n log n, n²} (moindres
+carrés NumPy, erreur relative : les tailles couvrent plusieurs ordres de
+grandeur). Le modèle retenu minimise le BIC ; la pente log-log est donnée en
+contrôle. ``extrapolate`` projette le coût aux tailles de production.
+"""
+from __future__ import annotations
+import json, math, os, subprocess, sys, tempfile, time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+SRC = Path(__file__).resolve().parent.parent
+METRICS = ("duration_s", "energy_kwh")
+MODELS: Dict[str, Callable[[np.ndarray], np.ndarray]] = {
+    "O(1)": lambda n: np.zeros_like(n),
+    "O(n)": lambda n: n,
+    "O(n log n)": lambda n: n * np.log2(n),
+    "O(n²)": lambda n: n ** 2,
+}
+MIN_POINTS = 3
+
+
+def sizes(n_min: int, n_max: int, steps: int = 6) -> List[int]:
+    """Série géométrique d'entiers distincts entre n_min et n_max."""
+    n_min, n_max = max(1, int(n_min)), max(1, int(n_max))
+    raw = np.geomspace(n_min, max(n_min, n_max), max(2, steps))
+    return sorted({int(round(v)) for v in raw})
+
+
+def parse_sizes(spec: str) -> List[int]:
+    """``"1000:1000000[:6]"`` (série géométrique) ou ``"1000,5000,20000"``."""
+    if ":" in spec:
+        parts = [int(float(p)) for p in spec.split(":")]
+        return sizes(*parts[:3])
+    return sorted({int(float(p)) for p in spec.split(",") if p.strip()})
+
+
+def size_env(n: int) -> Dict[str, str]:
+    return {"GREEN_N": str(n), "N": str(n)}
+
+
+# ───────────────────────────── Ajustement ─────────────────────────────
+def fit(ns: Sequence[float], ys: Sequence[float]) -> Optional[Dict[str, Any]]:
+    """Ajuste chaque modèle ; renvoie le meilleur (BIC) et le détail de tous."""
+    pts = np.array([(n, y) for n, y in zip(ns, ys) if n and y is not None and n > 0 and y > 0], dtype=np.float64)
+    if len(pts) < MIN_POINTS:
+        return None
+    n, y = pts[:, 0], pts[:, 1]
+    k = len(n)
+    models: Dict[str, Dict[str, Any]] = {}
+    for name, f in MODELS.items():
+        fx = f(n)
+        cols = [np.ones_like(n)] if name == "O(1)" else [np.ones_like(n), fx]
+        A = np.column_stack(cols) / y[:, None]  # erreur relative
+        coef, *_ = np.linalg.lstsq(A, np.ones_like(y), rcond=None)
+        a, b = float(coef[0]), (float(coef[1]) if len(coef) > 1 else 0.0)
+        if b < 0:  # coût décroissant avec n : modèle non physique
+            continue
+        pred = a + b * fx
+        rss = float(np.sum(((pred - y) / y) ** 2))
+        bic = k * math.log(max(rss / k, 1e-12)) + len(coef) * math.log(k)
+        models[name] = {"a": a, "b": b, "rel_rmse": math.sqrt(rss / k), "bic": bic}
+    if not models:
+        return None
+    best = min(models, key=lambda m: models[m]["bic"])
+    half = n >= np.median(n)  # pente sur les grandes tailles : les constantes y pèsent moins
+    slope = float(np.polyfit(np.log(n[half]), np.log(y[half]), 1)[0]) if half.sum() >= 2 else None
+    return {"model": best, **models[best], "loglog_slope": slope, "points": k, "models": models}
+
+
+def predict(f: Dict[str, Any], n: float) -> float:
+    return f["a"] + f["b"] * float(MODELS[f["model"]](np.array([float(n)]))[0])
+
+
+def analyse(points: List[Dict[str, Any]], at: Sequence[int] = (), metrics: Sequence[str] = METRICS) -> Dict[str, Any]:
+    """points = [{"n", "duration_s", "energy_kwh", …}] -> ajustement + extrapolation par métrique."""
+    out: Dict[str, Any] = {}
+    for m in metrics:
+        f = fit([p["n"] for p in points], [p.get(m) for p in points])
+        if f is None:
+            continue
+        f["extrapolated"] = {str(n): predict(f, n) for n in at}
+        out[m] = f
+    cls = [f["model"] for f in out.values()]
+    out["class"] = max(cls, key=list(MODELS).index) if cls else None  # la pire croissance observée
+    out["smells"] = ["croissance_quadratique"] if out["class"] == "O(n²)" else []
+    return out
+
+
+# ───────────────────────────── Exécution ─────────────────────────────
+def measure_sizes(run: Callable[[int], Dict[str, Any]], ns: Sequence[int], repeats: int = 1) -> List[Dict[str, Any]]:
+    """Exécute ``run(n)`` pour chaque taille (médiane sur ``repeats``) ; s'arrête au premier échec."""
+    points = []
+    for n in ns:
+        runs = [run(n) for _ in range(max(1, repeats))]
+        ok = [r for r in runs if not (r.get("error") or r.get("run_error"))]
+        p: Dict[str, Any] = {"n": n, "runs": len(ok)}
+        for m in METRICS:
+            vals = [r[m] for r in ok if isinstance(r.get(m), (int, float))]
+            p[m] = float(np.median(vals)) if vals else None
+        if not ok:
+            p["error"] = runs[-1].get("error") or "run_error"
+            p["stderr"] = (runs[-1].get("stderr") or "")[-2000:]
+            points.append(p)
+            break  # taille suivante plus grosse : inutile d'insister
+        points.append(p)
+    return points
+
+
+def run_local(script: str, n: int, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Temps seul (sans tracker) : ``python -m green_assistant.runner`` (ou ``node``) à la taille ``n``."""
+    if Path(script).suffix.lower() in (".js", ".mjs", ".cjs"):
+        return _run_node(script, n, timeout)
+    fd, work_out = tempfile.mkstemp(prefix="green_scale_", suffix=".json"); os.close(fd)
+    env = {**os.environ, **size_env(n), "GREEN_WORK_OUT": work_out, "GREEN_TRACEMALLOC": "0",
+           "PYTHONPATH": os.pathsep.join(filter(None, [str(SRC), os.environ.get("PYTHONPATH")]))}
+    try:
+        p = subprocess.run([sys.executable, "-m", "green_assistant.runner", script], env=env, timeout=timeout,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        work = json.loads(Path(work_out).read_text(encoding="utf-8") or "{}")
+    except subprocess.TimeoutExpired:
+        return {"error": "timeout"}
+    except (OSError, ValueError) as e:
+        return {"error": "no_result", "stderr": str(e)}
+    finally:
+        Path(work_out).unlink(missing_ok=True)
+    if p.returncode:
+        return {"run_error": True, "stderr": p.stderr.decode("utf-8", errors="replace").strip()}
+    return {"duration_s": work.get("wall_s"), "energy_kwh": None}
+
+
+def _run_node(script: str, n: int, timeout: Optional[float] = None) -> Dict[str, Any]:
+    """Snippet JavaScript : ``process.env.N`` ; chrono côté parent (pas de runner)."""
+    from green_assistant import node
+    exe = node.binary()
+    if exe is None:
+        return {"error": "node_missing"}
+    t0 = time.perf_counter()
+    try:
+        p = subprocess.run([exe, script], env={**os.environ, **size_env(n)}, timeout=timeout,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    except subprocess.TimeoutExpired:
+        return {"error": "timeout"}
+    dt = time.perf_counter() - t0
+    if p.returncode:
+        return {"run_error": True, "stderr": p.stderr.decode("utf-8", errors="replace").strip()}
+    return {"duration_s": dt, "energy_kwh": None}
@@ -0,0 +1,162 @@
+# src/green_assistant/scheduler.py
+"""Exécution différée « carbon-aware » des jobs de bench.
+
+Chaque job a une échéance ; on choisit, dans une prévision d'intensité locale
+(même format CSV que green_assistant.intensity), la fenêtre de plus faible
+intensité moyenne qui termine avant l'échéance. Les jobs attendent dans une
+file de priorité persistée en JSON (survit aux redémarrages). Chaque
+modification relit la file sous verrou exclusif (``<file>.lock``, flock) et
+un runner ``claim`` un job avant de l'exécuter : deux ``--run-due``
+concurrents ne lancent jamais le même job.
+"""
+from __future__ import annotations
+import heapq, re, time, uuid
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import psutil
+
+from green_assistant import host
+from green_assistant.intensity import IntensityIndex
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-process
+    fcntl = None
+
+DEFAULT_STEP_S = 900  # granularité des créneaux candidats
+
+
+def parse_deadline(spec: str, now: Optional[float] = None) -> float:
+    """``8h``, ``90m``, ``3600`` (secondes) ou date ISO 8601 -> epoch."""
+    now = time.time() if now is None else now
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([smhd]?)\s*", spec)
+    if m:
+        mult = {"": 1, "s": 1, "m": 60, "h": 3600, "d": 86400}[m.group(2)]
+        return now + float(m.group(1)) * mult
+    dt = datetime.fromisoformat(spec.strip().replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.astimezone()  # heure locale
+    return dt.timestamp()
+
+
+def best_window(index: IntensityIndex, region: str, now: float, deadline: float, duration_s: float,
+                step_s: int = DEFAULT_STEP_S) -> Dict[str, Any]:
+    """Créneau de départ minimisant l'intensité moyenne sur [start, start + duration]."""
+    latest = max(now, deadline - duration_s)
+    starts = [now]
+    t = (int(now) // step_s + 1) * step_s  # créneaux alignés
+    while t <= latest:
+        starts.append(float(t)); t += step_s
+    g_now = index.mean(region, now, now + duration_s)
+    best_start, best_g = now, g_now
+    for s in starts[1:]:
+        g = index.mean(region, s, s + duration_s)
+        if g is not None and (best_g is None or g < best_g - 1e-9):
+            best_start, best_g = s, g
+    saving = (1.0 - best_g / g_now) if (g_now and best_g is not None) else 0.0
+    return {"start": best_start, "gco2_kwh": best_g, "gco2_kwh_now": g_now, "saving_ratio": saving}
+
+
+class JobQueue:
+    """File de priorité persistée : ordre (run_at, -priority, created_at)."""
+
+    def __init__(self, path: str | Path | None = None) -> None:
+        self.path = Path(path) if path else host.cache_dir() / "schedule_queue.json"
+        self.jobs: List[Dict[str, Any]] = []
+        self.reload()
+
+    def reload(self) -> None:
+        self.jobs = host.read_json(self.path).get("jobs") or []
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        host.write_json(self.path, {"jobs": self.jobs})
+
+    @contextmanager
+    def locked(self) -> Iterator["JobQueue"]:
+        """Relit la file sous verrou exclusif puis l'écrit en sortie (lecture-modification-écriture)."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path.with_suffix(self.path.suffix + ".lock"), "a") as lock:
+            if fcntl: fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                self.reload()
+                yield self
+                self.save()
+            finally:
+                if fcntl: fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _key(j: Dict[str, Any]) -> Tuple[float, int, float]:
+        return (j["run_at"], -int(j.get("priority", 0)), j["created_at"])
+
+    def add(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        job = {"id": uuid.uuid4().hex[:12], "created_at": time.time(), "status": "pending", "priority": 0, **job}
+        with self.locked():
+            self.jobs.append(job)
+        return job
+
+    def pending(self) -> List[Dict[str, Any]]:
+        heap = [(self._key(j), i) for i, j in enumerate(self.jobs) if j["status"] == "pending"]
+        heapq.heapify(heap)
+        return [self.jobs[heapq.heappop(heap)[1]] for _ in range(len(heap))]
+
+    def due(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        now = time.time() if now is None else now
+        return [j for j in self.pending() if j["run_at"] <= now]
+
+    def next_run_at(self) -> Optional[float]:
+        self.reload()
+        p = self.pending()
+        return p[0]["run_at"] if p else None
+
+    def claim(self, now: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Passe le prochain job échu en ``running`` (au nom de ce process) et le renvoie.
+        Un job ``running`` dont le runner a disparu redevient ``pending``."""
+        with self.locked():
+            for j in self.jobs:
+                if j["status"] == "running" and not _alive(j.get("runner_pid"), j.get("runner_created")):
+                    j["status"] = "pending"
+            due = self.due(now)
+            if not due:
+                return None
+            me = psutil.Process()
+            due[0].update(status="running", runner_pid=me.pid, runner_created=me.create_time(), claimed_at=time.time())
+            return dict(due[0])
+
+    def update(self, job_id: str, **fields: Any) -> None:
+        with self.locked():
+            for j in self.jobs:
+                if j["id"] == job_id:
+                    j.update(fields)
+
+
+def _alive(pid: Optional[int], created: Optional[float] = None) -> bool:
+    """Le runner ``pid`` tourne-t-il encore ? (psutil : sans signal, sûr sous Windows ;
+    l'heure de création écarte un pid réattribué.)"""
+    if not pid:
+        return False
+    try:
+        p = psutil.Process(pid)
+        return p.is_running() and (created is None or abs(p.create_time() - created) < 1e-3)
+    except psutil.NoSuchProcess:
+        return False
+    except psutil.Error:
+        return True  # existe, inaccessible (autre utilisateur)
+
+
+def plan(index: IntensityIndex, region: str, target: str, deadline: float, duration_s: float,
+         energy_kwh: Optional[float] = None, now: Optional[float] = None, **extra: Any) -> Dict[str, Any]:
+    """Construit un job daté au meilleur créneau, avec l'économie estimée vs maintenant."""
+    now = time.time() if now is None else now
+    w = best_window(index, region, now, deadline, duration_s)
+    job = {
+        "target": target, "region": region, "deadline": deadline, "est_duration_s": duration_s,
+        "run_at": w["start"], "gco2_kwh_planned": w["gco2_kwh"], "gco2_kwh_now": w["gco2_kwh_now"],
+        "saving_ratio": w["saving_ratio"], "est_energy_kwh": energy_kwh, "est_saving_g": None, **extra,
+    }
+    if energy_kwh is not None and w["gco2_kwh"] is not None and w["gco2_kwh_now"] is not None:
+        job["est_saving_g"] = energy_kwh * (w["gco2_kwh_now"] - w["gco2_kwh"])
+    return job
@@ -0,0 +1,246 @@
+# src/green_assistant/sink.py
+"""Puits de résultats colonnaire : runs + séries par échantillon.
+
+Un puits est un répertoire (GREEN_SINK ou ``--sink``) à deux tables :
+
+    <sink>/runs/part-*.parquet|npy      une ligne par mesure (champs scalaires aplatis)
+    <sink>/samples/part-*.parquet|npy   séries de l'échantillonneur (proctree) par run
+    <sink>/schema.json                  colonnes, types et format
+
+Chaque écriture ajoute un fichier ``part-*`` (pas de verrou : plusieurs wrappers
+peuvent écrire en parallèle). Parquet si pyarrow est installé, sinon tableaux
+structurés NumPy ``.npy`` (sans pickle). ``load()`` relit une table en DataFrame
+(ou dict de colonnes sans pandas) ; ``compact()`` fusionne les parts.
+"""
+from __future__ import annotations
+import hashlib, json, os, sys, time, uuid
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from green_assistant import host
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optionnel
+    pa = pq = None
+
+# (colonne, type logique, chemin pointé dans le JSON résultat)
+RUNS: List[Tuple[str, str, Optional[str]]] = [
+    ("run_id", "str", None), ("ts", "f8", None), ("backend", "str", None), ("target", "str", None),
+    ("host", "str", None), ("code_sha", "str", None), ("family", "str", None), ("variant", "str", None),
+    ("duration_s", "f8", "duration_s"), ("energy_kwh", "f8", "energy_kwh"),
+    ("cpu_energy_kwh", "f8", "cpu_energy_kwh"), ("gpu_energy_kwh", "f8", "gpu_energy_kwh"),
+    ("ram_energy_kwh", "f8", "ram_energy_kwh"), ("emissions_kg", "f8", "emissions_kg"),
+    ("emissions_kg_local", "f8", "emissions_kg_local"), ("gco2_kwh", "f8", "grid.gco2_kwh"),
+    ("overhead_energy_kwh", "f8", "overhead.energy_kwh"), ("work_items", "f8", "work_items"),
+    ("energy_j_per_item", "f8", "energy_j_per_item"), ("tree_cpu_s", "f8", "process_tree.cpu_time_s"),
+    ("cpu_share", "f8", "process_tree.cpu_share"), ("n_processes", "i8", "process_tree.n_processes"),
+    ("peak_rss_mb", "f8", "memory.peak_rss_mb"), ("tracemalloc_peak_mb", "f8", "memory.tracemalloc.peak_mb"),
+    ("run_error", "bool", "run_error"), ("error", "str", "error"),
+]
+SAMPLES: List[Tuple[str, str, Optional[str]]] = [
+    ("run_id", "str", None), ("t", "f8", None), ("tree_cpu_s", "f8", None), ("rss_mb", "f8", None),
+]
+TABLES = {"runs": RUNS, "samples": SAMPLES}
+_MISSING = {"f8": np.nan, "i8": -1, "bool": False, "str": ""}
+
+
+def fmt() -> str:
+    return "parquet" if pq is not None else "npy"
+
+
+def code_sha(code: str | bytes) -> str:
+    """Empreinte courte d'une version de code (comparaisons entre versions)."""
+    raw = code.encode("utf-8") if isinstance(code, str) else code
+    return hashlib.sha1(raw).hexdigest()[:16]
+
+
+def _dig(data: Dict[str, Any], dotted: str) -> Any:
+    cur: Any = data
+    for k in dotted.split("."):
+        if not isinstance(cur, dict): return None
+        cur = cur.get(k)
+    return cur
+
+
+def _column(values: Sequence[Any], kind: str) -> np.ndarray:
+    miss = _MISSING[kind]
+    vals = [miss if v is None else v for v in values]
+    if kind == "str":
+        return np.array([str(v) for v in vals], dtype=str)
+    if kind == "bool":
+        return np.array([bool(v) for v in vals], dtype=bool)
+    out = np.empty(len(vals), dtype=kind)
+    for i, v in enumerate(vals):
+        try: out[i] = v
+        except (TypeError, ValueError): out[i] = miss
+    return out
+
+
+class ResultSink:
+    """Tampon en mémoire, vidé en un fichier ``part-*`` par table à ``flush()``."""
+
+    def __init__(self, path: str | Path) -> None:
+        self.path = Path(path)
+        self.format = fmt()
+        self._rows: Dict[str, Dict[str, List[Any]]] = {t: {c: [] for c, _, _ in cols} for t, cols in TABLES.items()}
+
+    def add_run(self, data: Dict[str, Any], backend: str, target: str, samples: Sequence[Tuple[float, float, int]] = (),
+                run_id: Optional[str] = None, meta: Optional[Dict[str, Any]] = None) -> str:
+        """``meta`` : colonnes de contexte (code_sha, family, variant) ; par défaut
+        code_sha est l'empreinte du fichier ``target`` et la version est sa propre famille."""
+        run_id = run_id or uuid.uuid4().hex[:16]
+        meta = {"run_id": run_id, "ts": time.time(), "backend": backend, "target": target, "host": host.host_key(),
+                "code_sha": None, "family": None, "variant": None, **(meta or {})}
+        if not meta["code_sha"] and os.path.isfile(target):
+            try: meta["code_sha"] = code_sha(Path(target).read_bytes())
+            except OSError: pass
+        meta["family"] = meta["family"] or meta["code_sha"]
+        rows = self._rows["runs"]
+        for col, _, dotted in RUNS:
+            rows[col].append(meta[col] if dotted is None else _dig(data, dotted))
+        s = self._rows["samples"]
+        for t, cpu, rss in samples:
+            s["run_id"].append(run_id); s["t"].append(t); s["tree_cpu_s"].append(cpu); s["rss_mb"].append(rss / (1024 * 1024))
+        return run_id
+
+    def flush(self) -> List[Path]:
+        written = []
+        self._write_schema()
+        for table, cols in TABLES.items():
+            rows = self._rows[table]
+            if not rows[cols[0][0]]:
+                continue
+            arrays = {c: _column(rows[c], kind) for c, kind, _ in cols}
+            written.append(self._write_part(table, arrays))
+            self._rows[table] = {c: [] for c, _, _ in cols}
+        return written
+
+    def __enter__(self) -> "ResultSink":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.flush()
+
+    # ── écriture ──
+    def _write_schema(self) -> None:
+        p = self.path / "schema.json"
+        schema = {"format": self.format,
+                  "tables": {t: [{"name": c, "type": k} for c, k, _ in cols] for t, cols in TABLES.items()}}
+        if host.read_json(p) == schema:
+            return
+        self.path.mkdir(parents=True, exist_ok=True)
+        host.write_json(p, schema)
+
+    def _write_part(self, table: str, arrays: Dict[str, np.ndarray]) -> Path:
+        d = self.path / table
+        d.mkdir(parents=True, exist_ok=True)
+        stem = f"part-{time.time_ns()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+        final = d / f"{stem}.{self.format}"
+        tmp = d / f".{stem}.tmp"  # écrit puis renommé : un lecteur ne voit jamais de part partielle
+        if self.format == "parquet":
+            pq.write_table(pa.table(arrays), tmp, compression="zstd")
+        else:
+            rec = np.empty(len(next(iter(arrays.values()))), dtype=[(c, a.dtype) for c, a in arrays.items()])
+            for c, a in arrays.items(): rec[c] = a
+            with tmp.open("wb") as f:
+                np.save(f, rec, allow_pickle=False)
+        os.replace(tmp, final)
+        return final
+
+
+# ───────────────────────────── Lecture ─────────────────────────────
+def _parts(path: Path, table: str) -> List[Path]:
+    d = Path(path) / table
+    return sorted(p for p in d.glob("part-*") if p.suffix in (".parquet", ".npy")) if d.is_dir() else []
+
+
+def version(path: str | Path, table: str = "runs") -> Tuple[int, str]:
+    """Jeton bon marché qui change à chaque écriture (clé de cache des agrégations)."""
+    parts = _parts(Path(path), table)
+    return (len(parts), parts[-1].name if parts else "")
+
+
+def load_columns(path: str | Path, table: str = "runs", parts: Optional[List[Path]] = None) -> Dict[str, np.ndarray]:
+    """Concatène les parts d'une table (toutes par défaut) en colonnes NumPy."""
+    cols: Dict[str, List[np.ndarray]] = {c: [] for c, _, _ in TABLES[table]}
+    for p in (_parts(Path(path), table) if parts is None else parts):
+        if p.suffix == ".parquet":
+            if pq is None: continue  # écrit ailleurs avec pyarrow
+            t = pq.read_table(p)
+            part = {c: t.column(c).to_numpy(zero_copy_only=False) for c in t.column_names}
+        else:
+            rec = np.load(p, allow_pickle=False)
+            part = {c: rec[c] for c in rec.dtype.names}
+        n = len(next(iter(part.values()))) if part else 0
+        for c, k, _ in TABLES[table]:  # colonne absente d'une part plus ancienne : valeurs manquantes
+            cols[c].append(part[c] if c in part else _column([None] * n, k))
+    return {c: (np.concatenate(v) if v else _column([], k)) for (c, k, _), v in zip(TABLES[table], cols.values())}
+
+
+def load(path: str | Path, table: str = "runs"):
+    """Table en DataFrame pandas (dict de colonnes NumPy si pandas est absent)."""
+    cols = load_columns(path, table)
+    try:
+        import pandas as pd
+    except ImportError:
+        return cols
+    df = pd.DataFrame(cols)
+    if "ts" in df: df["ts"] = pd.to_datetime(df["ts"], unit="s")
+    return df
+
+
+def compact(path: str | Path) -> Dict[str, int]:
+    """Fusionne les parts de chaque table en une seule (lectures plus rapides)."""
+    sink = ResultSink(path)
+    out = {}
+    for table in TABLES:
+        parts = _parts(sink.path, table)
+        if len(parts) < 2:
+            out[table] = len(parts); continue
+        if any(p.suffix != "." + sink.format for p in parts):
+            out[table] = len(parts); continue  # formats mélangés : on ne touche à rien
+        cols = load_columns(sink.path, table, parts)  # parts figées : un écrivain concurrent n'est pas perdu
+        sink._write_part(table, cols)
+        for p in parts: p.unlink()
+        out[table] = 1
+    return out
+
+
+# ───────────────────────────── Wrappers ─────────────────────────────
+def emit(data: Dict[str, Any], backend: str, target: str, tree=None, path: Optional[str] = None,
+         meta: Optional[Dict[str, Any]] = None) -> Optional[str]:
+    """Ajoute la mesure (et la série de ``tree``) au puits GREEN_SINK s'il est configuré.
+    Renvoie l'identifiant du run, ajouté au résultat sous ``run_id``."""
+    path = path or os.environ.get("GREEN_SINK")
+    if not path:
+        return None
+    try:
+        with ResultSink(path) as s:
+            run_id = s.add_run(data, backend, str(target), getattr(tree, "samples", ()) or (), meta=meta)
+    except Exception as e:  # le puits ne doit jamais faire échouer une mesure
+        print(f"[sink] écriture impossible : {e}", file=sys.stderr)
+        return None
+    data["run_id"] = run_id
+    return run_id
+
+
+def main(argv=None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(prog="python -m green_assistant.sink", description="Puits de résultats colonnaire.")
+    ap.add_argument("cmd", choices=["compact", "info"])
+    ap.add_argument("path")
+    args = ap.parse_args(argv)
+    if args.cmd == "compact":
+        print(json.dumps(compact(args.path)))
+    else:
+        print(json.dumps({t: {"parts": len(_parts(Path(args.path), t)),
+                              "rows": int(len(load_columns(args.path, t)["run_id"]))} for t in TABLES}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,113 @@
+# src/green_assistant/trackers.py
+"""Construction des trackers à partir du profil d'hôte en cache (cf. host.profile).
+
+Quand le pays est connu, CodeCarbon passe en OfflineEmissionsTracker et
+eco2ai reçoit ``alpha_2_code`` : plus de géolocalisation IP (timeouts hors-ligne).
+
+Ni CodeCarbon ni eco2ai n'acceptent modèle CPU, TDP ou RAM en paramètre : leurs
+fonctions de sondage sont remplacées, dans le process, par les valeurs du
+profil (``hardware``, invalidé avec l'empreinte matérielle) :
+
+- modèle CPU : ``detect_cpu_model`` (CodeCarbon) / ``get_cpu_info`` (eco2ai),
+  au lieu de py-cpuinfo ;
+- TDP : résultat de la recherche dans la table du tracker (``TDP._main`` /
+  ``find_tdp_value``), sondé au premier tracker puis gardé ;
+- sockets CPU d'eco2ai (``number_of_cpu``, qui lance ``lscpu``).
+
+La RAM est lue par psutil dans les deux trackers (rapide) : rien à remplacer.
+"""
+from __future__ import annotations
+import os, sys
+from typing import Any, Callable, Dict
+
+from green_assistant import host
+
+
+def _cached(key: str, probe: Callable[..., Any]) -> Callable[..., Any]:
+    """``probe`` sondé une fois par empreinte matérielle, puis lu dans le profil."""
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        hw = host.profile()["hardware"]
+        if key in hw:
+            return hw[key]
+        value = probe(*args, **kwargs)
+        host.remember_hardware(**{key: value})
+        return value
+    wrapper._green_cached = True  # type: ignore[attr-defined]
+    return wrapper
+
+
+def _codecarbon_probes() -> None:
+    model = host.profile()["hardware"].get("cpu_model")
+    if model:
+        for name in ("codecarbon.core.util", "codecarbon.core.cpu", "codecarbon.core.resource_tracker",
+                     "codecarbon.core.powermetrics", "codecarbon.external.hardware"):
+            m = sys.modules.get(name)
+            if m is not None and hasattr(m, "detect_cpu_model"):
+                m.detect_cpu_model = lambda: model
+    tdp = getattr(sys.modules.get("codecarbon.core.cpu"), "TDP", None)
+    if tdp is not None and not getattr(tdp._main, "_green_cached", False):
+        probe = _cached("codecarbon_tdp", lambda self, main=tdp._main: list(main(self)))
+        tdp._main = lambda self: tuple(probe(self))
+        tdp._main._green_cached = True
+
+
+def _eco2ai_probes() -> None:
+    try:
+        import eco2ai.tools.tools_cpu as cpu
+    except Exception:
+        return
+    if getattr(cpu.find_tdp_value, "_green_cached", False):
+        return
+    hw = host.profile()["hardware"]
+    if hw.get("cpu_model"):
+        cpu.get_cpu_info = lambda: {"brand_raw": hw["cpu_model"], "count": hw.get("cpu_count")}
+    cpu.find_tdp_value = _cached("eco2ai_tdp", cpu.find_tdp_value)
+    cpu.number_of_cpu = _cached("cpu_sockets", cpu.number_of_cpu)
+
+
+def codecarbon_tracker(**kwargs: Any):
+    from codecarbon import EmissionsTracker, OfflineEmissionsTracker
+    _codecarbon_probes()
+    loc = host.profile()["location"]
+    if loc.get("cpu_tdp_w"):
+        kwargs["default_cpu_power"] = int(float(loc["cpu_tdp_w"]))
+    cls, extra = EmissionsTracker, {}
+    if loc.get("country_iso_code"):
+        cls, extra = OfflineEmissionsTracker, {"country_iso_code": loc["country_iso_code"]}
+        if loc.get("region"): extra["region"] = loc["region"]
+    try:
+        return cls(**kwargs, **extra)
+    except TypeError:  # codecarbon ancien : pas de default_cpu_power
+        kwargs.pop("default_cpu_power", None)
+        return cls(**kwargs, **extra)
+
+
+def eco2ai_kwargs() -> Dict[str, Any]:
+    """Arguments d'``eco2ai.Tracker`` ; branche aussi les sondages en cache (appelé juste avant)."""
+    _eco2ai_probes()
+    loc = host.profile()["location"]
+    return {"alpha_2_code": loc["country_iso2"]} if loc.get("country_iso2") else {}
+
+
+def tracarbon_location():
+    """Country tracarbon à intensité locale (green_assistant.intensity), sans appel réseau.
+    None si une clé CO2 Signal est fournie ou si la région est inconnue."""
+    if os.environ.get("CO2SIGNAL_API_KEY"):
+        return None
+    from green_assistant import intensity
+    region = intensity.host_region()
+    g = intensity.now_intensity(region)
+    if not region or g is None:
+        return None
+    from tracarbon.locations import Country
+    return Country(name=region.lower(), co2g_kwh=g)
+
+
+def remember_codecarbon_row(row: Dict[str, Any]) -> None:
+    """Apprend la localisation détectée par CodeCarbon (dernière ligne de son CSV)."""
+    host.remember(
+        country_iso_code=row.get("country_iso_code"), country_name=row.get("country_name"),
+        region=row.get("region"), cloud_provider=row.get("cloud_provider"),
+        cloud_region=row.get("cloud_region"),
+    )
+
@@ -0,0 +1,126 @@
+# src/green_assistant/work.py
+"""Métriques par unité de travail (items/s, J/item) et phases nommées.
+
+Le code mesuré reçoit dans ses globals (runpy ``init_globals``) :
+
+    report_work(n_items=1)        # déclare n items traités
+    with phase("load"): ...       # découpe la mesure en étapes nommées
+    N                             # taille d'entrée du mode scaling (si GREEN_N est fixé)
+
+Hors mesure, un snippet peut rester exécutable avec
+``report_work = globals().get("report_work", lambda n=1: None)`` et
+``N = globals().get("N", 10_000)`` (cf. green_assistant.scaling).
+"""
+from __future__ import annotations
+import json, os, time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+KWH_TO_J = 3_600_000.0
+
+
+class WorkMeter:
+    def __init__(self) -> None:
+        self.items = 0.0
+        self.t0: Optional[float] = None
+        self.t1: Optional[float] = None
+        self.started_at: Optional[float] = None  # epoch (fenêtre pour l'intensité carbone)
+        self.ended_at: Optional[float] = None
+        self.phases: List[Dict[str, Any]] = []  # {"name", "start", "end", "items"}
+        self._open: List[Dict[str, Any]] = []
+
+    # ── API exposée au snippet ──
+    def report_work(self, n_items: float = 1) -> None:
+        n = float(n_items)
+        self.items += n
+        if self._open:
+            self._open[-1]["items"] += n
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        ph = {"name": str(name), "start": time.perf_counter(), "end": None, "items": 0.0}
+        self._open.append(ph)
+        try:
+            yield
+        finally:
+            ph["end"] = time.perf_counter()
+            self._open.remove(ph)
+            self.phases.append(ph)
+
+    def globals(self) -> Dict[str, Any]:
+        g: Dict[str, Any] = {"report_work": self.report_work, "phase": self.phase}
+        n = os.environ.get("GREEN_N")
+        if n and n.isdigit(): g["N"] = int(n)
+        return g
+
+    # ── Cycle de mesure ──
+    def start(self) -> None:
+        self.started_at = time.time()
+        self.t0 = time.perf_counter()
+
+    def stop(self) -> None:
+        self.t1 = time.perf_counter()
+        self.ended_at = time.time()
+        now = self.t1
+        for ph in self._open:  # phases laissées ouvertes (exception, sys.exit…)
+            ph["end"] = now
+            self.phases.append(ph)
+        self._open = []
+
+    @property
+    def wall_s(self) -> Optional[float]:
+        if self.t0 is None or self.t1 is None: return None
+        return self.t1 - self.t0
+
+    # ── Transport (runner enfant -> wrapper parent) ──
+    def to_dict(self) -> Dict[str, Any]:
+        t0 = self.t0 or 0.0
+        return {
+            "items": self.items, "wall_s": self.wall_s,
+            "phases": [{"name": p["name"], "duration_s": (p["end"] or t0) - p["start"], "items": p["items"]}
+                       for p in self.phases],
+        }
+
+    def dump(self, path: str | Path) -> None:
+        Path(path).write_text(json.dumps(self.to_dict()), encoding="utf-8")
+
+    def summarize(self, energy_kwh: Optional[float], duration_s: Optional[float] = None) -> Dict[str, Any]:
+        return summarize(self.to_dict(), energy_kwh, duration_s)
+
+
+def load(path: str | Path) -> Optional[Dict[str, Any]]:
+    try:
+        return json.loads(Path(path).read_text(encoding="utf-8"))
+    except Exception:
+        return None
+
+
+def summarize(work: Dict[str, Any], energy_kwh: Optional[float], duration_s: Optional[float] = None) -> Dict[str, Any]:
+    """Champs à fusionner dans le JSON résultat.
+
+    Les trackers ne donnent qu'un total : l'énergie est répartie entre phases
+    au prorata de leur durée (puissance supposée constante sur la fenêtre).
+    """
+    items = float(work.get("items") or 0.0)
+    phases = work.get("phases") or []
+    if not items and not phases:
+        return {}
+    dur = duration_s if isinstance(duration_s, (int, float)) and duration_s > 0 else work.get("wall_s")
+    out: Dict[str, Any] = {"work_items": items, "throughput_items_s": None, "energy_j_per_item": None}
+    if items and dur:
+        out["throughput_items_s"] = items / dur
+    if items and isinstance(energy_kwh, (int, float)):
+        out["energy_j_per_item"] = energy_kwh * KWH_TO_J / items
+    if phases:
+        rows = []
+        for p in phases:
+            share = (p["duration_s"] / dur) if dur else None
+            e = energy_kwh * share if (share is not None and isinstance(energy_kwh, (int, float))) else None
+            rows.append({
+                "name": p["name"], "duration_s": p["duration_s"], "share": share,
+                "energy_kwh": e, "items": p["items"],
+                "energy_j_per_item": (e * KWH_TO_J / p["items"]) if (e is not None and p["items"]) else None,
+            })
+        out["phases"] = rows
+    return out
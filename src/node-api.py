@@ -0,0 +1,32 @@
+# src/node-api.py
+import os
+import sys
+
+from green_assistant import batch, channel, node, sink
+
+
+def measure(code_file: str) -> dict:
+    # CodeCarbon autour du process node s'il est installé, sinon estimation CPU de l'arbre
+    data, tree = node.measure(code_file, tracker=os.environ.get("GREEN_NODE_TRACKER", "codecarbon"))
+    if not data.get("error"):
+        sink.emit(data, "node-api", code_file, tree)
+    return data
+
+
+def run_and_track_file(code_file: str) -> dict:
+    data = measure(code_file)
+    channel.publish(data)  # canal bench_all + JSON_OUT + stdout
+    return data
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        sys.exit(batch.main(sys.argv[2:], measure))
+    if len(sys.argv) < 2:
+        print("Usage: python node-api.py <code_file.js>", file=sys.stderr)
+        sys.exit(1)
+    script = sys.argv[1]
+    if not os.path.exists(script):
+        channel.publish({"error": f"File not found: {script}"})
+        sys.exit(2)
+    run_and_track_file(script)
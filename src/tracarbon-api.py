@@ -1,7 +1,6 @@
 # src/tracarbon-api.py
 import os
 import sys
-import json
 import time
 import traceback
 import runpy
@@ -12,6 +11,9 @@ from tracarbon.builder import TracarbonBuilder, TracarbonConfiguration
 from tracarbon.exporters import StdoutExporter
 from tracarbon.general_metrics import EnergyConsumptionGenerator, CarbonEmissionGenerator
 
+from green_assistant import batch, budget, capture, channel, hotspots, intensity, memory, overhead, proctree, sink, trackers
+from green_assistant.work import WorkMeter
+
 def _as_float(x, default=None):
     try:
         return float(x)
@@ -37,7 +39,7 @@ def _value_from_metric_obj(obj):
     return obj
 
 
-def run_and_track_file(code_file: str) -> dict:
+def _track(code_file: str) -> tuple[dict, WorkMeter, proctree.TreeSampler, memory.MemoryProfiler]:
     # Configuration compacte et silencieuse
     cfg = TracarbonConfiguration(
         metric_prefix_name="green_assistant",
@@ -51,21 +53,35 @@ def run_and_track_file(code_file: str) -> dict:
         CarbonEmissionGenerator(),
     ])
 
-    tc = TracarbonBuilder(configuration=cfg).with_exporter(exporter).build()
+    builder = TracarbonBuilder(configuration=cfg).with_exporter(exporter)
+    location = trackers.tracarbon_location()  # intensité locale : pas de lookup réseau
+    if location is not None:
+        builder = builder.with_location(location)
+    tc = builder.build()
 
     run_error = False
     err_text = ""
+    meter = WorkMeter()
+    tree = proctree.TreeSampler()  # ce process + les enfants lancés par le snippet
+    mem = memory.MemoryProfiler()  # GREEN_TRACEMALLOC=1 : top des allocations
+    out = capture.OutputCapture()  # GREEN_OUTPUT : sortie du snippet bornée
+    bud = budget.Budget.from_env()  # GREEN_BUDGET_* : arrêt d'un snippet qui s'emballe
+    hot = hotspots.Tracer(code_file)  # GREEN_HOTSPOTS=1 : compteurs d'exécution par boucle/ligne
     t0 = time.time()
 
     try:
         tc.start()
-        runpy.run_path(code_file, run_name="__main__")
+        meter.start(); tree.start(); mem.start()
+        with out, bud.guard(tree), hot:
+            runpy.run_path(code_file, init_globals=meter.globals(), run_name="__main__")
     except SystemExit:
         pass
     except Exception:
         run_error = True
         err_text = traceback.format_exc()
     finally:
+        mem.stop(); tree.stop()
+        meter.stop()
         tc.stop()
 
     duration_s = time.time() - t0
@@ -106,27 +122,40 @@ def run_and_track_file(code_file: str) -> dict:
     if run_error:
         data["run_error"] = True
         data["stderr"] = err_text.strip()
+    data["output"] = out.to_dict(data.get("duration_s"), data.get("energy_kwh"))
+    budget.attach(data, bud)
+    hotspots.attach(data, hot.result, path=code_file)
+    return data, meter, tree, mem
 
-    # Option JSON_OUT (utile pour les benchs)
-    json_out = os.getenv("JSON_OUT")
-    if json_out:
-        try:
-            with open(json_out, "w", encoding="utf-8") as f:
-                json.dump(data, f, ensure_ascii=False)
-        except Exception:
-            pass
 
-    print(json.dumps(data, ensure_ascii=False))
+def measure(code_file: str) -> dict:
+    t0 = time.time()
+    data, meter, tree, mem = _track(code_file)
+    t1 = time.time()
+    overhead.process(data, "tracarbon-api", lambda f: _track(f)[0])
+    intensity.annotate(data, t0, t1, samples=tree.energy_samples(data.get("energy_kwh")))
+    proctree.attach(data, tree)
+    memory.attach(data, mem.result)
+    data.update(meter.summarize(data["energy_kwh"], data["duration_s"]))
+    sink.emit(data, "tracarbon-api", code_file, tree)
+    return data
+
+
+def run_and_track_file(code_file: str) -> dict:
+    data = measure(code_file)
+    channel.publish(data)  # canal bench_all + JSON_OUT + stdout
     return data
 
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--batch":
+        sys.exit(batch.main(sys.argv[2:], measure))
     if len(sys.argv) < 2:
         print("Usage: python tracarbon-api.py <code_file.py>", file=sys.stderr)
         sys.exit(1)
     script = sys.argv[1]
     if not os.path.exists(script):
-        print(json.dumps({"error": f"File not found: {script}"}))
+        channel.publish({"error": f"File not found: {script}"})
         sys.exit(2)
     run_and_track_file(script)
 
@@ -0,0 +1,22 @@
+# tests/test_dataframes.py
+import sys
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from green_assistant.dataframes import rewrite_concat
+
+pd = pytest.importorskip("pandas")
+
+
+def test_concat_loop_at_end_of_file_without_trailing_newline():
+    code = ("import pandas as pd\nout = pd.DataFrame()\nfor i in range(3):\n"
+            "    part = pd.DataFrame({'a': [i]})\n    out = pd.concat([out, part], ignore_index=True)")
+    green, n = rewrite_concat(code)
+    assert n == 1
+    assert green.endswith("out = pd.concat(_frames_out, ignore_index=True)\n")
+    ns = {}
+    exec(compile(green, "<test>", "exec"), ns)
+    assert ns["out"]["a"].tolist() == [0, 1, 2]
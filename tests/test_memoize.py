@@ -0,0 +1,42 @@
+# tests/test_memoize.py
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src"))
+
+from green_assistant.memoize import SourceEdits, rewrite_memoize
+
+
+def test_insert_after_last_line_without_trailing_newline():
+    src = SourceEdits("for i in range(3):\n    x = i")
+    src.insert_line(3, "y = x")
+    out = src.apply()
+    assert out == "for i in range(3):\n    x = i\ny = x\n"
+    compile(out, "<test>", "exec")
+
+
+def test_inserts_at_same_position_keep_order():
+    src = SourceEdits("a = 1")
+    src.insert_line(2, "b = 2"); src.insert_line(2, "c = 3")
+    assert src.apply() == "a = 1\nb = 2\nc = 3\n"
+
+
+def test_memoize_reuses_aliased_functools():
+    code = '"""doc."""\nimport functools as ft\n\ndef fib(n):\n    return n if n < 2 else fib(n - 1) + fib(n - 2)\n\nprint(fib(20))'
+    out, names = rewrite_memoize(code)
+    assert names == ["fib"]
+    assert "@ft.lru_cache(" in out and "import functools\n" not in out
+    exec(compile(out, "<test>", "exec"), {"__name__": "__main__"})
+
+
+def test_memoize_import_goes_after_docstring_and_future():
+    code = '"""doc."""\nfrom __future__ import annotations\n\ndef fib(n):\n    return n if n < 2 else fib(n - 1) + fib(n - 2)\n'
+    out, _ = rewrite_memoize(code)
+    assert out.splitlines()[2] == "import functools"
+    compile(out, "<test>", "exec")
+
+
+def test_memoize_function_on_first_line():
+    out, _ = rewrite_memoize("def fib(n):\n    return n if n < 2 else fib(n - 1) + fib(n - 2)\nprint(fib(20))")
+    assert out.startswith("import functools\n@functools.lru_cache(")
+    exec(compile(out, "<test>", "exec"), {"__name__": "__main__"})